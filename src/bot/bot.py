@@ -4,153 +4,525 @@ import twitchio
 from twitchio import Message, Chatter
 from twitchio.ext import commands
 
-from bot.config import Config
+from bot.channel import botState, channel_round
+from bot.chat_connection import server_connection
+from bot.chat_recorder import chat_recorder
+from bot.config import RESTART_SETTINGS, Config, load_config_from_file
 from bot import log
-from bot.guess_handler import guess_handler
+from bot.flood_control import flood_control
+from bot.guess_parser import chat_name, guess_parser, parse_entries, read_entries
+from bot.ingest import guess_ingest, ingest_item
+from bot.live_feed import live_feed
+from bot.metrics import chat_metrics, metrics_server, watch_loop_lag
+from bot.outbound import outbound_scheduler
+from bot.profiling import profiler
 
 import asyncio
-from enum import Enum
-import re
-
-
-class botState(Enum):
-    NOT_PROCESSING = 0
-    COLLECTING_VALS = 1
-    HOLDING_FOR_ANSWER = 2
+import dataclasses
+import datetime
+import os
+import pathlib
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from bot.round_history import round_history
+
+# Kept few enough to fit one chat message
+MAX_HISTOGRAM_BINS = 20
+HISTOGRAM_PERCENTILES = (5, 25, 50, 75, 95, 99)
+BARS = "▁▂▃▄▅▆▇█"
+# Commands anyone in chat may use; the rest are for mods
+PUBLIC_COMMANDS = ("mystats", "rank")
+# Seconds before a chatter may ask for their stats, or a rank, again
+MYSTATS_COOLDOWN = 30
+RANK_COOLDOWN = 10
+MAX_LEADERBOARD = 20
+# Entries that could not be read are quoted back, up to this many
+MAX_INVALID_SHOWN = 3
+
+
+def channel_prefixes(config: Config) -> Dict[str, str]:
+    """
+    The channels with a prefix of their own, by channel name.
+    """
+    return {
+        channel: overrides["prefix"]
+        for channel, overrides in config.channels.items()
+        if overrides and "prefix" in overrides
+    }
+
+
+def format_import_summary(
+    total: int, added: int, stored: int, too_large: int, invalid: List[str]
+) -> str:
+    """
+    One line of chat on what became of a bulk import of guesses.
+    """
+    message = f"Guesses added: {added}, replaced: {stored - added}"
+    skipped = []
+    repeats = total - stored - too_large
+    if repeats:
+        skipped.append(f"{repeats} repeated")
+    if too_large:
+        skipped.append(f"{too_large} too large")
+    if invalid:
+        shown = ", ".join(invalid[:MAX_INVALID_SHOWN])
+        if len(invalid) > MAX_INVALID_SHOWN:
+            shown += ", ..."
+        skipped.append(f"{len(invalid)} not understood ({shown})")
+    if skipped:
+        message += ". Skipped: " + ", ".join(skipped)
+    return message
+
+
+def format_histogram(
+    ranges: List[Tuple[int, int, int]], percentiles: Dict[int, float]
+) -> str:
+    """
+    A histogram as one line of chat: bars for the shape, then the counts and percentiles.
+    """
+    most = max(count for _, _, count in ranges)
+    bars = "".join(BARS[(len(BARS) - 1) * count // most] for _, _, count in ranges)
+    counts = ", ".join(
+        f"{lowest}: {count}" if lowest == highest else f"{lowest}-{highest}: {count}"
+        for lowest, highest, count in ranges
+    )
+    message = f"{bars} | {counts}"
+    if percentiles:
+        message += " | " + ", ".join(
+            f"p{point} {value:g}" for point, value in percentiles.items()
+        )
+    return message
 
 
 class Bot(commands.Bot):
     config: Config
-    bot_state: botState
-    regexp_pattern = re.compile(r"^(?P<value>[-+]?\d+\.?\d*)")
-    guess_handler: guess_handler
-
-    def __init__(self, token: str, config: Config, logger: log.Logger) -> None:
-        super().__init__(token=token, prefix=config.prefix)
+    config_path: str
+    narrow_config: Callable[[Config, Config], Config] | None
+    config_watcher: asyncio.Task | None
+    rounds: Dict[str, channel_round]
+    parsers: Dict[str, guess_parser]
+    prefixes: Dict[str, str]
+    flood: flood_control
+    ingest: guess_ingest
+    live_feed: live_feed | None
+    outbound: outbound_scheduler
+    recorder: chat_recorder | None
+    metrics: chat_metrics
+    metrics_endpoint: metrics_server | None
+    profiler: profiler
+    history: round_history | None
+
+    def __init__(
+        self,
+        token: str,
+        config: Config,
+        logger: log.Logger,
+        config_path: str = "",
+        narrow_config: Callable[[Config, Config], Config] | None = None,
+    ) -> None:
+        super().__init__(token=token, prefix=self.command_prefix)
 
         self.config = config
         self.logger = logger
-        self.bot_state = botState.NOT_PROCESSING
-        self.reset_guesses()
+        if config.chat_server:
+            # A stand-in for Twitch chat, connected to in place of the one twitchio made
+            self._connection = server_connection(
+                config.chat_server,
+                config.chat_nick,
+                logger,
+                client=self,
+                token=token,
+                loop=self.loop,
+                heartbeat=self._heartbeat,
+            )
+        # The file the config came from, watched for changes if given
+        self.config_path = config_path
+        # Given each reloaded config and the current one, for a bot serving only part of it
+        self.narrow_config = narrow_config
+        self.config_watcher = None
+        # Round state for each channel, by channel name
+        self.rounds = {}
+        self.parsers = {}
+        self.prefixes = channel_prefixes(config)
+        self.flood = flood_control(
+            config.flood_rate,
+            config.flood_burst,
+            config.duplicate_window,
+            config.flood_max_chatters,
+        )
+        self.ingest = guess_ingest(
+            self.record_guesses,
+            logger,
+            config.ingest_queue_size,
+            config.ingest_batch_size,
+        )
+
+        # No default sender: with many channels, each message says where it goes
+        self.outbound = outbound_scheduler(
+            None,
+            logger,
+            config.send_rate_limit,
+            config.send_rate_period,
+        )
+
+        self.live_feed = None
+        if config.live_mode:
+            self.live_feed = live_feed(
+                interval=config.live_feed_interval,
+                max_lines=config.live_feed_max_lines,
+            )
+
+        self.recorder = None
+        if config.record_path:
+            self.recorder = chat_recorder(config.record_path)
+
+        # Always recorded, as it is cheap; only served if a port is configured
+        self.metrics = chat_metrics()
+        self.metrics_endpoint = None
+        registry = self.metrics.registry
+        registry.read(
+            "ingest_queue_depth",
+            "Guesses queued for recording",
+            self.ingest.queue.qsize,
+        )
+        registry.read(
+            "outbound_queue_depth",
+            "Chat messages queued to send",
+            lambda: self.outbound.unfinished,
+        )
+        registry.read(
+            "outbound_sent_total",
+            "Chat messages sent",
+            lambda: self.outbound.sent,
+            "counter",
+        )
+        registry.read(
+            "outbound_failed_total",
+            "Chat messages which failed to send",
+            lambda: self.outbound.failed,
+            "counter",
+        )
+        registry.read("rounds", "Channels with a round", lambda: len(self.rounds))
+        suppressed = "Chat messages dropped as flooding before parsing, by reason"
+        registry.read(
+            "messages_suppressed_total",
+            suppressed,
+            lambda: self.flood.suppressed_rate,
+            "counter",
+            {"reason": "rate"},
+        )
+        registry.read(
+            "messages_suppressed_total",
+            suppressed,
+            lambda: self.flood.suppressed_duplicate,
+            "counter",
+            {"reason": "duplicate"},
+        )
+        registry.read(
+            "flood_chatters",
+            "Chatters tracked for flood control",
+            lambda: len(self.flood.chatters),
+        )
+
+        self.profiler = profiler(config.profile_path, logger)
+
+        self.history = None
+        if config.history_path:
+            # SQLite is only loaded if a history is kept
+            from bot.round_history import round_history  # pylint: disable=C0415
+
+            self.history = round_history(config.history_path)
+
+        # Journalled channels are picked up straight away, in case a round was open
+        for channel in config.channel_names():
+            if self.config.for_channel(channel).journal_path:
+                self.round_for(channel)
 
     async def event_ready(self) -> None:
         self.logger.info("Bot Awake. My name is %s", self.nick)
         self.loop.create_task(
-            self.join(self.config.default_channel), name="join-channel"
+            self.join(self.config.channel_names()), name="join-channel"
         )
+        if self.recorder is not None or any(
+            this_round.journal is not None for this_round in self.rounds.values()
+        ):
+            self.loop.create_task(self.flush_journal(), name="flush-journal")
+        if self.config.metrics_port and self.metrics_endpoint is None:
+            self.metrics_endpoint = metrics_server(
+                self.metrics.registry,
+                self.config.metrics_host,
+                self.config.metrics_port,
+            )
+            await self.metrics_endpoint.start()
+            self.logger.info(
+                "Serving metrics on %s:%d",
+                self.config.metrics_host,
+                self.metrics_endpoint.port,
+            )
+            self.loop.create_task(
+                watch_loop_lag(self.metrics.loop_lag_seconds), name="loop-lag"
+            )
+        if (
+            self.config_path
+            and self.config.config_poll_interval
+            and self.config_watcher is None
+        ):
+            self.config_watcher = self.loop.create_task(
+                self.watch_config(), name="watch-config"
+            )
 
-    async def join(self, channel: str) -> None:
-        self.logger.info("Joining Channel %s", channel)
-        await self.join_channels([channel])
+    async def join(self, channels: List[str]) -> None:
+        self.logger.info("Joining Channels %s", ", ".join(channels))
+        await self.join_channels(channels)
+
+    async def part(self, channels: List[str]) -> None:
+        self.logger.info("Leaving Channels %s", ", ".join(channels))
+        await self.part_channels(channels)
+
+    async def watch_config(self) -> None:
+        """
+        Reload the config whenever its file is changed, by polling its modification time.
+        """
+        changed_at = os.stat(self.config_path).st_mtime_ns
+        while True:
+            await asyncio.sleep(self.config.config_poll_interval)
+            try:
+                modified = os.stat(self.config_path).st_mtime_ns
+            except OSError:
+                # Mid-save by an editor; look again next time
+                continue
+            if modified != changed_at:
+                changed_at = modified
+                self.logger.info("Config file changed; reloading")
+                await self.reload_config()
+
+    async def reload_config(self) -> bool:
+        """
+        Read the config file again in a thread, and switch to it if it is valid.
+        """
+        try:
+            config = await asyncio.get_running_loop().run_in_executor(
+                None, load_config_from_file, self.config_path
+            )
+        except Exception:  # pylint: disable=W0703
+            self.logger.exception(
+                "Could not load %s; keeping the current config", self.config_path
+            )
+            return False
+
+        if self.narrow_config is not None:
+            config = self.narrow_config(config, self.config)
+        self.apply_config(config)
+        return True
+
+    def apply_config(self, config: Config) -> None:
+        """
+        Switch every channel to a new config, without reconnecting or losing any round.
+        Settings only read at startup keep their current values until a restart.
+        """
+        held = {
+            name: getattr(self.config, name)
+            for name in RESTART_SETTINGS
+            if getattr(config, name) != getattr(self.config, name)
+        }
+        if held:
+            self.logger.warning(
+                "Restart to change %s; keeping the current values", ", ".join(held)
+            )
+            config = dataclasses.replace(config, **held)
+
+        joined = set(self.config.channel_names())
+        wanted = config.channel_names()
+
+        # Nothing awaits in here, so no message sees half of the change
+        self.config = config
+        self.prefixes = channel_prefixes(config)
+        self.flood.configure(
+            config.flood_rate,
+            config.flood_burst,
+            config.duplicate_window,
+            config.flood_max_chatters,
+        )
+        for channel, this_round in self.rounds.items():
+            this_round.apply_config(config.for_channel(channel))
+        self.logger.info("Config reloaded")
+
+        added = [channel for channel in wanted if channel not in joined]
+        removed = sorted(joined.difference(wanted))
+        if added:
+            self.loop.create_task(self.join(added), name="join-channel")
+        if removed:
+            # Their rounds are closed now, so nothing more is scored or journalled there
+            for channel in removed:
+                this_round = self.rounds.pop(channel, None)
+                if this_round is not None:
+                    this_round.close()
+            self.loop.create_task(self.part(removed), name="part-channel")
 
     async def event_message(self, message: Message) -> None:
         # Ignore loop-back messages
         if message.echo:
             return
 
-        if self.config.live_mode:
-            print(f"Received {message.author.name}::{message.content}")
-
-        # Only do full message check if in recording mode
-        if self.bot_state == botState.COLLECTING_VALS:
-            if self.is_guess(message.content):
-                await self.record_guess(message.author.name, message.content)
-                return
-            elif message.content.lower().startswith(self.config.prefix + "guess "):
-                await self.record_guess(
+        metrics = self.metrics
+        metrics.messages_received.inc()
+        started = time.perf_counter_ns()
+        try:
+            channel = message.channel.name if message.channel is not None else ""
+            if self.recorder is not None:
+                self.recorder.record(
+                    message.timestamp,
+                    channel,
                     message.author.name,
-                    message.content[len(self.config.prefix + "guess ") :],
+                    message.content,
+                    message.author.is_mod,
                 )
+
+            # Floods are dropped before anything else looks at them; mods are trusted
+            elevated = self.is_elevated_permissions(message.author)
+            if not elevated and self.is_flooding(channel, message, started):
                 return
 
-        # Commmands are only availible to mods:
-        if self.is_elevated_permissions(message.author):
-            await self.handle_commands(message)
+            if self.live_feed is not None:
+                self.live_feed.add(message.author.name, message.content)
 
-    def is_guess(self, message: str) -> bool:
-        # Is this a number?
-        return self.regexp_pattern.search(message) is not None
+            if self.dispatch_guess(channel, message):
+                return
 
-    def reset_guesses(self) -> None:
-        self.guess_handler = guess_handler(self.config.use_latest_reply)
+            # Commmands are only availible to mods, bar a few:
+            if elevated or self.is_public_command(message):
+                await self.handle_commands(message)
+        finally:
+            metrics.event_message_seconds.observe_ns(time.perf_counter_ns() - started)
 
-    async def send_error_message(
-        self, message: str, ping_name: str = None, context: commands.Context = None
-    ):
+    def is_flooding(self, channel: str, message: Message, started: int) -> bool:
         """
-        Return an error message, either as a reply to the context, or to whoever is asked to be pinged.
+        Whether a message should be dropped by flood control, given when handling began.
+        Each channel has its own limits, as a chatter may play in several.
         """
-        if context is None:
-            message = f"@{ping_name} " + message
-            self.logger.info(f"sending message::{message}")
-            target = self.get_channel(self.config.default_channel)
-            await target.send(message)
-        else:
-            self.logger.info(f"sending reply::{message}")
-            await context.reply(message)
+        return not self.flood.allow(
+            (channel, message.author.name), message.content, started * 1e-9
+        )
 
-    async def record_guess(
-        self,
-        name: str,
-        message: str,
-        ping_name: str = None,
-        context: commands.Context = None,
-    ) -> None:
+    def dispatch_guess(self, channel: str, message: Message) -> bool:
         """
-        Check the value from "message" is a positive integer; report back if not.
-        Two checks: Integer, and Positive
-        Then hand over to guess handler.
+        Queue the message as a guess if the channel is collecting and it is one.
+        Returns whether it was a guess, so needs no more handling.
         """
-        if ping_name is None:
-            ping_name = name
+        # Only do full message check if in recording mode
+        # Guesses are parsed once and queued; the ingest consumer records them in batches
+        this_round = self.rounds.get(channel)
+        if this_round is None or this_round.bot_state != botState.COLLECTING_VALS:
+            return False
+        value = this_round.parser.parse(message.content)
+        if value is None:
+            return False
+
+        if not this_round.accepts(message.timestamp):
+            # Sent after the round's deadline
+            self.metrics.rejected_late.inc()
+        elif not self.ingest.submit(
+            message.author.name, message.content, message.timestamp, value, channel
+        ):
+            self.metrics.rejected_dropped.inc()
+        return True
+
+    def parser_for(self, prefix: str) -> guess_parser:
+        """
+        Parsers are shared between channels using the same prefix.
+        """
+        parser = self.parsers.get(prefix)
+        if parser is None:
+            parser = self.parsers[prefix] = guess_parser(prefix)
+        return parser
 
-        try:
-            value_int = int(self.regexp_pattern.match(message)[0])
-        except ValueError:
-            self.logger.info(
-                f"Input message returned ValueError -  ({name}:{message}) - not an integer"
-            )
-            await self.send_error_reply(
-                "Positive whole numbers only please", ping_name, context
-            )
-            return None
-        except Exception:
-            self.logger.error(
-                f"Alternative error when handling message in record_guess ({name}:{message})"
+    def round_for(self, channel: str) -> channel_round:
+        """
+        The round for a channel, created the first time it is needed.
+        """
+        this_round = self.rounds.get(channel)
+        if this_round is None:
+            this_round = self.rounds[channel] = channel_round(
+                channel, self.config.for_channel(channel), self
             )
-            return None
+        return this_round
 
-        if value_int < 0:
-            self.logger.info("value_int error ({value}")
-            self.logger.error(
-                "Converting value to Input message is negative ({name}:{message})"
-            )
-            await self.send_error_message(
-                "Positive whole numbers only please", ping_name, context
-            )
-            return None
+    def command_prefix(self, _bot: commands.Bot, message: Message) -> str:
+        if message.channel is None:
+            return self.config.prefix
+        return self.prefixes.get(message.channel.name, self.config.prefix)
+
+    async def flush_journal(self) -> None:
+        """
+        Flush the journals on a timer, so quiet periods are still made durable.
+        The chat recording is flushed alongside them.
+        """
+        while True:
+            await asyncio.sleep(self.config.journal_flush_interval)
+            if self.recorder is not None:
+                self.recorder.flush()
+            for this_round in self.rounds.values():
+                if this_round.journal is not None:
+                    this_round.journal.flush()
+
+    async def record_guesses(self, batch: List[ingest_item]) -> None:
+        """
+        Hand each channel its share of a batch of queued chat guesses.
+        """
+        by_channel: Dict[str, List[ingest_item]] = {}
+        for item in batch:
+            by_channel.setdefault(item.channel, []).append(item)
 
-        # Feed to guess handler
-        self.logger.info(f"Recording guess {value_int} from {name}")
-        self.guess_handler.accept_guess(name, value_int)
-        return None
+        for channel, items in by_channel.items():
+            this_round = self.rounds.get(channel)
+            # Guesses still queued for a channel which has since been left are dropped
+            if this_round is not None:
+                await this_round.record_guesses(items)
 
     def is_elevated_permissions(self, author: Chatter) -> bool:
         return author.is_mod or author.is_broadcaster
 
+    def is_public_command(self, message: Message) -> bool:
+        prefix = self.command_prefix(self, message)
+        # Most chat is not a command at all, so check the prefix first
+        if not message.content.startswith(prefix):
+            return False
+        command = message.content[len(prefix) :].partition(" ")[0]
+        return command in PUBLIC_COMMANDS
+
+    async def event_command_error(
+        self, context: commands.Context, error: Exception
+    ) -> None:
+        if isinstance(error, commands.CommandOnCooldown):
+            self.logger.info(
+                "%s used %s while on cooldown", context.author.name, error.command.name
+            )
+            return
+        self.logger.error("Error in command %s: %s", context.message.content, error)
+
     # Commands
     @commands.command()
     async def startguessing(self, ctx: commands.Context) -> None:
         if not self.is_elevated_permissions(ctx.author):
             return
+        this_round = self.round_for(ctx.channel.name)
 
-        if self.bot_state == botState.NOT_PROCESSING:
+        if this_round.bot_state == botState.NOT_PROCESSING:
             self.logger.info(
                 "Received startguessing commands, conditions met so clearing guesses and opening."
             )
-            self.reset_guesses()
-            self.bot_state = botState.COLLECTING_VALS
-            await ctx.send("Give guesses now! Positive integers only")
+            this_round.reset_guesses()
+            this_round.set_state(botState.COLLECTING_VALS)
+            message = "Give guesses now! Positive integers only"
+            duration = this_round.config.round_duration
+            if duration:
+                this_round.schedule_close(
+                    ctx.message.timestamp + datetime.timedelta(seconds=duration)
+                )
+                message += f". Closing in {duration} seconds"
+            self.outbound.announce(message, ctx.send)
         else:
             self.logger.warning("Tried to start guessing, but not in the correct state")
 
@@ -158,44 +530,71 @@ class Bot(commands.Bot):
     async def stopguessing(self, ctx: commands.Context) -> None:
         if not self.is_elevated_permissions(ctx.author):
             return
+        this_round = self.round_for(ctx.channel.name)
 
-        if self.bot_state == botState.COLLECTING_VALS:
+        if this_round.bot_state != botState.COLLECTING_VALS:
+            self.logger.warning("Tried to stop guessing, but not in the correct state")
+        elif not this_round.stop_requested:
             self.logger.info(
-                f"Asked to stop guessing. Going to delay by {self.config.stopguess_delay} seconds"
+                "Asked to stop guessing. Going to delay by %s seconds",
+                this_round.config.stopguess_delay,
             )
-            await ctx.send("Guessing window closed")
-            await asyncio.sleep(self.config.stopguess_delay)
-            self.logger.info(f"Guessing window closed")
-            self.bot_state = botState.HOLDING_FOR_ANSWER
-            stats = self.guess_handler.stats()
-            await ctx.send(
-                f"Collected {stats['count']}, between {stats['min']} and {stats['max']}"
+            # Guesses sent up to the deadline still count, judged by their timestamps.
+            # A round opened with a duration keeps its own deadline if that is sooner
+            deadline = ctx.message.timestamp + datetime.timedelta(
+                seconds=this_round.config.stopguess_delay
             )
+            if this_round.close_at is not None:
+                deadline = min(deadline, this_round.close_at)
+            this_round.stop_requested = True
+            this_round.schedule_close(deadline)
+            self.outbound.announce("Guessing window closed", ctx.send)
         else:
-            self.logger.warning("Tried to stop guessing, but not in the correct state")
+            # Asked again while closing; nothing sent after this counts
+            self.logger.info("Asked to stop guessing again; closing now")
+            this_round.schedule_close(min(this_round.close_at, ctx.message.timestamp))
+            self.outbound.reply("Closing guesses now", ctx.reply)
 
     @commands.command()
     async def score(self, ctx: commands.Context, scoreval: int) -> None:
         if not self.is_elevated_permissions(ctx.author):
             return
+        this_round = self.round_for(ctx.channel.name)
 
-        if self.bot_state == botState.COLLECTING_VALS:
+        if this_round.bot_state == botState.COLLECTING_VALS:
             self.logger.warning("Asked to make score, but still collecting.")
-            await ctx.reply("Please call !stopguessing before asking for a score")
+            self.outbound.reply(
+                "Please call !stopguessing before asking for a score", ctx.reply
+            )
         else:
             # Produce score in either case
-            (result_names, result_values) = self.guess_handler.get_score(
-                scoreval, self.config.closest_without_going_over
-            )
-
-            message = (
-                "Winners: "
-                + ", ".join(result_names)
-                + ". Guesses of: "
-                + str(result_values)[1:-1]
+            started = time.perf_counter_ns()
+            (result_names, result_values) = this_round.guess_handler.get_score(
+                scoreval, this_round.config.closest_without_going_over
             )
-            self.logger.info(f"Sending message::{message}")
-            await ctx.send(message)
+            self.metrics.score_seconds.observe_ns(time.perf_counter_ns() - started)
+
+            if result_names:
+                message = (
+                    "Winners: "
+                    + ", ".join(result_names)
+                    + ". Guesses of: "
+                    + str(result_values)[1:-1]
+                )
+            else:
+                message = "No guesses this round"
+            self.logger.info("Sending message::%s", message)
+            # Long winner lists are split to fit
+            self.outbound.announce(message, ctx.send)
+
+            # The round is over; the guesses stay until the next round for re-scoring
+            if this_round.bot_state != botState.NOT_PROCESSING:
+                this_round.set_state(botState.NOT_PROCESSING)
+                # Only the score which ends the round goes in the history
+                this_round.save_to_history(
+                    scoreval, result_names, ctx.message.timestamp
+                )
+                this_round.award_points(scoreval)
 
     @commands.command()
     async def addguess(
@@ -209,41 +608,215 @@ class Bot(commands.Bot):
         """
         if not self.is_elevated_permissions(ctx.author):
             return
+        this_round = self.round_for(ctx.channel.name)
 
-        if not self.is_guess(guessval):
-            self.logger.info(f"addguess command: guessval ({guessval}) not a guess")
-            await ctx.reply(f"addguess command didn't have a guess value")
+        if not this_round.is_guess(guessval):
+            self.logger.info("addguess command: guessval (%s) not a guess", guessval)
+            self.outbound.reply("addguess command didn't have a guess value", ctx.reply)
             return
 
-        self.logger.info(f"addguess command, with {guessval} and {user}")
+        self.logger.info("addguess command, with %s and %s", guessval, user)
 
         if isinstance(user, (twitchio.Chatter, twitchio.PartialChatter)):
             user = user.name
         if user is None:
             user = ctx.author.name
 
-        await self.record_guess(user, guessval, ctx.author.name, ctx)
+        # Stored as chat gives names, so !rank and scoring find the guess however it was typed
+        await this_round.record_guess(chat_name(user), guessval, ctx.author.name, ctx)
+
+    @commands.command()
+    async def addguesses(self, ctx: commands.Context) -> None:
+        """
+        Add many guesses at once, as name=guess entries, such as those made off chat
+        """
+        if not self.is_elevated_permissions(ctx.author):
+            return
+
+        # Read from the message as a whole, rather than as one argument per entry
+        entries, invalid = parse_entries(ctx.message.content.partition(" ")[2])
+        self.import_guesses(ctx, entries, invalid)
+
+    @commands.command()
+    async def importguesses(self, ctx: commands.Context, filename: str) -> None:
+        """
+        Add the guesses in a file from the import folder, as addguesses takes them
+        """
+        if not self.is_elevated_permissions(ctx.author):
+            return
+        import_path = self.round_for(ctx.channel.name).config.guess_import_path
+        if not import_path:
+            self.outbound.reply("Guesses can't be imported from files here", ctx.reply)
+            return
+        # Only files in the import folder itself
+        if filename in (".", "..") or pathlib.PurePath(filename).name != filename:
+            self.outbound.reply("Give just the name of the file to import", ctx.reply)
+            return
+
+        path = pathlib.Path(import_path) / filename
+        try:
+            entries, invalid = await asyncio.get_running_loop().run_in_executor(
+                None, read_entries, path
+            )
+        except (OSError, UnicodeDecodeError) as error:
+            self.logger.error("Could not import guesses from %s: %s", path, error)
+            self.outbound.reply(f"Could not read {filename}", ctx.reply)
+            return
+        self.import_guesses(ctx, entries, invalid)
+
+    def import_guesses(
+        self,
+        ctx: commands.Context,
+        entries: List[Tuple[str, int]],
+        invalid: List[str],
+    ) -> None:
+        """
+        Store a bulk import of guesses in one go, and answer with a single summary.
+        """
+        this_round = self.round_for(ctx.channel.name)
+
+        started = time.perf_counter_ns()
+        added, stored, too_large = this_round.store_guesses(entries)
+        self.metrics.record_guess_seconds.observe_ns(time.perf_counter_ns() - started)
+        self.metrics.rejected_invalid.inc(len(invalid))
+
+        message = format_import_summary(
+            len(entries), added, len(stored), len(too_large), invalid
+        )
+        self.logger.info("Guesses imported by %s: %s", ctx.author.name, message)
+        self.outbound.reply(message, ctx.reply)
 
     @commands.command()
     async def stats(self, ctx: commands.Context) -> None:
         if not self.is_elevated_permissions(ctx.author):
             return
+        this_round = self.round_for(ctx.channel.name)
 
-        stats = self.guess_handler.stats()
+        started = time.perf_counter_ns()
+        stats = this_round.guess_handler.stats()
+        self.metrics.stats_seconds.observe_ns(time.perf_counter_ns() - started)
         message = f"{stats['count']} results between {stats['min']}-{stats['max']}. Mean:{stats['mean']}, StDev:{stats['stdev']}. Median:{stats['median']}"
 
-        self.logger.info(f"Stats Message:{message}")
-        await ctx.send(message)
+        self.logger.info("Stats Message:%s", message)
+        self.outbound.announce(message, ctx.send)
+
+    @commands.command()
+    async def histogram(self, ctx: commands.Context, bins: int = 10) -> None:
+        if not self.is_elevated_permissions(ctx.author):
+            return
+        this_round = self.round_for(ctx.channel.name)
+
+        started = time.perf_counter_ns()
+        ranges = this_round.guess_handler.histogram(
+            max(1, min(bins, MAX_HISTOGRAM_BINS))
+        )
+        percentiles = this_round.guess_handler.percentiles(HISTOGRAM_PERCENTILES)
+        self.metrics.stats_seconds.observe_ns(time.perf_counter_ns() - started)
+
+        if not ranges:
+            self.outbound.reply("No guesses yet", ctx.reply)
+            return
+
+        message = format_histogram(ranges, percentiles)
+        self.logger.info("Histogram Message:%s", message)
+        self.outbound.announce(message, ctx.send)
+
+    @commands.command()
+    async def leaderboard(self, ctx: commands.Context, count: int = 10) -> None:
+        if not self.is_elevated_permissions(ctx.author):
+            return
+        if self.history is None:
+            self.outbound.reply("No round history is kept", ctx.reply)
+            return
+
+        leaders = await self.history.leaderboard(
+            ctx.channel.name, max(1, min(count, MAX_LEADERBOARD))
+        )
+        if not leaders:
+            self.outbound.reply("Nobody has won a round yet", ctx.reply)
+            return
+
+        message = "Most wins: " + ", ".join(
+            f"{leader.ahead + 1}. {leader.name} {leader.wins}/{leader.rounds}"
+            for leader in leaders
+        )
+        self.logger.info("Leaderboard Message:%s", message)
+        self.outbound.announce(message, ctx.send)
+
+    @commands.command()
+    @commands.cooldown(1, MYSTATS_COOLDOWN, commands.Bucket.user)
+    async def mystats(self, ctx: commands.Context) -> None:
+        if self.history is None:
+            return
+
+        stats = await self.history.player(ctx.channel.name, ctx.author.name)
+        if stats is None:
+            message = "You haven't played a round here yet"
+        else:
+            message = (
+                f"{stats.wins} wins from {stats.rounds} rounds "
+                f"({100 * stats.wins / stats.rounds:.0f}%), place {stats.ahead + 1}"
+            )
+        self.outbound.reply(message, ctx.reply)
+
+    @commands.command()
+    @commands.cooldown(1, RANK_COOLDOWN, commands.Bucket.user)
+    async def rank(self, ctx: commands.Context, user: str | None = None) -> None:
+        """
+        A chatter's place in the standings; their own if no one is named
+        """
+        this_round = self.round_for(ctx.channel.name)
+        if this_round.standings is None:
+            return
+
+        if isinstance(user, (twitchio.Chatter, twitchio.PartialChatter)):
+            user = user.name
+        name = chat_name(user or ctx.author.name)
+
+        placing = this_round.standings.rank(name)
+        if placing is None:
+            message = f"{name} has no points here yet"
+        else:
+            place, points = placing
+            message = (
+                f"{name} is number {place} of {len(this_round.standings)}"
+                f" with {points} points"
+            )
+        self.outbound.reply(message, ctx.reply)
+
+    @commands.command()
+    async def top(self, ctx: commands.Context, count: int = 10) -> None:
+        if not self.is_elevated_permissions(ctx.author):
+            return
+        this_round = self.round_for(ctx.channel.name)
+        if this_round.standings is None:
+            self.outbound.reply("No standings are kept", ctx.reply)
+            return
+
+        leaders = this_round.standings.top(max(1, min(count, MAX_LEADERBOARD)))
+        if not leaders:
+            self.outbound.reply("Nobody has any points yet", ctx.reply)
+            return
+
+        message = "Most points: " + ", ".join(
+            f"{place}. {name} {points}" for place, name, points in leaders
+        )
+        self.logger.info("Standings Message:%s", message)
+        self.outbound.announce(message, ctx.send)
 
     @commands.command()
     async def guesscommands(self, ctx: commands.Context) -> None:
         if not self.is_elevated_permissions(ctx.author):
-            await ctx.reply("My commands are moderator-only")
+            self.outbound.reply("My commands are moderator-only", ctx.reply)
             return
 
-        prefix = self.config.prefix
-        await ctx.reply(
-            "{prefix}startguessing, {prefix}stopguessing, {prefix}score (result), {prefix}stats. {prefix}addguess (guess) (name)."
+        prefix = self.round_for(ctx.channel.name).config.prefix
+        self.outbound.reply(
+            f"{prefix}startguessing, {prefix}stopguessing, {prefix}score (result), "
+            f"{prefix}stats, {prefix}histogram (bins), {prefix}leaderboard, {prefix}top. "
+            f"{prefix}addguess (guess) (name), {prefix}addguesses (name=guess ...), "
+            f"{prefix}importguesses (file).",
+            ctx.reply,
         )
 
     @commands.command()
@@ -252,8 +825,47 @@ class Bot(commands.Bot):
             return
 
         message = f"Hello {ctx.author.name}, I am totally awake"
-        self.logger.info(f"Sending message::{message}")
-        await ctx.send(message)
+        self.logger.info("Sending message::%s", message)
+        self.outbound.announce(message, ctx.send)
+
+    @commands.command()
+    async def profile(
+        self, ctx: commands.Context, seconds: int = 30, kind: str = "cpu"
+    ) -> None:
+        """
+        Profile the bot for a while; kind is cpu (cProfile) or sample (stack sampling)
+        """
+        if not self.is_elevated_permissions(ctx.author):
+            return
+
+        self.start_profile(ctx, kind, seconds)
+
+    @commands.command()
+    async def memsnapshot(self, ctx: commands.Context, seconds: int = 30) -> None:
+        """
+        Trace memory allocations for a while, reporting what is still held at the end
+        """
+        if not self.is_elevated_permissions(ctx.author):
+            return
+
+        self.start_profile(ctx, "memory", seconds)
+
+    def start_profile(self, ctx: commands.Context, kind: str, seconds: int) -> None:
+        seconds = max(1, min(seconds, self.config.profile_max_seconds))
+        self.logger.info("Received %s profile command for %d seconds", kind, seconds)
+        # Run in the background, so handling this message is not held up
+        self.loop.create_task(self.report_profile(ctx, kind, seconds), name="profile")
+
+    async def report_profile(
+        self, ctx: commands.Context, kind: str, seconds: int
+    ) -> None:
+        try:
+            summary = await self.profiler.run(kind, seconds)
+        except Exception as error:  # pylint: disable=W0703
+            # Nothing awaits this task, so say what happened here
+            self.logger.exception("The %s profile failed", kind)
+            summary = f"The {kind} profile failed: {error}"
+        self.outbound.reply(summary, ctx.reply)
 
     @commands.command()
     async def sleep(self, ctx: commands.Context) -> None:
@@ -261,4 +873,23 @@ class Bot(commands.Bot):
             return
 
         self.logger.info("Received sleep command")
+        await self.shut_down()
         await self.close()
+
+    async def shut_down(self) -> None:
+        """
+        Record any queued guesses, then flush and close everything the bot has open.
+        The journals and recording go first, so they are saved even if sending hangs.
+        """
+        await self.ingest.close()
+        for this_round in self.rounds.values():
+            this_round.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.history is not None:
+            await self.history.close()
+        await self.outbound.close()
+        if self.live_feed is not None:
+            self.live_feed.close()
+        if self.metrics_endpoint is not None:
+            await self.metrics_endpoint.stop()
@@ -0,0 +1,429 @@
+"""
+Round state for one channel the bot serves.
+
+Each channel has its own state, guesses, journal and config, so one bot can
+run rounds in many channels at once. Channels are only given a round once
+they are used, so a joined channel which never plays costs nothing.
+"""
+
+from __future__ import annotations
+
+from twitchio.ext import commands
+
+from bot.config import Config
+from bot.guess_handler import guess_handler
+from bot.guess_parser import guess_parser
+from bot.ingest import ingest_item
+from bot.metrics import chat_metrics
+from bot.outbound import outbound_scheduler
+from bot.round_journal import round_journal
+from bot.standings import point_scheme, round_points, standings
+
+import asyncio
+import datetime
+import logging
+import pathlib
+import time
+from enum import Enum
+from typing import TYPE_CHECKING, List, Tuple
+
+if TYPE_CHECKING:
+    from bot.bot import Bot
+    from bot.round_history import round_history
+
+# Rounds close this long after their deadline, so guesses sent just before it
+# but still in flight are counted; they are judged by their own timestamps
+CLOSE_GRACE = 1.0
+
+
+def utc_now() -> datetime.datetime:
+    # Naive UTC, as message timestamps are
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class botState(Enum):
+    NOT_PROCESSING = 0
+    COLLECTING_VALS = 1
+    HOLDING_FOR_ANSWER = 2
+
+
+class channel_round:
+    """
+    The guessing round for a single channel.
+    """
+
+    __slots__ = (
+        "name",
+        "config",
+        "bot",
+        "parser",
+        "bot_state",
+        "guess_handler",
+        "journal",
+        "standings",
+        "close_at",
+        "close_handle",
+        "stop_requested",
+    )
+
+    name: str
+    config: Config
+    bot: Bot
+    parser: guess_parser
+    bot_state: botState
+    guess_handler: guess_handler
+    journal: round_journal | None
+    standings: standings | None
+    close_at: datetime.datetime | None
+    close_handle: asyncio.TimerHandle | None
+    # Whether a mod has asked to stop, apart from any deadline the round was opened with
+    stop_requested: bool
+
+    def __init__(self, name: str, config: Config, bot: Bot) -> None:
+        self.name = name
+        self.config = config
+        self.bot = bot
+        self.parser = bot.parser_for(config.prefix)
+        self.close_at = None
+        self.close_handle = None
+        self.stop_requested = False
+
+        self.journal = None
+        if config.journal_path:
+            self.journal = round_journal(pathlib.Path(config.journal_path) / name)
+
+        self.standings = None
+        if config.standings_path:
+            self.standings = standings(
+                pathlib.Path(config.standings_path) / f"{name}.standings"
+            )
+
+        if self.journal is None:
+            self.bot_state = botState.NOT_PROCESSING
+            self.guess_handler = self.new_guess_handler()
+        else:
+            self.restore_round()
+
+    def apply_config(self, config: Config) -> None:
+        """
+        Take up new settings; the round in progress carries on with its guesses.
+        The journal and standings stay with the files they were opened with.
+        """
+        self.config = config
+        self.parser = self.bot.parser_for(config.prefix)
+        self.guess_handler.use_latest_reply = config.use_latest_reply
+
+    @property
+    def logger(self) -> logging.Logger:
+        return self.bot.logger
+
+    @property
+    def outbound(self) -> outbound_scheduler:
+        return self.bot.outbound
+
+    @property
+    def metrics(self) -> chat_metrics:
+        return self.bot.metrics
+
+    def is_guess(self, message: str) -> bool:
+        # Is this a number?
+        return self.parser.parse_value(message) is not None
+
+    def new_guess_handler(self) -> guess_handler:
+        return guess_handler(
+            self.config.use_latest_reply,
+            self.config.compact_guesses,
+            self.config.numpy_threshold,
+        )
+
+    def reset_guesses(self) -> None:
+        self.cancel_close()
+        self.stop_requested = False
+        self.guess_handler = self.new_guess_handler()
+        if self.journal is not None:
+            self.journal.record_reset()
+
+    def set_state(self, state: botState) -> None:
+        self.bot_state = state
+        if self.journal is not None:
+            self.journal.record_state(state.name)
+            self.snapshot_if_needed()
+
+    def restore_round(self) -> None:
+        """
+        Pick up the round that was in progress when the bot last stopped.
+        """
+        state_name, self.guess_handler = self.journal.recover(self.new_guess_handler)
+        self.bot_state = botState[state_name] if state_name else botState.NOT_PROCESSING
+        self.logger.info(
+            "Recovered round for %s in state %s with %d guesses",
+            self.name,
+            self.bot_state.name,
+            self.guess_handler.num_replies(),
+        )
+
+    def snapshot_if_needed(self) -> None:
+        if self.journal.wants_snapshot(self.guess_handler):
+            self.journal.snapshot(self.bot_state.name, self.guess_handler)
+
+    def accepts(self, timestamp: datetime.datetime | None) -> bool:
+        """
+        Whether a guess sent at this time is in time for the round.
+        """
+        return self.close_at is None or timestamp is None or timestamp <= self.close_at
+
+    def schedule_close(self, deadline: datetime.datetime) -> None:
+        """
+        Close the round at the deadline, as given by the chat server's clock.
+        Guesses sent after it are refused from now on.
+        """
+        self.cancel_close()
+        self.close_at = deadline
+
+        loop = asyncio.get_running_loop()
+        delay = (deadline - utc_now()).total_seconds() + CLOSE_GRACE
+        self.close_handle = loop.call_at(
+            loop.time() + max(delay, 0.0), self.close_round
+        )
+
+    def cancel_close(self) -> None:
+        if self.close_handle is not None:
+            self.close_handle.cancel()
+        self.close_handle = None
+        self.close_at = None
+
+    def close_round(self) -> None:
+        self.close_handle = None
+        self.close_at = None
+        self.stop_requested = False
+        if self.bot_state != botState.COLLECTING_VALS:
+            return
+
+        self.logger.info("Guessing window closed for %s", self.name)
+        self.set_state(botState.HOLDING_FOR_ANSWER)
+        asyncio.get_running_loop().create_task(
+            self.announce_collected(), name=f"close-{self.name}"
+        )
+
+    async def announce_collected(self) -> None:
+        # Guesses which arrived before the close may still be queued
+        await self.bot.ingest.drain()
+        started = time.perf_counter_ns()
+        stats = self.guess_handler.stats()
+        self.metrics.stats_seconds.observe_ns(time.perf_counter_ns() - started)
+        self.outbound.announce(
+            f"Collected {stats['count']}, between {stats['min']} and {stats['max']}",
+            self.send,
+        )
+
+    def save_to_history(
+        self, answer: float, winners: List[str], finished_at: datetime.datetime
+    ) -> None:
+        """
+        Save the scored round to the history in the background.
+        The guesses are copied now, as the next round may start before the save runs.
+        """
+        history = self.bot.history
+        if history is None:
+            return
+
+        guesses = list(self.guess_handler.guesses.items())
+        asyncio.get_running_loop().create_task(
+            self._save_to_history(history, answer, winners, finished_at, guesses),
+            name=f"history-{self.name}",
+        )
+
+    async def _save_to_history(
+        self,
+        history: round_history,
+        answer: float,
+        winners: List[str],
+        finished_at: datetime.datetime,
+        guesses: List[Tuple[str, int]],
+    ) -> None:
+        try:
+            await history.record_round(self.name, finished_at, answer, guesses, winners)
+        except Exception:  # pylint: disable=W0703
+            self.logger.exception("Error saving the round for %s to history", self.name)
+
+    def award_points(self, answer: float) -> None:
+        """
+        Add the scored round's points to the standings, saving them in the background.
+        """
+        if self.standings is None:
+            return
+
+        earned = round_points(
+            self.guess_handler,
+            answer,
+            self.config.closest_without_going_over,
+            point_scheme.from_config(self.config),
+        )
+        self.standings.award(earned)
+        self.logger.info("Awarded points to %d chatters in %s", len(earned), self.name)
+        asyncio.get_running_loop().create_task(
+            self._save_standings(self.standings.save()), name=f"standings-{self.name}"
+        )
+
+    async def _save_standings(self, saving: asyncio.Future) -> None:
+        try:
+            await saving
+        except Exception:  # pylint: disable=W0703
+            self.logger.exception("Error saving the standings for %s", self.name)
+
+    def close(self) -> None:
+        self.cancel_close()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if self.standings is not None:
+            self.standings.close()
+
+    async def send(self, message: str) -> None:
+        await self.bot.get_channel(self.name).send(message)
+
+    async def send_error_message(
+        self, message: str, ping_name: str = None, context: commands.Context = None
+    ):
+        """
+        Return an error message, either as a reply to the context,
+        or to whoever is asked to be pinged.
+        Pings with the same message are sent together.
+        """
+        if context is None:
+            self.logger.info("sending message::@%s %s", ping_name, message)
+            self.outbound.ping(ping_name, message, self.send)
+        else:
+            self.logger.info("sending reply::%s", message)
+            self.outbound.send(message, outbound_scheduler.ERROR, context.reply)
+
+    async def record_guess(
+        self,
+        name: str,
+        message: str,
+        ping_name: str = None,
+        context: commands.Context = None,
+    ) -> None:
+        """
+        Check the value from "message" is a positive integer; report back if not.
+        Then hand over to guess handler.
+        """
+        if ping_name is None:
+            ping_name = name
+
+        started = time.perf_counter_ns()
+        value_int = await self.parse_guess(name, message, ping_name, context)
+        if value_int is not None:
+            # Feed to guess handler
+            self.logger.info("Recording guess %d from %s", value_int, name)
+            await self.apply_guesses([(name, value_int)], ping_name, context)
+        self.metrics.record_guess_seconds.observe_ns(time.perf_counter_ns() - started)
+        return None
+
+    async def record_guesses(self, batch: List[ingest_item]) -> None:
+        """
+        Parse a batch of queued chat guesses and hand them to the guess handler together.
+        """
+        started = time.perf_counter_ns()
+        guesses = []
+        for item in batch:
+            if item.value >= 0:
+                guesses.append((item.name, item.value))
+            else:
+                await self.report_invalid(
+                    item.name, item.content, item.value, item.name
+                )
+
+        self.logger.info(
+            "Recording %d guesses from a batch of %d messages", len(guesses), len(batch)
+        )
+        await self.apply_guesses(guesses)
+        self.metrics.record_guess_seconds.observe_ns(time.perf_counter_ns() - started)
+
+    async def parse_guess(
+        self,
+        name: str,
+        message: str,
+        ping_name: str,
+        context: commands.Context = None,
+    ) -> int | None:
+        """
+        Two checks: Integer, and Positive.
+        Returns the value, or None after reporting back why it was refused.
+        """
+        value_int = self.parser.parse_value(message)
+        if value_int is None:
+            value_int = guess_parser.MALFORMED
+
+        if value_int < 0:
+            await self.report_invalid(name, message, value_int, ping_name, context)
+            return None
+        return value_int
+
+    async def report_invalid(
+        self,
+        name: str,
+        message: str,
+        outcome: int,
+        ping_name: str,
+        context: commands.Context = None,
+    ) -> None:
+        """
+        Report a guess the parser refused, given the parser's outcome.
+        """
+        self.metrics.rejected_invalid.inc()
+        if outcome == guess_parser.MALFORMED:
+            self.logger.error(
+                "Alternative error when handling message in record_guess (%s:%s)",
+                name,
+                message,
+            )
+            return
+
+        self.logger.info(
+            "Input message is not a positive whole number (%s:%s)", name, message
+        )
+        await self.send_error_message(
+            "Positive whole numbers only please", ping_name, context
+        )
+
+    async def apply_guesses(
+        self,
+        guesses: List[Tuple[str, int]],
+        ping_name: str = None,
+        context: commands.Context = None,
+    ) -> None:
+        """
+        Store parsed guesses, journal the ones kept, and report any too large to store.
+        """
+        _, _, too_large = self.store_guesses(guesses)
+
+        for name, value_int in too_large:
+            self.logger.info("Guess from %s too large to store (%d)", name, value_int)
+            await self.send_error_message(
+                "That number is too large", ping_name or name, context
+            )
+
+    def store_guesses(
+        self, guesses: List[Tuple[str, int]]
+    ) -> Tuple[int, List[Tuple[str, int]], List[Tuple[str, int]]]:
+        """
+        Store parsed guesses through the guess handler in one call, and journal the ones kept.
+        Returns how many guessers were new, the guesses kept, and those too large to store.
+        """
+        held = self.guess_handler.num_replies()
+        accepted, too_large = self.guess_handler.accept_guesses(guesses)
+
+        # Anything kept without adding a guesser replaced an earlier guess
+        added = self.guess_handler.num_replies() - held
+        metrics = self.metrics
+        metrics.guesses_accepted.inc(added)
+        metrics.guesses_replaced.inc(len(accepted) - added)
+        metrics.rejected_repeat.inc(len(guesses) - len(accepted) - len(too_large))
+        metrics.rejected_too_large.inc(len(too_large))
+
+        if accepted and self.journal is not None:
+            for name, value_int in accepted:
+                self.journal.record_guess(name, value_int)
+            self.snapshot_if_needed()
+        return added, accepted, too_large
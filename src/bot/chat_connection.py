@@ -0,0 +1,75 @@
+"""
+Connection to a stand-in for Twitch chat, such as bot.chat_server.
+
+twitchio connects to the address in its module's HOST, once Twitch has
+validated the token and named the account. A stand-in has an address of
+its own and no token to validate, so this connection is given both the
+address and the nick, and leaves twitchio's module as it is.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import aiohttp
+from twitchio.websocket import WSConnection
+
+from bot import log
+
+
+class server_connection(WSConnection):
+    """
+    twitchio's chat connection, pointed at the given server and logged in as nick.
+    """
+
+    host: str
+    logger: log.Logger
+    session: aiohttp.ClientSession | None
+
+    def __init__(self, host: str, nick: str, logger: log.Logger, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.host = host
+        self.nick = nick
+        self.logger = logger
+        # The connection's own, as the bot makes no API calls to hold one open for it
+        self.session = None
+
+    async def _connect(self) -> None:
+        # As WSConnection._connect, less the token validation
+        self.is_ready.clear()
+        if self._keeper:
+            self._keeper.cancel()
+        if self.is_alive:
+            await self._websocket.close()
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+
+        while True:
+            try:
+                self._websocket = await self.session.ws_connect(
+                    url=self.host, heartbeat=self._heartbeat
+                )
+                break
+            except (aiohttp.ClientError, OSError) as error:
+                retry = self._backoff.delay()
+                self.logger.error(
+                    "Chat connection to %s failed: %s; retrying in %.0fs",
+                    self.host,
+                    error,
+                    retry,
+                )
+                await asyncio.sleep(retry)
+
+        await self.authenticate(self._initial_channels)
+
+        self._reconnect_requested = False
+        self._keeper = asyncio.create_task(self._keep_alive())
+        if not self._task_cleaner or self._task_cleaner.done():
+            self._task_cleaner = asyncio.create_task(self._task_cleanup())
+        self._ws_ready_event.set()
+
+    async def _close(self) -> None:
+        await super()._close()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
@@ -0,0 +1,122 @@
+"""
+Append-only recording of the chat the bot receives, for replaying later.
+
+Every incoming message is kept with its server timestamp, channel, author and
+content, so a stretch of production chat can be fed back through the bot
+exactly as it arrived. Records are compact JSON lines: each file session
+starts with the absolute time in milliseconds, and each message after it
+holds only the milliseconds since the message before.
+
+Writes are buffered and flushed in batches; a capture cut short by a crash
+reads back up to its last complete line.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator, List, NamedTuple, TextIO
+
+import datetime
+import json
+import os
+import pathlib
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class captured_message(NamedTuple):
+    """
+    A chat message read back from a recording.
+    """
+
+    timestamp: datetime.datetime
+    channel: str
+    name: str
+    content: str
+    mod: bool
+
+
+def to_millis(timestamp: datetime.datetime) -> int:
+    # Timestamps are naive UTC, as twitchio gives them
+    return (timestamp - EPOCH) // datetime.timedelta(milliseconds=1)
+
+
+def from_millis(millis: int) -> datetime.datetime:
+    return EPOCH + datetime.timedelta(milliseconds=millis)
+
+
+class chat_recorder:
+    path: pathlib.Path
+    flush_every: int
+    last_millis: int | None
+    pending: List[str]
+    record_file: TextIO | None
+
+    def __init__(self, path: str | os.PathLike, flush_every: int = 1024) -> None:
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        # Time of the last message recorded, which the next is stored relative to
+        self.last_millis = None
+        self.pending = []
+        self.record_file = open(self.path, "a", encoding="utf-8")
+
+    def record(
+        self,
+        timestamp: datetime.datetime,
+        channel: str,
+        name: str,
+        content: str,
+        mod: bool = False,
+    ) -> None:
+        millis = to_millis(timestamp)
+        if self.last_millis is None:
+            self.pending.append(json.dumps([millis]))
+            self.last_millis = millis
+
+        record = [millis - self.last_millis, channel, name, content]
+        if mod:
+            record.append(1)
+        self.pending.append(json.dumps(record, separators=(",", ":")))
+        self.last_millis = millis
+
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending or self.record_file is None:
+            return
+
+        self.record_file.write("\n".join(self.pending) + "\n")
+        self.pending.clear()
+        self.record_file.flush()
+
+    def close(self) -> None:
+        if self.record_file is None:
+            return
+        self.flush()
+        self.record_file.close()
+        self.record_file = None
+
+
+def read_recording(path: str | os.PathLike) -> Iterator[captured_message]:
+    """
+    The messages in a recording, in the order they were received.
+    """
+    millis = 0
+    with open(path, "r", encoding="utf-8") as record_file:
+        for line in record_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Cut short mid-write; nothing after it was written
+                return
+
+            if len(record) == 1:
+                # The start of a session, with its absolute time
+                millis = record[0]
+                continue
+
+            millis += record[0]
+            yield captured_message(
+                from_millis(millis), record[1], record[2], record[3], len(record) > 4
+            )
@@ -0,0 +1,351 @@
+"""
+Local stand-in for Twitch chat, for running the bot offline.
+
+Speaks enough of Twitch's IRC-over-websocket dialect for twitchio to connect,
+log in, join channels and chat: the welcome numerics, capability requests,
+JOIN/PART with name lists, PING, and PRIVMSG with Twitch's tags (mod badges,
+message ids, server timestamps). Chat can be said directly, generated at a
+given rate, or replayed from a list of timed events.
+
+Everything the bot sends is recorded. Twitch's send limit is enforced too:
+messages beyond it are refused with the same notice Twitch gives, so rate
+limiting, reconnects and long rounds can be soak-tested without a real
+connection.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Set
+
+import asyncio
+import itertools
+import time
+
+import aiohttp
+from aiohttp import web
+
+SERVER = "tmi.twitch.tv"
+
+
+class chat_event(NamedTuple):
+    """
+    A chat message to replay, offset seconds after the replay starts.
+    """
+
+    offset: float
+    channel: str
+    user: str
+    content: str
+    mod: bool = False
+
+
+class sent_message(NamedTuple):
+    """
+    A message the bot sent, as the server received it.
+    """
+
+    time: float
+    channel: str
+    nick: str
+    content: str
+    reply_to: str
+    refused: bool
+
+
+class chat_client:
+    """
+    One connection to the server.
+    """
+
+    __slots__ = ("websocket", "nick", "channels", "send_times")
+
+    websocket: web.WebSocketResponse
+    nick: str
+    channels: Set[str]
+    send_times: Deque[float]
+
+    def __init__(self, websocket: web.WebSocketResponse) -> None:
+        self.websocket = websocket
+        self.nick = ""
+        self.channels = set()
+        # Times of recent sends, for the rate limit
+        self.send_times = deque()
+
+
+def parse_line(line: str) -> tuple[Dict[str, str], str, List[str], str]:
+    """
+    Split a client line into its tags, command, parameters and trailing text.
+    """
+    tags: Dict[str, str] = {}
+    if line.startswith("@"):
+        raw_tags, _, line = line[1:].partition(" ")
+        for tag in raw_tags.split(";"):
+            key, _, value = tag.partition("=")
+            tags[key] = value
+
+    line, _, trailing = line.partition(" :")
+    parts = line.split()
+    if not parts:
+        return tags, "", [], trailing
+    return tags, parts[0].upper(), parts[1:], trailing
+
+
+class chat_server:
+    """
+    A chat server on a local port, for twitchio to connect to with a websocket.
+    """
+
+    host: str
+    port: int
+    send_limit: int
+    send_period: float
+    mods: Set[str]
+    clients: List[chat_client]
+    sent: List[sent_message]
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        send_limit: int = 20,
+        send_period: float = 30.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.send_limit = send_limit
+        self.send_period = send_period
+        # Nicks which are mods in every channel, so get the higher send limit
+        self.mods = set()
+        self.clients = []
+        self.sent = []
+        self.message_ids = itertools.count(1)
+        self.joined = asyncio.Condition()
+        self.runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/", self.handle_connection)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        # Port 0 picks a free port; find out which
+        self.port = site._server.sockets[0].getsockname()[1]  # pylint: disable=W0212
+
+    async def stop(self) -> None:
+        await self.disconnect_all()
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_connection(self, request: web.Request) -> web.WebSocketResponse:
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        client = chat_client(websocket)
+        self.clients.append(client)
+
+        try:
+            async for frame in websocket:
+                if frame.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                for line in frame.data.split("\r\n"):
+                    if line.strip():
+                        await self.handle_line(client, line.strip())
+        finally:
+            self.clients.remove(client)
+        return websocket
+
+    async def handle_line(self, client: chat_client, line: str) -> None:
+        tags, command, params, trailing = parse_line(line)
+
+        if command == "NICK":
+            client.nick = params[0].lower()
+            nick = client.nick
+            await self.send_lines(
+                client,
+                [
+                    f":{SERVER} 001 {nick} :Welcome, GLHF!",
+                    f":{SERVER} 002 {nick} :Your host is {SERVER}",
+                    f":{SERVER} 003 {nick} :This server is rather new",
+                    f":{SERVER} 004 {nick} :-",
+                    f":{SERVER} 375 {nick} :-",
+                    f":{SERVER} 372 {nick} :You are in a maze of twisty passages.",
+                    f":{SERVER} 376 {nick} :>",
+                ],
+            )
+        elif command == "CAP":
+            await self.send_lines(client, [f":{SERVER} CAP * ACK :{trailing}"])
+        elif command == "JOIN":
+            for channel in params[0].split(","):
+                await self.join(client, channel.lstrip("#").lower())
+        elif command == "PART":
+            channel = params[0].lstrip("#").lower()
+            client.channels.discard(channel)
+            nick = client.nick
+            await self.send_lines(
+                client, [f":{nick}!{nick}@{nick}.{SERVER} PART #{channel}"]
+            )
+        elif command == "PING":
+            await self.send_lines(client, [f":{SERVER} PONG {SERVER} :{trailing}"])
+        elif command == "PRIVMSG":
+            await self.receive_message(
+                client,
+                params[0].lstrip("#").lower(),
+                trailing,
+                tags.get("reply-parent-msg-id", ""),
+            )
+        # PASS, PONG and anything else need no answer
+
+    async def join(self, client: chat_client, channel: str) -> None:
+        client.channels.add(channel)
+        nick = client.nick
+        await self.send_lines(
+            client,
+            [
+                f":{nick}!{nick}@{nick}.{SERVER} JOIN #{channel}",
+                f":{nick}.{SERVER} 353 {nick} = #{channel} :{nick}",
+                f":{nick}.{SERVER} 366 {nick} #{channel} :End of /NAMES list",
+            ],
+        )
+        async with self.joined:
+            self.joined.notify_all()
+
+    async def wait_joined(self, channel: str, timeout: float = 10.0) -> None:
+        """
+        Wait until some client has joined the channel.
+        """
+        channel = channel.lower()
+        async with self.joined:
+            await asyncio.wait_for(
+                self.joined.wait_for(
+                    lambda: any(channel in client.channels for client in self.clients)
+                ),
+                timeout,
+            )
+
+    async def receive_message(
+        self, client: chat_client, channel: str, content: str, reply_to: str
+    ) -> None:
+        now = time.monotonic()
+        limit = self.send_limit * 5 if client.nick in self.mods else self.send_limit
+        while client.send_times and client.send_times[0] + self.send_period <= now:
+            client.send_times.popleft()
+
+        refused = len(client.send_times) >= limit
+        self.sent.append(
+            sent_message(now, channel, client.nick, content, reply_to, refused)
+        )
+        if refused:
+            await self.send_lines(
+                client,
+                [
+                    f"@msg-id=msg_ratelimit :{SERVER} NOTICE #{channel} :Your message"
+                    " was not sent because you are sending messages too quickly."
+                ],
+            )
+            return
+        client.send_times.append(now)
+
+    async def send_lines(self, client: chat_client, lines: List[str]) -> None:
+        if client.websocket.closed:
+            return
+        await client.websocket.send_str("\r\n".join(lines) + "\r\n")
+
+    def format_message(
+        self, channel: str, user: str, content: str, mod: bool = False
+    ) -> str:
+        user = user.lower()
+        message_id = next(self.message_ids)
+        tags = ";".join(
+            [
+                "badge-info=",
+                f"badges={'moderator/1' if mod else ''}",
+                "color=",
+                f"display-name={user}",
+                "emotes=",
+                "first-msg=0",
+                "flags=",
+                f"id=message-{message_id}",
+                f"mod={1 if mod else 0}",
+                f"room-id={abs(hash(channel)) % 10**8}",
+                "subscriber=0",
+                f"tmi-sent-ts={int(time.time() * 1000)}",
+                "turbo=0",
+                f"user-id={abs(hash(user)) % 10**8}",
+                "user-type=",
+            ]
+        )
+        return f"@{tags} :{user}!{user}@{user}.{SERVER} PRIVMSG #{channel} :{content}"
+
+    async def say(
+        self, channel: str, user: str, content: str, mod: bool = False
+    ) -> None:
+        """
+        Send a chat message to every client in the channel.
+        """
+        channel = channel.lower()
+        line = self.format_message(channel, user, content, mod)
+        for client in list(self.clients):
+            if channel in client.channels:
+                await self.send_lines(client, [line])
+
+    async def generate(
+        self,
+        channel: str,
+        rate: float,
+        count: int,
+        make_message: Callable[[int], tuple[str, str]],
+    ) -> None:
+        """
+        Send count messages at rate per second; make_message gives the user and content of each.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for index in range(count):
+            due = started + index / rate
+            if due > loop.time():
+                await asyncio.sleep(due - loop.time())
+            user, content = make_message(index)
+            await self.say(channel, user, content)
+
+    async def replay(self, events: Iterable[chat_event], speed: float = 1.0) -> None:
+        """
+        Send timed chat events, speed times faster than they happened; 0 sends them all at once.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for event in events:
+            if speed:
+                due = started + event.offset / speed
+                if due > loop.time():
+                    await asyncio.sleep(due - loop.time())
+            await self.say(event.channel, event.user, event.content, event.mod)
+
+    async def request_reconnect(self) -> None:
+        """
+        Ask every client to reconnect, as Twitch does before maintenance.
+        """
+        for client in list(self.clients):
+            await self.send_lines(client, [f":{SERVER} RECONNECT"])
+
+    async def disconnect_all(self) -> None:
+        """
+        Drop every connection without warning.
+        """
+        for client in list(self.clients):
+            await client.websocket.close()
+
+    def messages_to(self, channel: str) -> List[str]:
+        """
+        What the bot sent to a channel which was delivered.
+        """
+        return [
+            message.content
+            for message in self.sent
+            if message.channel == channel and not message.refused
+        ]
@@ -1,7 +1,26 @@
 from __future__ import annotations
 
 import dataclasses
-import yaml
+import json
+import os
+
+from typing import Dict, List
+
+# Parsing YAML costs more than everything else in a cold start's config load,
+# so the checked settings are kept as JSON until the file changes. They go in
+# the user's cache directory, or this one if set, never beside the config
+CACHE_DIR_VARIABLE = "FOXBOT_CACHE_DIR"
+CACHE_VERSION = 3
+
+# Accepted YAML types for each kind of setting; ints are fine for floats
+SETTING_TYPES = {
+    "str": (str,),
+    "bool": (bool,),
+    "int": (int,),
+    "float": (int, float),
+    "list": (list,),
+    "dict": (dict,),
+}
 
 
 @dataclasses.dataclass(frozen=True)
@@ -9,17 +28,206 @@ class Config:
     default_channel: str = dataclasses.field(default="")
     prefix: str = dataclasses.field(default="!")
     live_mode: bool = dataclasses.field(default=False)
+    live_feed_interval: float = dataclasses.field(default=0.5)
+    live_feed_max_lines: int = dataclasses.field(default=20)
     use_latest_reply: bool = dataclasses.field(default=True)
     report_invalid: bool = dataclasses.field(default=False)
     stopguess_delay: int = dataclasses.field(default=5)
+    # Close rounds this many seconds after they open; 0 leaves them open until stopped
+    round_duration: int = dataclasses.field(default=0)
     closest_without_going_over: bool = dataclasses.field(default=False)
+    compact_guesses: bool = dataclasses.field(default=False)
+    # Rounds this large move to the NumPy store, whose stats are full passes
+    # over every guess; 0 keeps to the sorted stores and their running aggregates
+    numpy_threshold: int = dataclasses.field(default=0)
+    journal_path: str = dataclasses.field(default="")
+    journal_flush_interval: float = dataclasses.field(default=1.0)
+    # Record all incoming chat to this file, for replaying with tools/replay_chat.py
+    record_path: str = dataclasses.field(default="")
+    # Mods may add the guesses in files from here with !importguesses; empty allows none
+    guess_import_path: str = dataclasses.field(default="")
+    # SQLite database of finished rounds, for leaderboards; empty keeps no history
+    history_path: str = dataclasses.field(default="")
+    # Points across rounds, for !rank and !top, kept here; empty keeps none
+    standings_path: str = dataclasses.field(default="")
+    # Points for the winners of a round, and an exact guess's bonus on top
+    points_closest: int = dataclasses.field(default=3)
+    points_exact: int = dataclasses.field(default=2)
+    # Points for the places after the winners, as [last place, points] bands
+    points_bands: list = dataclasses.field(default_factory=lambda: [[3, 2], [10, 1]])
+    # Each chatter may send flood_burst messages at once, then flood_rate a second;
+    # a rate of 0 sets no limit
+    flood_rate: float = dataclasses.field(default=1.0)
+    flood_burst: int = dataclasses.field(default=5)
+    # A chatter repeating a message within this many seconds is ignored; 0 allows repeats
+    duplicate_window: float = dataclasses.field(default=10.0)
+    # Chatters tracked for flood control; the longest idle are forgotten past this
+    flood_max_chatters: int = dataclasses.field(default=50000)
+    ingest_queue_size: int = dataclasses.field(default=10000)
+    ingest_batch_size: int = dataclasses.field(default=500)
+    send_rate_limit: int = dataclasses.field(default=20)
+    send_rate_period: float = dataclasses.field(default=30.0)
+    worker_processes: int = dataclasses.field(default=1)
+    # Seconds between checks of the config file for changes; 0 never reloads
+    config_poll_interval: float = dataclasses.field(default=2.0)
+    # Connect to this websocket URL instead of Twitch, logging in as chat_nick
+    chat_server: str = dataclasses.field(default="")
+    chat_nick: str = dataclasses.field(default="foxbot")
+    # Serve metrics at http://metrics_host:metrics_port/metrics; 0 serves none
+    metrics_port: int = dataclasses.field(default=0)
+    metrics_host: str = dataclasses.field(default="127.0.0.1")
+    # Where reports from the profile commands are written, and their longest run
+    profile_path: str = dataclasses.field(default="profiles")
+    profile_max_seconds: int = dataclasses.field(default=300)
+    # Further channels to join, each with any settings which differ for it
+    channels: dict = dataclasses.field(default_factory=dict)
 
     def asdict(self) -> None:
         return dataclasses.asdict(self)
 
+    def channel_names(self) -> List[str]:
+        names = [self.default_channel] if self.default_channel else []
+        names.extend(name for name in self.channels if name != self.default_channel)
+        return names
+
+    def for_channel(self, name: str) -> Config:
+        """
+        The config for a channel, with its overrides applied.
+        Channels without overrides share this config.
+        """
+        overrides = self.channels.get(name)
+        if not overrides:
+            return self
+        return dataclasses.replace(self, **overrides)
+
+
+# Settings only read when the bot starts; reloading the config leaves them as they were
+RESTART_SETTINGS = (
+    "live_mode",
+    "live_feed_interval",
+    "live_feed_max_lines",
+    "journal_path",
+    "record_path",
+    "history_path",
+    "standings_path",
+    "ingest_queue_size",
+    "ingest_batch_size",
+    "send_rate_limit",
+    "send_rate_period",
+    "worker_processes",
+    "config_poll_interval",
+    "chat_server",
+    "chat_nick",
+    "metrics_port",
+    "metrics_host",
+    "profile_path",
+)
+
+
+def check_settings(settings: Dict[str, object], where: str = "config") -> None:
+    """
+    Check every setting is one Config has, of the type it takes; raises ValueError if not.
+    """
+    fields = {field.name: field.type for field in dataclasses.fields(Config)}
+    for name, value in settings.items():
+        kind = fields.get(name)
+        if kind is None:
+            raise ValueError(f"Unknown setting {name} in {where}")
+        # bool is an int to Python, but not to anyone writing a config
+        if not isinstance(value, SETTING_TYPES[kind]) or (
+            isinstance(value, bool) and kind != "bool"
+        ):
+            raise ValueError(f"Setting {name} in {where} should be a {kind}")
+
+    check_points_bands(settings.get("points_bands", []), where)
+    check_channel_overrides(settings.get("channels", {}))
+
+
+def check_points_bands(bands: list, where: str) -> None:
+    for band in bands:
+        if not (
+            isinstance(band, list)
+            and len(band) == 2
+            and all(isinstance(i, int) and not isinstance(i, bool) for i in band)
+        ):
+            raise ValueError(
+                f"Points band {band} in {where} should be a [last place, points] pair"
+            )
+
+
+def check_channel_overrides(channels: Dict[str, object]) -> None:
+    for channel, overrides in channels.items():
+        if not isinstance(channel, str):
+            raise ValueError(f"Channel name {channel} should be a str")
+        if overrides is not None:
+            if not isinstance(overrides, dict):
+                raise ValueError(f"Settings for channel {channel} should be a dict")
+            if "channels" in overrides:
+                raise ValueError(f"Channel {channel} cannot have channels of its own")
+            check_settings(overrides, f"channel {channel}")
+
+
+def cache_path(filename: str | os.PathLike) -> str:
+    """
+    Where the cached settings for a config file are kept, named for its full path.
+    """
+    directory = os.environ.get(CACHE_DIR_VARIABLE)
+    if not directory:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        directory = os.path.join(base, "foxbot")
+
+    name = os.path.abspath(filename)
+    # Escaped rather than hashed, which would cost an import at every cold start
+    for char, escaped in (("%", "%25"), ("/", "%2F"), ("\\", "%5C"), (":", "%3A")):
+        name = name.replace(char, escaped)
+    return os.path.join(directory, f"{name}.json")
+
+
+def cache_key(filename: str | os.PathLike) -> list:
+    """
+    What the cached settings were made from: the file as it was, and this Config.
+    """
+    stat = os.stat(filename)
+    fields = [field.name for field in dataclasses.fields(Config)]
+    return [CACHE_VERSION, stat.st_mtime_ns, stat.st_size, fields]
+
+
+def read_cached_settings(filename: str | os.PathLike) -> Dict[str, object] | None:
+    try:
+        with open(cache_path(filename), "r", encoding="utf-8") as cache_file:
+            cached = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    if cached.get("key") != cache_key(filename):
+        return None
+    return cached["settings"]
+
+
+def write_cached_settings(
+    filename: str | os.PathLike, key: list, settings: Dict[str, object]
+) -> None:
+    path = cache_path(filename)
+    temp_path = f"{path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as cache_file:
+            json.dump({"key": key, "settings": settings}, cache_file)
+        os.replace(temp_path, path)
+    except OSError:
+        # Only a cache; without anywhere to write it, the file is parsed every time
+        pass
+
+
+def load_config_from_file(filename: str | os.PathLike) -> Config:
+    settings = read_cached_settings(filename)
+    if settings is None:
+        # Only needed when the file has changed
+        import yaml  # pylint: disable=C0415
 
-def load_config_from_file(filename: str) -> Config:
-    with open(filename, "r") as yaml_file:
-        config_dict = yaml.safe_load(yaml_file)
+        key = cache_key(filename)
+        with open(filename, "r") as yaml_file:
+            settings = yaml.safe_load(yaml_file) or {}
+        check_settings(settings, str(filename))
+        write_cached_settings(filename, key, settings)
 
-    return Config(**config_dict)
+    return Config(**settings)
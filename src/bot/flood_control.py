@@ -0,0 +1,128 @@
+"""
+Flood control for chat, checked before a message is parsed.
+
+Each chatter has a token bucket: they may send a burst of messages at once,
+then a steady rate after. A chatter sending the same message again within
+the duplicate window is ignored too, compared by the hash of the message, so
+a copy-pasted guess spammed in a hype moment costs a dictionary lookup and a
+hash rather than a parse, a log line and a guess store update.
+
+Chatters are kept in least recently seen order, and the longest idle are
+forgotten once too many are tracked, so a raid of thousands of one-message
+chatters cannot grow this without bound. A forgotten chatter starts again
+with a full bucket, which is all an idle chatter would have had anyway.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, Hashable
+
+
+class chatter_state:
+    __slots__ = ("tokens", "updated", "last_hash", "last_seen")
+
+    # Messages the chatter may send right now, as of updated
+    tokens: float
+    updated: float
+    # Hash of their last message let through, and when it or a copy was last sent
+    last_hash: int | None
+    last_seen: float
+
+    def __init__(self, tokens: float, now: float) -> None:
+        self.tokens = tokens
+        self.updated = now
+        self.last_hash = None
+        self.last_seen = now
+
+
+class flood_control:
+    """
+    Per-chatter rate limits and repeat suppression, for a bounded number of chatters.
+    Times are in seconds, from any clock which only goes forwards.
+    """
+
+    rate: float
+    burst: int
+    duplicate_window: float
+    max_chatters: int
+    chatters: OrderedDict[Hashable, chatter_state]
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: int = 5,
+        duplicate_window: float = 10.0,
+        max_chatters: int = 50000,
+    ) -> None:
+        self.chatters = OrderedDict()
+        self.suppressed_rate = 0
+        self.suppressed_duplicate = 0
+        self.evicted = 0
+
+        self.configure(rate, burst, duplicate_window, max_chatters)
+
+    def configure(
+        self, rate: float, burst: int, duplicate_window: float, max_chatters: int
+    ) -> None:
+        """
+        Change the limits, keeping what is known of each chatter.
+        A rate or duplicate window of 0 turns that check off.
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.duplicate_window = duplicate_window
+        self.max_chatters = max(1, max_chatters)
+        while len(self.chatters) > self.max_chatters:
+            self.chatters.popitem(last=False)
+            self.evicted += 1
+
+    @property
+    def suppressed(self) -> int:
+        return self.suppressed_rate + self.suppressed_duplicate
+
+    def allow(self, chatter: Hashable, content: str, now: float) -> bool:
+        """
+        Whether a chatter's message should be handled, or dropped as flooding.
+        Chatters are limited separately for each key they are given by.
+        """
+        chatters = self.chatters
+        state = chatters.get(chatter)
+        if state is None:
+            state = chatters[chatter] = chatter_state(self.burst, now)
+            if len(chatters) > self.max_chatters:
+                chatters.popitem(last=False)
+                self.evicted += 1
+        else:
+            chatters.move_to_end(chatter)
+
+        content_hash = hash(content)
+        if (
+            state.last_hash == content_hash
+            and now - state.last_seen < self.duplicate_window
+        ):
+            # Kept suppressed for as long as the copies keep coming
+            state.last_seen = now
+            self.suppressed_duplicate += 1
+            return False
+
+        if self.rate:
+            tokens = min(self.burst, state.tokens + (now - state.updated) * self.rate)
+            state.updated = now
+            if tokens < 1:
+                state.tokens = tokens
+                self.suppressed_rate += 1
+                return False
+            state.tokens = tokens - 1
+
+        state.last_hash = content_hash
+        state.last_seen = now
+        return True
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "chatters": len(self.chatters),
+            "suppressed_rate": self.suppressed_rate,
+            "suppressed_duplicate": self.suppressed_duplicate,
+            "evicted": self.evicted,
+        }
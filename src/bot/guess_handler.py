@@ -1,72 +1,120 @@
 from __future__ import annotations
 
-from typing import Dict, List, Set
+from typing import Dict, Iterable, List, Mapping, Set, Tuple
 
-import statistics
+from bot.guess_store import compact_guess_store, dict_guess_store, guess_store
 
 
 class guess_handler:
     use_latest_reply: bool
-    guesses: Dict
+    store: guess_store
+    numpy_threshold: int
 
-    def __init__(self, use_latest_reply: bool = True):
+    def __init__(
+        self,
+        use_latest_reply: bool = True,
+        compact: bool = False,
+        numpy_threshold: int = 0,
+    ):
         self.use_latest_reply = use_latest_reply
-        self.guesses = {}
+        self.store = compact_guess_store() if compact else dict_guess_store()
+        # Move to the NumPy store once this many guesses are held; 0 never moves
+        self.numpy_threshold = numpy_threshold
 
-    def accept_guess(self, name: str, value: int) -> None:
-        if self.use_latest_reply:
-            self.guesses[name] = value
-        else:
-            if name not in self.guesses:
-                self.guesses[name] = value
+    @property
+    def guesses(self) -> Mapping[str, int]:
+        return self.store.guesses
+
+    def accept_guess(self, name: str, value: int) -> bool:
+        """
+        Record a guess; returns False if it was ignored as a repeat.
+        """
+        accepted = self.store.put(name, value, self.use_latest_reply)
+
+        if self.numpy_threshold and len(self.store) >= self.numpy_threshold:
+            self.switch_to_numpy()
+        return accepted
+
+    def accept_guesses(
+        self, guesses: Iterable[Tuple[str, int]]
+    ) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+        """
+        Record a batch of guesses in one call.
+        Returns the guesses that were kept, and those too large for the store.
+        """
+        accepted, too_large = self.store.put_many(guesses, self.use_latest_reply)
+
+        if self.numpy_threshold and len(self.store) >= self.numpy_threshold:
+            self.switch_to_numpy()
+        return accepted, too_large
+
+    def switch_to_numpy(self) -> bool:
+        """
+        Move the guesses into the NumPy store, if NumPy is installed.
+        Returns whether the NumPy store is now in use.
+        """
+        # Only ever try once per round
+        self.numpy_threshold = 0
+
+        from bot import numpy_guess_store  # pylint: disable=C0415
+
+        if isinstance(self.store, numpy_guess_store.numpy_guess_store):
+            return True
+        if not numpy_guess_store.available():
+            return False
+
+        try:
+            self.store = numpy_guess_store.numpy_guess_store.from_store(self.store)
+        except OverflowError:
+            # Some guess is too large for 64-bit arrays; stay as we are
+            return False
+        return True
 
     def get_score(
         self, value: float, closest_without_going_over: bool
     ) -> (List[str], Set[int]):
         # Find the score value to use as a result
-        raw_values = list(self.guesses.values())
-        raw_values.sort()
-
-        if closest_without_going_over:
-            # Which value is the closest value that isn't over
-            # Note, raw_values are sorted; let's find the value before that
-            result_values = raw_values[0]
-            last_i = raw_values[0]
-            for i in raw_values[1:]:
-                if value < i:
-                    result_values = last_i
-                    break
-                last_i = i
-            result_values = set([result_values])
-        else:
-            diffs = [abs(i - value) for i in raw_values]
-            min_diff = min(diffs)
-            result_values = []
-            for i_indx in range(len(diffs)):
-                if diffs[i_indx] == min_diff:
-                    result_values.append(raw_values[i_indx])
-            result_values = set(result_values)
+        result_values = self.store.closest_values(value, closest_without_going_over)
 
         result_names = []
-        for i_name in self.guesses:
-            if self.guesses[i_name] in result_values:
-                result_names.append(i_name)
+        for i_value in sorted(result_values):
+            result_names.extend(self.store.names_for(i_value))
 
         return (result_names, result_values)
 
+    def placings(
+        self, value: float, closest_without_going_over: bool, places: int
+    ) -> List[Tuple[int, int, List[str]]]:
+        """
+        The guesses placing up to the given place, closest first, as (place, value, names).
+        Guesses the same distance away share a place, and each place after
+        counts everyone ahead of it, so the winners are all in first place.
+        """
+        placed = []
+        ahead = 0
+        distance = None
+        for i_value in self.store.values_by_closeness(
+            value, closest_without_going_over
+        ):
+            # Without going over, each value has a place of its own
+            if closest_without_going_over or abs(i_value - value) != distance:
+                distance = abs(i_value - value)
+                place = ahead + 1
+                if place > places:
+                    break
+            names = list(self.store.names_for(i_value))
+            placed.append((place, i_value, names))
+            ahead += len(names)
+        return placed
+
     def num_replies(self) -> int:
-        return len(self.guesses)
+        return len(self.store)
 
     def stats(self) -> Dict[str, int | float]:
-        raw_values = list(self.guesses.values())
-
-        return {
-            "count": self.num_replies(),
-            "min": min(raw_values),
-            "max": max(raw_values),
-            "mean": statistics.mean(raw_values),
-            "stdev": statistics.stdev(raw_values),
-            "median": statistics.median(raw_values),
-            "multimode": statistics.multimode(raw_values),
-            "quartiles": statistics.quantiles(raw_values, n=4),
-        }
+        return self.store.stats()
+
+    def percentiles(self, points: Iterable[int]) -> Dict[int, float]:
+        return self.store.percentiles(points)
+
+    def histogram(self, bins: int) -> List[Tuple[int, int, int]]:
+        return self.store.histogram(bins)
@@ -0,0 +1,129 @@
+"""
+Single-pass classifier for chat messages during a guessing round.
+
+Replaces the regular expressions on the message hot path. Most chat is not
+a guess, and is rejected after looking at its first character or two;
+guesses have their number parsed once, here, and the value is passed on.
+
+The accepted forms match the original regular expression:
+a number at the very start of the message ("1234", "+12 surely"),
+or the guess command followed by one ("!guess 1234").
+
+Guesses brought in from elsewhere in bulk are read by parse_entries instead.
+"""
+
+from __future__ import annotations
+
+from typing import List, Tuple
+
+import os
+
+
+class guess_parser:
+    """
+    Classifies messages for a given command prefix.
+
+    parse() returns the guessed value (zero or more) for a valid guess,
+    None for a message which is not a guess at all,
+    INVALID for a guess which is not a positive whole number,
+    or MALFORMED for a guess command without a number.
+    """
+
+    INVALID = -1
+    MALFORMED = -2
+
+    __slots__ = ("prefix", "guess_command", "command_length", "command_start")
+
+    prefix: str
+    guess_command: str
+    command_length: int
+    command_start: str
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix
+        self.guess_command = (prefix + "guess ").lower()
+        self.command_length = len(self.guess_command)
+        # Only messages starting with this (either case) can be the guess command
+        self.command_start = self.guess_command[:1]
+
+    def parse(self, content: str) -> int | None:
+        if not content:
+            return None
+
+        first = content[0]
+        if first.isdecimal():
+            return self.parse_value(content)
+        if first in "+-":
+            if content[1:2].isdecimal():
+                return self.parse_value(content)
+            return None
+        if first.lower() == self.command_start:
+            if content[: self.command_length].lower() == self.guess_command:
+                value = self.parse_value(content[self.command_length :])
+                return self.MALFORMED if value is None else value
+        return None
+
+    def parse_value(self, text: str) -> int | None:
+        """
+        Parse the number at the start of text.
+        Returns None if there is no number there.
+        """
+        start = 1 if text[:1] in ("+", "-") else 0
+        end = start
+        length = len(text)
+        while end < length and text[end].isdecimal():
+            end += 1
+
+        if end == start:
+            return None
+        if end < length and text[end] == ".":
+            # A decimal point; the original pattern took this as a non-integer
+            return self.INVALID
+
+        try:
+            value = int(text[:end])
+        except ValueError:
+            # Beyond the interpreter's limit on digits for int()
+            return self.INVALID
+        if value < 0:
+            return self.INVALID
+        return value
+
+
+def chat_name(name: str) -> str:
+    """
+    A name as chat gives it, lower case and without @, however it was typed.
+    """
+    return name.lstrip("@").lower()
+
+
+def parse_entries(text: str) -> Tuple[List[Tuple[str, int]], List[str]]:
+    """
+    Parse guesses given in bulk as name=guess, or name,guess as a spreadsheet saves them,
+    separated by spaces or new lines. Names are matched to chat names: lower case, without @.
+    Returns the (name, guess) pairs in order, and the entries which are not valid guesses.
+    """
+    entries = []
+    invalid = []
+    for entry in text.split():
+        name, separator, value = entry.partition("=")
+        if not separator:
+            name, separator, value = entry.partition(",")
+        name = chat_name(name)
+        if not name or not value.isdecimal():
+            invalid.append(entry)
+            continue
+        try:
+            entries.append((name, int(value)))
+        except ValueError:
+            # Beyond the interpreter's limit on digits for int()
+            invalid.append(entry)
+    return entries, invalid
+
+
+def read_entries(path: str | os.PathLike) -> Tuple[List[Tuple[str, int]], List[str]]:
+    """
+    Parse a file of guesses given in bulk, as parse_entries.
+    """
+    with open(path, "r", encoding="utf-8") as entries_file:
+        return parse_entries(entries_file.read())
@@ -0,0 +1,951 @@
+"""
+Storage for the guesses made in a round.
+
+Each store keeps the guesses in a sorted index alongside running aggregates,
+so that scoring and stats never need to look at every guess.
+Percentiles and histograms are read from the sorted index too, so they are
+exact however large the round is.
+dict_guess_store keeps names and values as ordinary Python objects;
+compact_guess_store packs them into typed arrays for very large rounds.
+An optional NumPy store lives in bot.numpy_guess_store.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator, Mapping
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+import abc
+import bisect
+import heapq
+import itertools
+import math
+import operator
+
+# Batches at least this large, and a good share of the store, rebuild the
+# sorted index once instead of inserting into it one guess at a time
+REBUILD_BATCH = 1024
+# Only the smallest of the most guessed values are listed, however many tie
+MAX_MULTIMODE = 10
+
+
+class guess_store(Mapping):
+    """
+    Read-only mapping of name to guess, plus the operations guess_handler needs.
+
+    Every store keeps an exact running total and total of squares,
+    which is all that the mean and standard deviation need.
+    Mapping is already an abstract base class, so a store which leaves out
+    any of the abstract methods fails when it is made, not when it is used.
+    """
+
+    __slots__ = ("total", "total_squares")
+
+    total: int
+    total_squares: int
+
+    min_value: int | None = None
+    max_value: int | None = None
+
+    def __init__(self) -> None:
+        # Running aggregates for stats(); guesses are ints so these stay exact
+        self.total = 0
+        self.total_squares = 0
+
+    @property
+    def guesses(self) -> Mapping[str, int]:
+        return self
+
+    @abc.abstractmethod
+    def put(self, name: str, value: int, replace: bool) -> bool:
+        """
+        Record a guess, replacing any earlier guess from the same name if asked.
+        Returns whether the guess was stored.
+        """
+        raise NotImplementedError
+
+    def put_many(
+        self, guesses: Iterable[Tuple[str, int]], replace: bool
+    ) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+        """
+        Record guesses in order, as put would one at a time.
+        Returns the guesses that were stored, and those too large for the store.
+        """
+        put = self.put
+        accepted = []
+        too_large = []
+        for name, value in guesses:
+            try:
+                if put(name, value, replace):
+                    accepted.append((name, value))
+            except OverflowError:
+                too_large.append((name, value))
+        return accepted, too_large
+
+    @abc.abstractmethod
+    def closest_values(
+        self, value: float, closest_without_going_over: bool
+    ) -> Set[int]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def values_by_closeness(
+        self, value: float, closest_without_going_over: bool
+    ) -> Iterator[int]:
+        """
+        Distinct guessed values, closest to the value first, as closest_values judges it.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def names_for(self, value: int) -> Iterable[str]:
+        """
+        Names that guessed the value, in the order those guesses were made.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def count_of(self, value: int) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def sorted_entries(self) -> Iterator[Tuple[str, int]]:
+        """
+        Yields (name, value) in ascending value order, and in guess order within a value.
+        Replaying these into an empty store reproduces this one.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stats(self) -> Dict[str, int | float]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def percentiles(self, points: Iterable[int]) -> Dict[int, float]:
+        """
+        The given percentiles (1 to 99), as statistics.quantiles(values, n=100) gives them.
+        Empty if there are fewer than two guesses.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def histogram(self, bins: int) -> List[Tuple[int, int, int]]:
+        """
+        Counts of guesses in at most the given number of equal ranges,
+        as (lowest, highest, count), covering every guess from the smallest to the largest.
+        """
+        raise NotImplementedError
+
+    def _check_value(self, value: int) -> None:
+        if self.min_value is not None and not (
+            self.min_value <= value <= self.max_value
+        ):
+            raise OverflowError(f"Guess {value} is outside the range of this store")
+
+
+def summary_stats(
+    store: guess_store, value_at: Callable[[int], int], multimode: List[int]
+) -> Dict[str, int | float]:
+    """
+    Summary statistics for a store, given a lookup of the n-th smallest value.
+    Values which are undefined for so few guesses are reported as None.
+    """
+    count = len(store)
+
+    if not count:
+        return {
+            "count": 0,
+            "min": None,
+            "max": None,
+            "mean": None,
+            "stdev": None,
+            "median": None,
+            "multimode": [],
+            "quartiles": [],
+        }
+
+    return {
+        "count": count,
+        "min": value_at(0),
+        "max": value_at(count - 1),
+        "mean": _mean(count, store.total),
+        "stdev": _stdev(count, store.total, store.total_squares),
+        "median": _median(count, value_at),
+        "multimode": multimode,
+        "quartiles": quantiles(count, 4, value_at),
+    }
+
+
+def order_statistics_needed(count: int) -> List[int]:
+    """
+    The positions in sorted order which summary_stats will look up.
+    """
+    positions = {0, count - 1, (count - 1) // 2, count // 2}
+    for i in range(1, 4):
+        j = min(max(i * (count + 1) // 4, 1), count - 1)
+        positions.update((j - 1, j))
+    return sorted(i for i in positions if 0 <= i < count)
+
+
+def _mean(count: int, total: int) -> int | float:
+    # Matches statistics.mean, which keeps an exact integer mean as an int
+    if total % count == 0:
+        return total // count
+    return total / count
+
+
+def _stdev(count: int, total: int, total_squares: int) -> float | None:
+    # Sample standard deviation, as statistics.stdev
+    if count < 2:
+        return None
+    sum_sq_diff = count * total_squares - total * total
+    return math.sqrt(sum_sq_diff / (count * (count - 1)))
+
+
+def _median(count: int, value_at: Callable[[int], int]) -> int | float:
+    half = count // 2
+    if count % 2:
+        return value_at(half)
+    return (value_at(half - 1) + value_at(half)) / 2
+
+
+def quantiles(count: int, n: int, value_at: Callable[[int], int]) -> List[float]:
+    """
+    Cut points dividing the guesses into n groups, using the same
+    "exclusive" interpolation as statistics.quantiles.
+    """
+    if count < 2:
+        return []
+    return [quantile_cut(count, i, n, value_at) for i in range(1, n)]
+
+
+def quantile_positions(count: int, i: int, n: int) -> Tuple[int, int]:
+    """
+    The two neighbouring positions in sorted order which the i-th of n cut points lies between.
+    """
+    j = min(max(i * (count + 1) // n, 1), count - 1)
+    return j - 1, j
+
+
+def quantile_cut(count: int, i: int, n: int, value_at: Callable[[int], int]) -> float:
+    low_position, high_position = quantile_positions(count, i, n)
+    delta = i * (count + 1) - high_position * n
+    low, high = value_at(low_position), value_at(high_position)
+    return (low * (n - delta) + high * delta) / n
+
+
+def percentiles_from(
+    count: int, points: Iterable[int], value_at: Callable[[int], int]
+) -> Dict[int, float]:
+    if count < 2:
+        return {}
+    return {point: quantile_cut(count, point, 100, value_at) for point in points}
+
+
+def histogram_ranges(lowest: int, highest: int, bins: int) -> List[Tuple[int, int]]:
+    """
+    Split lowest to highest into at most the given number of equal whole-number ranges.
+    """
+    width = max(-(-(highest - lowest + 1) // bins), 1)
+    return [
+        (start, min(start + width - 1, highest))
+        for start in range(lowest, highest + 1, width)
+    ]
+
+
+def pick_closest(value: float, candidates: Iterable[int]) -> Set[int]:
+    """
+    The candidates nearest to value; ties give more than one.
+    """
+    candidates = list(candidates)
+    min_diff = min(abs(i - value) for i in candidates)
+    return set(i for i in candidates if abs(i - value) == min_diff)
+
+
+def closeness_order(
+    value: float,
+    closest_without_going_over: bool,
+    count: int,
+    value_at: Callable[[int], int],
+    bisect_left: Callable[[float], int],
+    bisect_right: Callable[[float], int],
+) -> Iterator[int]:
+    """
+    Distinct values of a sorted sequence, walking out from the value.
+    Of two values the same distance away, the lower comes first.
+    Without going over, every value under comes first, then those over.
+    """
+    # Entries before below are at or under the value; those from above are over it
+    below = above = bisect_right(value)
+    while below > 0 or above < count:
+        under = value_at(below - 1) if below > 0 else None
+        over = value_at(above) if above < count else None
+        if over is None or (
+            under is not None
+            and (closest_without_going_over or value - under <= over - value)
+        ):
+            yield under
+            below = bisect_left(under)
+        else:
+            yield over
+            above = bisect_right(over)
+
+
+class sorted_guess_store(guess_store):
+    """
+    Store backed by a sorted index, with the shared scoring and stats logic.
+
+    Subclasses provide the containers, through _lookup, _insert and _delete,
+    positional lookups into the sorted index, and the value to names lookups
+    used to find winners.
+    """
+
+    __slots__ = ("values_by_count", "max_count")
+
+    values_by_count: Dict[int, Set[int] | value_blocks]
+    max_count: int
+
+    def __init__(self) -> None:
+        super().__init__()
+        # How many times each value was guessed, bucketed by that count
+        self.values_by_count = {}
+        self.max_count = 0
+
+    def put(self, name: str, value: int, replace: bool) -> bool:
+        previous = self._lookup(name)
+        if previous is not None:
+            if not replace:
+                return False
+            self._check_value(value)
+            self._delete(name, previous)
+            self.total -= previous
+            self.total_squares -= previous * previous
+            count = self.count_of(previous)
+            self._move_count(previous, count + 1, count)
+        else:
+            self._check_value(value)
+
+        self._insert(name, value)
+        self.total += value
+        self.total_squares += value * value
+        count = self.count_of(value)
+        self._move_count(value, count - 1, count)
+        return True
+
+    def put_many(
+        self, guesses: Iterable[Tuple[str, int]], replace: bool
+    ) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+        guesses = list(guesses)
+        if len(guesses) < max(REBUILD_BATCH, len(self) // 4):
+            return super().put_many(guesses, replace)
+
+        # The batch's own guesses, in the order they were last stored
+        kept: Dict[str, int] = {}
+        accepted = []
+        too_large = []
+        lookup = self._lookup
+        for name, value in guesses:
+            previous = kept.get(name)
+            if previous is None:
+                previous = lookup(name)
+            if previous is not None and not replace:
+                continue
+            try:
+                self._check_value(value)
+            except OverflowError:
+                too_large.append((name, value))
+                continue
+            kept.pop(name, None)
+            kept[name] = value
+            accepted.append((name, value))
+
+        if kept:
+            # Every guess in sorted order: those kept from before, then the batch's,
+            # so names sharing a value stay in the order they guessed
+            entries = [entry for entry in self.sorted_entries() if entry[0] not in kept]
+            entries.extend(kept.items())
+            entries.sort(key=operator.itemgetter(1))
+            self._rebuild(entries, accepted)
+        return accepted, too_large
+
+    def _rebuild(
+        self, entries: List[Tuple[str, int]], stored: List[Tuple[str, int]]
+    ) -> None:
+        """
+        Replace the index with the given entries, in sorted order, after a bulk put
+        of the stored guesses. Subclasses rebuild their containers and call this.
+        """
+        values = [value for _, value in entries]
+        self.total = sum(values)
+        self.total_squares = sum(value * value for value in values)
+
+        # Values come in order, so each bucket is filled in order too
+        by_count: Dict[int, List[int]] = {}
+        for value, run in itertools.groupby(values):
+            by_count.setdefault(sum(1 for _ in run), []).append(value)
+        self.values_by_count = {
+            count: self._new_bucket(bucket) for count, bucket in by_count.items()
+        }
+        self.max_count = max(by_count, default=0)
+
+    @abc.abstractmethod
+    def _lookup(self, name: str) -> int | None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _insert(self, name: str, value: int) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _delete(self, name: str, value: int) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _bisect_left(self, value: float) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _bisect_right(self, value: float) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _value_at(self, index: int) -> int:
+        raise NotImplementedError
+
+    def _new_bucket(self, values: List[int]) -> Set[int] | value_blocks:
+        """
+        A frequency bucket holding the given values, which are in ascending order.
+        """
+        return set(values)
+
+    def _move_count(self, value: int, old_count: int, new_count: int) -> None:
+        """
+        Move a value between frequency buckets, keeping max_count current.
+        Counts only ever change by one, so the top bucket is easy to track.
+        """
+        if old_count:
+            bucket = self.values_by_count[old_count]
+            bucket.discard(value)
+            if not bucket:
+                del self.values_by_count[old_count]
+                if old_count == self.max_count and new_count < old_count:
+                    self.max_count = new_count
+        if new_count:
+            bucket = self.values_by_count.get(new_count)
+            if bucket is None:
+                bucket = self.values_by_count[new_count] = self._new_bucket([])
+            bucket.add(value)
+            self.max_count = max(self.max_count, new_count)
+
+    def closest_values(
+        self, value: float, closest_without_going_over: bool
+    ) -> Set[int]:
+        count = len(self)
+        if not count:
+            return set()
+
+        if closest_without_going_over:
+            # Which value is the closest value that isn't over
+            # If every guess is over, fall back to the lowest guess
+            index = self._bisect_right(value)
+            return set([self._value_at(max(index - 1, 0))])
+
+        # Only the values either side of the insertion point can be closest
+        index = self._bisect_left(value)
+        return pick_closest(
+            value,
+            (
+                self._value_at(i)
+                for i in range(max(index - 1, 0), min(index + 1, count))
+            ),
+        )
+
+    def values_by_closeness(
+        self, value: float, closest_without_going_over: bool
+    ) -> Iterator[int]:
+        return closeness_order(
+            value,
+            closest_without_going_over,
+            len(self),
+            self._value_at,
+            self._bisect_left,
+            self._bisect_right,
+        )
+
+    def stats(self) -> Dict[str, int | float]:
+        """
+        Summary statistics for the current guesses, read from the running aggregates.
+        """
+        if self.max_count == 1:
+            # Every value was guessed once, so the smallest are the first in the index
+            multimode = [
+                self._value_at(i) for i in range(min(len(self), MAX_MULTIMODE))
+            ]
+        else:
+            multimode = heapq.nsmallest(
+                MAX_MULTIMODE, self.values_by_count.get(self.max_count, ())
+            )
+        return summary_stats(self, self._value_at, multimode)
+
+    def percentiles(self, points: Iterable[int]) -> Dict[int, float]:
+        return percentiles_from(len(self), points, self._value_at)
+
+    def histogram(self, bins: int) -> List[Tuple[int, int, int]]:
+        count = len(self)
+        if not count:
+            return []
+
+        ranges = histogram_ranges(self._value_at(0), self._value_at(count - 1), bins)
+        return [
+            (lowest, highest, self._bisect_right(highest) - self._bisect_left(lowest))
+            for lowest, highest in ranges
+        ]
+
+
+class dict_guess_store(sorted_guess_store):
+    """
+    Guesses held in a plain dict, with a sorted index of values
+    and a reverse index of value to the names that guessed it.
+    """
+
+    __slots__ = ("_guesses", "sorted_index", "names_by_value")
+
+    _guesses: Dict[str, int]
+    sorted_index: list_blocks
+    names_by_value: Dict[int, Dict[str, None]]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._guesses = {}
+        # Every accepted value, kept in ascending order as guesses arrive
+        self.sorted_index = list_blocks()
+        # Reverse index of value to the names that guessed it, in arrival order
+        self.names_by_value = {}
+
+    @property
+    def guesses(self) -> Dict[str, int]:
+        return self._guesses
+
+    @property
+    def sorted_values(self) -> List[int]:
+        return list(self.sorted_index)
+
+    def __getitem__(self, name: str) -> int:
+        return self._guesses[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._guesses)
+
+    def __len__(self) -> int:
+        return len(self._guesses)
+
+    def _lookup(self, name: str) -> int | None:
+        return self._guesses.get(name)
+
+    def _insert(self, name: str, value: int) -> None:
+        self._guesses[name] = value
+        # Names come from names_by_value, so the index needs no tags of its own
+        self.sorted_index.insert(value, 0)
+        self.names_by_value.setdefault(value, {})[name] = None
+
+    def _delete(self, name: str, value: int) -> None:
+        self.sorted_index.remove(value, 0)
+
+        names = self.names_by_value[value]
+        del names[name]
+        if not names:
+            del self.names_by_value[value]
+
+    def _rebuild(
+        self, entries: List[Tuple[str, int]], stored: List[Tuple[str, int]]
+    ) -> None:
+        # Updated in place, so earlier guessers keep their place in the dict
+        self._guesses.update(stored)
+        self.sorted_index = list_blocks.from_sorted(
+            [value for _, value in entries], [0] * len(entries)
+        )
+        self.names_by_value = {}
+        for name, value in entries:
+            self.names_by_value.setdefault(value, {})[name] = None
+        super()._rebuild(entries, stored)
+
+    def count_of(self, value: int) -> int:
+        return len(self.names_by_value.get(value, ()))
+
+    def names_for(self, value: int) -> Iterable[str]:
+        return self.names_by_value.get(value, ())
+
+    def sorted_entries(self) -> Iterator[Tuple[str, int]]:
+        for value in sorted(self.names_by_value):
+            for name in self.names_by_value[value]:
+                yield name, value
+
+    def _bisect_left(self, value: float) -> int:
+        return self.sorted_index.bisect_left(value)
+
+    def _bisect_right(self, value: float) -> int:
+        return self.sorted_index.bisect_right(value)
+
+    def _value_at(self, index: int) -> int:
+        return self.sorted_index[index]
+
+
+class sorted_blocks:
+    """
+    Sorted sequence of 64-bit values, each carrying a 32-bit tag.
+
+    Entries are split into blocks of at most 2 * load, so an insert or delete
+    only shifts one small array rather than the whole index.
+    Equal values are kept in the order they were inserted.
+    """
+
+    __slots__ = ("value_blocks", "tag_blocks", "maxes", "offsets", "length")
+
+    value_blocks: List[array]
+    tag_blocks: List[array]
+    maxes: List[int]
+    offsets: List[int] | None
+    length: int
+
+    load = 1024
+
+    def __init__(self) -> None:
+        self.value_blocks = []
+        self.tag_blocks = []
+        # Last (largest) value of each block, for finding the right block
+        self.maxes = []
+        # Index of the first entry of each block; rebuilt lazily after changes
+        self.offsets = None
+        self.length = 0
+
+    @classmethod
+    def from_sorted(cls, values: array, tags: array) -> sorted_blocks:
+        """
+        Build from entries already in order, without inserting them one at a time.
+        """
+        blocks = cls()
+        for start in range(0, len(values), cls.load):
+            blocks.value_blocks.append(values[start : start + cls.load])
+            blocks.tag_blocks.append(tags[start : start + cls.load])
+            blocks.maxes.append(blocks.value_blocks[-1][-1])
+        blocks.length = len(values)
+        return blocks
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[int]:
+        return itertools.chain.from_iterable(self.value_blocks)
+
+    def tags(self) -> Iterator[int]:
+        """
+        Every tag, in the order of their values.
+        """
+        return itertools.chain.from_iterable(self.tag_blocks)
+
+    def __getitem__(self, index: int) -> int:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("sorted_blocks index out of range")
+
+        offsets = self._offsets()
+        block = bisect.bisect_right(offsets, index) - 1
+        return self.value_blocks[block][index - offsets[block]]
+
+    def insert(self, value: int, tag: int) -> None:
+        self.length += 1
+        self.offsets = None
+
+        if not self.maxes:
+            values, tags = self._new_block(value, tag)
+            self.value_blocks.append(values)
+            self.tag_blocks.append(tags)
+            self.maxes.append(value)
+            return
+
+        # First block with a larger value, so this goes after any equal values
+        block = min(bisect.bisect_right(self.maxes, value), len(self.maxes) - 1)
+        values = self.value_blocks[block]
+        index = bisect.bisect_right(values, value)
+        values.insert(index, value)
+        self.tag_blocks[block].insert(index, tag)
+        self.maxes[block] = values[-1]
+
+        if len(values) > 2 * self.load:
+            tags = self.tag_blocks[block]
+            self.value_blocks.insert(block + 1, values[self.load :])
+            self.tag_blocks.insert(block + 1, tags[self.load :])
+            del values[self.load :]
+            del tags[self.load :]
+            self.maxes.insert(block, values[-1])
+
+    def _new_block(self, value: int, tag: int) -> Tuple[array, array]:
+        return array("q", [value]), array("i", [tag])
+
+    def remove(self, value: int, tag: int) -> None:
+        for block, values, low, high in self._runs(value):
+            try:
+                index = self.tag_blocks[block].index(tag, low, high)
+            except ValueError:
+                continue
+
+            del values[index]
+            del self.tag_blocks[block][index]
+            if values:
+                self.maxes[block] = values[-1]
+            else:
+                del self.value_blocks[block]
+                del self.tag_blocks[block]
+                del self.maxes[block]
+            self.length -= 1
+            self.offsets = None
+            return
+
+        raise ValueError(f"{value} with tag {tag} not in sorted_blocks")
+
+    def bisect_left(self, value: float) -> int:
+        block = bisect.bisect_left(self.maxes, value)
+        if block == len(self.maxes):
+            return self.length
+        return self._offset(block) + bisect.bisect_left(self.value_blocks[block], value)
+
+    def bisect_right(self, value: float) -> int:
+        block = bisect.bisect_right(self.maxes, value)
+        if block == len(self.maxes):
+            return self.length
+        return self._offset(block) + bisect.bisect_right(
+            self.value_blocks[block], value
+        )
+
+    def count(self, value: int) -> int:
+        return sum(high - low for _, _, low, high in self._runs(value))
+
+    def tags_for(self, value: int) -> Iterator[int]:
+        for block, _, low, high in self._runs(value):
+            yield from self.tag_blocks[block][low:high]
+
+    def _offset(self, block: int) -> int:
+        return self._offsets()[block]
+
+    def _offsets(self) -> List[int]:
+        if self.offsets is None:
+            self.offsets = [0]
+            self.offsets.extend(
+                itertools.accumulate(len(block) for block in self.value_blocks[:-1])
+            )
+        return self.offsets
+
+    def _runs(self, value: int) -> Iterator[tuple[int, array, int, int]]:
+        """
+        Yields (block, values, low, high) for each block holding the given value,
+        where values[low:high] are the matching entries.
+        """
+        block = bisect.bisect_left(self.maxes, value)
+        while block < len(self.maxes) and self.value_blocks[block][0] <= value:
+            values = self.value_blocks[block]
+            low = bisect.bisect_left(values, value)
+            yield block, values, low, bisect.bisect_right(values, value, low)
+            block += 1
+
+
+class list_blocks(sorted_blocks):
+    """
+    sorted_blocks holding values of any size, in plain lists rather than typed arrays.
+    """
+
+    __slots__ = ()
+
+    def _new_block(self, value: int, tag: int) -> Tuple[List[int], List[int]]:
+        return [value], [tag]
+
+
+class value_blocks(sorted_blocks):
+    """
+    sorted_blocks used as a set of distinct values; the tags are unused.
+    """
+
+    __slots__ = ()
+
+    def _new_block(self, value: int, tag: int) -> Tuple[array, array]:
+        return array("q", [value]), array("b", [tag])
+
+    def add(self, value: int) -> None:
+        self.insert(value, 0)
+
+    def discard(self, value: int) -> None:
+        self.remove(value, 0)
+
+
+class intern_table:
+    """
+    Interning table giving each name a dense integer slot, in arrival order.
+
+    An open-addressed hash table of 32-bit slot numbers, so no int object
+    or dict entry is kept per name; the only per-name object is the name itself.
+    """
+
+    __slots__ = ("names", "table", "mask")
+
+    names: List[str]
+    table: array
+    mask: int
+
+    def __init__(self) -> None:
+        self.names = []
+        self.table = array("i", [-1]) * 8
+        self.mask = 7
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def find(self, name: str) -> int:
+        """
+        Returns the slot for the name, or -1 if it has not been seen.
+        """
+        table, names, mask = self.table, self.names, self.mask
+        index = hash(name) & mask
+        while True:
+            slot = table[index]
+            if slot < 0 or names[slot] == name:
+                return slot
+            index = (index + 1) & mask
+
+    def add(self, name: str) -> int:
+        """
+        Returns the slot for the name, giving it a new one if needed.
+        """
+        slot = self.find(name)
+        if slot >= 0:
+            return slot
+
+        slot = len(self.names)
+        self.names.append(name)
+        # Keep the table at most two thirds full so probes stay short
+        if 3 * len(self.names) > 2 * len(self.table):
+            self._grow()
+        else:
+            self._place(name, slot)
+        return slot
+
+    def _place(self, name: str, slot: int) -> None:
+        table, mask = self.table, self.mask
+        index = hash(name) & mask
+        while table[index] >= 0:
+            index = (index + 1) & mask
+        table[index] = slot
+
+    def _grow(self) -> None:
+        self.table = array("i", [-1]) * (2 * len(self.table))
+        self.mask = len(self.table) - 1
+        for slot, name in enumerate(self.names):
+            self._place(name, slot)
+
+
+class compact_guess_store(sorted_guess_store):
+    """
+    Guesses packed into typed arrays, for rounds with very many chatters.
+
+    Each name is interned once in a table that gives it a dense integer slot.
+    Values live in 64-bit arrays: one indexed by slot, and a sorted index
+    tagging each value with its slot so that winners can be named.
+    The frequency buckets behind the mode are packed the same way.
+    The interning table holds 32-bit slots, which is ample for one round.
+    Guesses outside the 64-bit range are rejected with OverflowError.
+    """
+
+    __slots__ = ("user_slots", "slot_values", "sorted_index")
+
+    user_slots: intern_table
+    slot_values: array
+    sorted_index: sorted_blocks
+
+    min_value = -(2**63)
+    max_value = 2**63 - 1
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.user_slots = intern_table()
+        self.slot_values = array("q")
+        self.sorted_index = sorted_blocks()
+
+    def __getitem__(self, name: str) -> int:
+        slot = self.user_slots.find(name)
+        if slot < 0:
+            raise KeyError(name)
+        return self.slot_values[slot]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.user_slots.names)
+
+    def __len__(self) -> int:
+        return len(self.user_slots)
+
+    def _lookup(self, name: str) -> int | None:
+        slot = self.user_slots.find(name)
+        if slot < 0:
+            return None
+        return self.slot_values[slot]
+
+    def _insert(self, name: str, value: int) -> None:
+        slot = self.user_slots.add(name)
+        if slot == len(self.slot_values):
+            self.slot_values.append(value)
+        else:
+            self.slot_values[slot] = value
+
+        self.sorted_index.insert(value, slot)
+
+    def _delete(self, name: str, value: int) -> None:
+        self.sorted_index.remove(value, self.user_slots.find(name))
+
+    def _new_bucket(self, values: List[int]) -> value_blocks:
+        # Packed like the index, rather than an int object per distinct value
+        return value_blocks.from_sorted(
+            array("q", values), array("b", [0]) * len(values)
+        )
+
+    def _rebuild(
+        self, entries: List[Tuple[str, int]], stored: List[Tuple[str, int]]
+    ) -> None:
+        # Slots are handed out in the order the batch guessed, as put would
+        add = self.user_slots.add
+        slot_values = self.slot_values
+        for name, value in stored:
+            slot = add(name)
+            if slot == len(slot_values):
+                slot_values.append(value)
+            else:
+                slot_values[slot] = value
+
+        find = self.user_slots.find
+        self.sorted_index = sorted_blocks.from_sorted(
+            array("q", [value for _, value in entries]),
+            array("i", [find(name) for name, _ in entries]),
+        )
+        super()._rebuild(entries, stored)
+
+    def count_of(self, value: int) -> int:
+        return self.sorted_index.count(value)
+
+    def names_for(self, value: int) -> Iterable[str]:
+        names = self.user_slots.names
+        return [names[slot] for slot in self.sorted_index.tags_for(value)]
+
+    def sorted_entries(self) -> Iterator[Tuple[str, int]]:
+        names = self.user_slots.names
+        for values, tags in zip(
+            self.sorted_index.value_blocks, self.sorted_index.tag_blocks
+        ):
+            for value, slot in zip(values, tags):
+                yield names[slot], value
+
+    def _bisect_left(self, value: float) -> int:
+        return self.sorted_index.bisect_left(value)
+
+    def _bisect_right(self, value: float) -> int:
+        return self.sorted_index.bisect_right(value)
+
+    def _value_at(self, index: int) -> int:
+        return self.sorted_index[index]
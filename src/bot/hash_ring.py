@@ -0,0 +1,62 @@
+"""
+Consistent hash ring, for assigning channels to worker processes.
+
+Each worker is placed on the ring many times over, and a channel belongs to
+the first worker point at or after its own hash. Adding or removing a worker
+only moves the channels next to its points; every other channel stays put.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List
+
+import bisect
+import hashlib
+
+
+def ring_hash(key: str) -> int:
+    # Stable between processes and runs, unlike hash()
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class hash_ring:
+    replicas: int
+    points: List[int]
+    nodes_at: Dict[int, str]
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 100) -> None:
+        self.replicas = replicas
+        self.points = []
+        self.nodes_at = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        for replica in range(self.replicas):
+            point = ring_hash(f"{node}#{replica}")
+            if point in self.nodes_at:
+                continue
+            self.nodes_at[point] = node
+            bisect.insort(self.points, point)
+
+    def remove(self, node: str) -> None:
+        for replica in range(self.replicas):
+            point = ring_hash(f"{node}#{replica}")
+            if self.nodes_at.get(point) == node:
+                del self.nodes_at[point]
+                del self.points[bisect.bisect_left(self.points, point)]
+
+    def node_for(self, key: str) -> str:
+        if not self.points:
+            raise LookupError("No nodes in the hash ring")
+        index = bisect.bisect_left(self.points, ring_hash(key)) % len(self.points)
+        return self.nodes_at[self.points[index]]
+
+    def assign(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Group keys by the node they belong to.
+        """
+        assignment: Dict[str, List[str]] = {}
+        for key in keys:
+            assignment.setdefault(self.node_for(key), []).append(key)
+        return assignment
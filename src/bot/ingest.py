@@ -0,0 +1,132 @@
+"""
+Ingest stage between the chat connection and the guess handler.
+
+Chat messages which are guesses are only parsed and queued on the receive path.
+A single consumer task drains the queue in batches and hands each batch
+to one bulk-apply call, so logging and storage happen off the receive path
+and once per batch rather than once per message.
+"""
+
+from __future__ import annotations
+
+from typing import Awaitable, Callable, Dict, List, NamedTuple
+
+import asyncio
+import datetime
+import logging
+
+
+class ingest_item(NamedTuple):
+    name: str
+    content: str
+    timestamp: datetime.datetime
+    # As returned by guess_parser.parse
+    value: int
+    channel: str = ""
+
+
+class guess_ingest:
+    """
+    Bounded queue of incoming guesses, with a consumer applying them in batches.
+
+    If the queue is full, new guesses are dropped and counted rather than
+    making the receive path wait.
+    """
+
+    queue: asyncio.Queue
+    batch_size: int
+    apply_batch: Callable[[List[ingest_item]], Awaitable[None]]
+    logger: logging.Logger
+    task: asyncio.Task | None
+
+    def __init__(
+        self,
+        apply_batch: Callable[[List[ingest_item]], Awaitable[None]],
+        logger: logging.Logger,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+    ) -> None:
+        self.apply_batch = apply_batch
+        self.logger = logger
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.task = None
+
+        self.received = 0
+        self.dropped = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.max_depth = 0
+
+    def submit(
+        self,
+        name: str,
+        content: str,
+        timestamp: datetime.datetime,
+        value: int,
+        channel: str = "",
+    ) -> bool:
+        """
+        Queue a guess without waiting. Returns False if it was dropped.
+        Must be called from within the event loop.
+        """
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(
+                self.consume(), name="guess-ingest"
+            )
+
+        try:
+            self.queue.put_nowait(ingest_item(name, content, timestamp, value, channel))
+        except asyncio.QueueFull:
+            if not self.dropped:
+                self.logger.warning("Ingest queue full; dropping guesses")
+            self.dropped += 1
+            return False
+
+        self.received += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    async def consume(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            self.batches += 1
+            self.last_batch_size = len(batch)
+            try:
+                await self.apply_batch(batch)
+            except Exception:  # pylint: disable=W0703
+                # One bad batch must not stop the consumer, or drain() never returns
+                self.logger.exception(
+                    "Error applying a batch of %d guesses", len(batch)
+                )
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def drain(self) -> None:
+        """
+        Wait until everything queued so far has been applied.
+        """
+        if self.task is not None:
+            await self.queue.join()
+
+    async def close(self) -> None:
+        await self.drain()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_max_depth": self.max_depth,
+            "queue_size": self.queue.maxsize,
+            "batch_size": self.batch_size,
+            "received": self.received,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+        }
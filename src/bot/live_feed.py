@@ -0,0 +1,82 @@
+"""
+Console feed of chat messages for live mode.
+
+Printing every message as it arrives blocks the event loop on the terminal,
+and a busy chat scrolls faster than anyone can read. Messages are instead
+buffered and written out together on a timer, with at most a fixed number of
+lines per interval; anything beyond that is summarised as a count.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, TextIO
+
+import asyncio
+import sys
+
+
+class live_feed:
+    """
+    Buffered, rate-limited feed of chat messages to a stream.
+    """
+
+    stream: TextIO
+    interval: float
+    max_lines: int
+    lines: Deque[str]
+    skipped: int
+    task: asyncio.Task | None
+
+    def __init__(
+        self, stream: TextIO = None, interval: float = 0.5, max_lines: int = 20
+    ) -> None:
+        self.stream = stream if stream is not None else sys.stdout
+        self.interval = interval
+        self.max_lines = max_lines
+        # Only the latest lines are kept; older ones are counted as skipped
+        self.lines = deque(maxlen=max_lines)
+        self.skipped = 0
+        self.task = None
+
+    def add(self, name: str, content: str) -> None:
+        """
+        Buffer a message for the next write.
+        Must be called from within the event loop.
+        """
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(
+                self.run(), name="live-feed"
+            )
+
+        if len(self.lines) == self.max_lines:
+            self.skipped += 1
+        self.lines.append(f"Received {name}::{content}")
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.write()
+
+    def write(self) -> None:
+        """
+        Write out everything buffered in one go.
+        """
+        if not self.lines:
+            return
+
+        output = []
+        if self.skipped:
+            output.append(f"... {self.skipped} more messages")
+            self.skipped = 0
+        output.extend(self.lines)
+        self.lines.clear()
+
+        self.stream.write("\n".join(output) + "\n")
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.write()
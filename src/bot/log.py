@@ -6,12 +6,21 @@
 
 from __future__ import annotations
 
+import atexit
 import logging
+import logging.handlers
+import pathlib
+import queue
 import sys
 
 
 Logger = logging.Logger
 
+# Records are queued by the bot and written out by the listener's own thread,
+# so a slow disk or terminal never blocks the event loop
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: logging.handlers.QueueHandler | None = None
+
 
 def init(filepath: str = None) -> None:
     logger = logging.getLogger("foxbot")
@@ -23,15 +32,49 @@ def init(filepath: str = None) -> None:
                 "%(asctime)s [%(name)s:%(levelname)s] %(message)s", datefmt="%H:%M:%S"
             )
         )
-        logger.addHandler(handler)
         logger.setLevel(logging.DEBUG)
     else:
-        handler = logging.FileHandler(filepath / "foxbot.log")
+        handler = logging.FileHandler(pathlib.Path(filepath or ".") / "foxbot.log")
         handler.setFormatter(logging.Formatter("[%(name)s:%(levelname)s] %(message)s"))
-
-        logger.addHandler(handler)
         logger.setLevel(logging.INFO)
 
+    start_listener(logger, handler)
+
+
+def start_listener(logger: logging.Logger, handler: logging.Handler) -> None:
+    """
+    Route the logger through a queue to the given handler, replacing any earlier one.
+    """
+    global _listener, _queue_handler  # pylint: disable=W0603
+
+    shutdown()
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(records)
+    _listener = logging.handlers.QueueListener(records, handler)
+    logger.addHandler(_queue_handler)
+    _listener.start()
+
+
+def shutdown() -> None:
+    """
+    Write out anything still queued and stop the listener.
+    """
+    global _listener, _queue_handler  # pylint: disable=W0603
+
+    if _listener is None:
+        return
+
+    logging.getLogger("foxbot").removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
+
+
+atexit.register(shutdown)
+
 
 def get_logger(name: str = "") -> logging.Logger:
     if not name:
@@ -0,0 +1,298 @@
+"""
+Counters and latency histograms for the bot, served in Prometheus text format.
+
+Recording is kept cheap enough to leave on everywhere: a counter is one
+integer add, and a histogram observation is one bisect over its bucket
+bounds, with times kept as integer nanoseconds from time.perf_counter_ns.
+All the formatting happens when the endpoint is scraped.
+
+Values read from elsewhere, such as queue depths, are given as functions
+called at scrape time, so they cost nothing in between.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+
+import asyncio
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+# Upper bounds in seconds; the hot path runs in microseconds, commands in milliseconds
+LATENCY_BUCKETS = (
+    0.000001,
+    0.0000025,
+    0.000005,
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+class counter:
+    __slots__ = ("value",)
+
+    value: int
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class histogram:
+    __slots__ = ("buckets", "bounds", "counts", "total")
+
+    buckets: Tuple[float, ...]
+    bounds: List[int]
+    counts: List[int]
+    total: int
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.bounds = [round(bound * 1e9) for bound in buckets]
+        # One count per bucket, and a last for anything larger
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+
+    def observe_ns(self, nanoseconds: int) -> None:
+        self.counts[bisect_left(self.bounds, nanoseconds)] += 1
+        self.total += nanoseconds
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def format_value(value: float) -> str:
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class metrics_registry:
+    """
+    Named metrics, each with any number of labelled series.
+    """
+
+    namespace: str
+    families: Dict[str, Tuple[str, str, list]]
+
+    def __init__(self, namespace: str = "foxbot") -> None:
+        self.namespace = namespace
+        # Kind, help text, and (labels, metric) for each series, by name
+        self.families = {}
+
+    def _add(
+        self, name: str, kind: str, help_text: str, labels: Dict[str, str], metric
+    ):
+        name = f"{self.namespace}_{name}"
+        family = self.families.setdefault(name, (kind, help_text, []))
+        if family[0] != kind:
+            raise ValueError(f"{name} is already a {family[0]}")
+        family[2].append((labels or {}, metric))
+        return metric
+
+    def counter(
+        self, name: str, help_text: str, labels: Dict[str, str] = None
+    ) -> counter:
+        return self._add(name, "counter", help_text, labels, counter())
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+        labels: Dict[str, str] = None,
+    ) -> histogram:
+        return self._add(name, "histogram", help_text, labels, histogram(buckets))
+
+    def read(
+        self,
+        name: str,
+        help_text: str,
+        read: Callable[[], float],
+        kind: str = "gauge",
+        labels: Dict[str, str] = None,
+    ) -> None:
+        """
+        A value read when scraped; kind is "gauge", or "counter" for totals kept elsewhere.
+        """
+        self._add(name, kind, help_text, labels, read)
+
+    def render(self) -> str:
+        """
+        Every metric, in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, (kind, help_text, series) in self.families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in series:
+                if isinstance(metric, histogram):
+                    lines.extend(render_histogram(name, labels, metric))
+                elif isinstance(metric, counter):
+                    lines.append(f"{name}{format_labels(labels)} {metric.value}")
+                else:
+                    lines.append(
+                        f"{name}{format_labels(labels)} {format_value(metric())}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def render_histogram(name: str, labels: Dict[str, str], metric: histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    bounds = [repr(bound) for bound in metric.buckets] + ["+Inf"]
+    for bound, count in zip(bounds, metric.counts):
+        cumulative += count
+        lines.append(
+            f"{name}_bucket{format_labels({**labels, 'le': bound})} {cumulative}"
+        )
+    lines.append(f"{name}_sum{format_labels(labels)} {metric.total / 1e9!r}")
+    lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+    return lines
+
+
+class chat_metrics:
+    """
+    The metrics the bot records, on their own registry.
+    """
+
+    __slots__ = (
+        "registry",
+        "messages_received",
+        "guesses_accepted",
+        "guesses_replaced",
+        "rejected_invalid",
+        "rejected_repeat",
+        "rejected_too_large",
+        "rejected_late",
+        "rejected_dropped",
+        "event_message_seconds",
+        "record_guess_seconds",
+        "score_seconds",
+        "stats_seconds",
+        "loop_lag_seconds",
+    )
+
+    def __init__(self, registry: metrics_registry | None = None) -> None:
+        self.registry = registry = registry or metrics_registry()
+
+        self.messages_received = registry.counter(
+            "messages_received_total", "Chat messages received"
+        )
+        self.guesses_accepted = registry.counter(
+            "guesses_accepted_total", "Guesses stored from new guessers"
+        )
+        self.guesses_replaced = registry.counter(
+            "guesses_replaced_total", "Guesses stored over an earlier guess"
+        )
+
+        rejected = "Guesses not stored, by reason"
+        self.rejected_invalid = registry.counter(
+            "guesses_rejected_total", rejected, {"reason": "invalid"}
+        )
+        self.rejected_repeat = registry.counter(
+            "guesses_rejected_total", rejected, {"reason": "repeat"}
+        )
+        self.rejected_too_large = registry.counter(
+            "guesses_rejected_total", rejected, {"reason": "too_large"}
+        )
+        self.rejected_late = registry.counter(
+            "guesses_rejected_total", rejected, {"reason": "late"}
+        )
+        self.rejected_dropped = registry.counter(
+            "guesses_rejected_total", rejected, {"reason": "dropped"}
+        )
+
+        self.event_message_seconds = registry.histogram(
+            "event_message_seconds", "Time handling each chat message"
+        )
+        self.record_guess_seconds = registry.histogram(
+            "record_guess_seconds", "Time recording each guess or batch of guesses"
+        )
+        self.score_seconds = registry.histogram(
+            "score_seconds", "Time finding the winners of a round"
+        )
+        self.stats_seconds = registry.histogram(
+            "stats_seconds", "Time computing round statistics"
+        )
+        self.loop_lag_seconds = registry.histogram(
+            "event_loop_lag_seconds", "How late the event loop wakes a sleeping task"
+        )
+
+
+async def watch_loop_lag(lag: histogram, interval: float = 0.5) -> None:
+    """
+    Measure how late the event loop wakes up from sleeps, for as long as the loop runs.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag.observe_ns(max(0, round((loop.time() - expected) * 1e9)))
+
+
+class metrics_server:
+    """
+    Serves a registry at /metrics over HTTP.
+    """
+
+    registry: metrics_registry
+    host: str
+    port: int
+    runner: web.AppRunner | None
+
+    def __init__(
+        self, registry: metrics_registry, host: str = "127.0.0.1", port: int = 0
+    ) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.runner = None
+
+    async def start(self) -> None:
+        # The HTTP server is only loaded if metrics are served
+        from aiohttp import web  # pylint: disable=C0415
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_scrape)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        # Port 0 picks a free port; find out which
+        self.port = site._server.sockets[0].getsockname()[1]  # pylint: disable=W0212
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_scrape(self, _request: web.Request) -> web.Response:
+        from aiohttp import web  # pylint: disable=C0415
+
+        return web.Response(
+            body=self.registry.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
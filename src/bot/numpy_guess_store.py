@@ -0,0 +1,233 @@
+"""
+Optional guess store which keeps values in NumPy arrays.
+
+Guesses are recorded in O(1) with no sorted index; scoring and stats are
+vectorised passes over the arrays instead. This suits offline re-scoring and
+giant rounds, where keeping a sorted index up to date costs more than the
+occasional full pass. Results are identical to the pure-Python stores.
+
+NumPy is not a requirement of the bot; check `available` before use.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from typing import Dict, Iterable, List, Set, Tuple
+
+import bisect
+import functools
+
+from bot.guess_store import (
+    MAX_MULTIMODE,
+    closeness_order,
+    guess_store,
+    histogram_ranges,
+    intern_table,
+    order_statistics_needed,
+    percentiles_from,
+    pick_closest,
+    quantile_positions,
+    summary_stats,
+)
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - depends on the environment
+    numpy = None
+
+
+def available() -> bool:
+    return numpy is not None
+
+
+class numpy_guess_store(guess_store):
+    """
+    Guesses held by slot in NumPy arrays, with names interned as in compact storage.
+
+    Alongside each value is the sequence number of the guess that set it,
+    so winners sharing a value are listed in the order they guessed.
+    """
+
+    __slots__ = ("user_slots", "values", "stamps", "next_stamp")
+
+    user_slots: intern_table
+    values: numpy.ndarray
+    stamps: numpy.ndarray
+    next_stamp: int
+
+    min_value = -(2**63)
+    max_value = 2**63 - 1
+
+    def __init__(self, capacity: int = 1024) -> None:
+        super().__init__()
+        self.user_slots = intern_table()
+        self.values = numpy.empty(capacity, dtype=numpy.int64)
+        self.stamps = numpy.empty(capacity, dtype=numpy.int64)
+        self.next_stamp = 0
+
+    @classmethod
+    def from_store(cls, store: guess_store) -> numpy_guess_store:
+        """
+        Copy an existing store, keeping the winner order it would give.
+        """
+        count = len(store)
+        new_store = cls(max(count, 1024))
+        # Stamped in sorted order, so names sharing a value keep their order
+        add = new_store.user_slots.add
+        values = []
+        for name, value in store.sorted_entries():
+            add(name)
+            values.append(value)
+        # Raises OverflowError for values outside 64 bits, as put would
+        new_store.values[:count] = numpy.array(values, dtype=numpy.int64)
+        new_store.stamps[:count] = numpy.arange(count)
+        new_store.next_stamp = count
+        new_store.total = store.total
+        new_store.total_squares = store.total_squares
+        return new_store
+
+    def __getitem__(self, name: str) -> int:
+        slot = self.user_slots.find(name)
+        if slot < 0:
+            raise KeyError(name)
+        return int(self.values[slot])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.user_slots.names)
+
+    def __len__(self) -> int:
+        return len(self.user_slots)
+
+    def _active(self) -> numpy.ndarray:
+        return self.values[: len(self)]
+
+    def put(self, name: str, value: int, replace: bool) -> bool:
+        slot = self.user_slots.find(name)
+        if slot >= 0:
+            if not replace:
+                return False
+            self._check_value(value)
+            previous = int(self.values[slot])
+            self.total -= previous
+            self.total_squares -= previous * previous
+        else:
+            self._check_value(value)
+            slot = self.user_slots.add(name)
+            if slot == len(self.values):
+                self._grow()
+
+        self.values[slot] = value
+        self.stamps[slot] = self.next_stamp
+        self.next_stamp += 1
+        self.total += value
+        self.total_squares += value * value
+        return True
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self.values)
+        self.values = numpy.resize(self.values, capacity)
+        self.stamps = numpy.resize(self.stamps, capacity)
+
+    def closest_values(
+        self, value: float, closest_without_going_over: bool
+    ) -> Set[int]:
+        values = self._active()
+        if not len(values):
+            return set()
+
+        # Nearest guess at or under the value, and at or over it; the winner is one of those
+        under = values[values <= value]
+        under_best = int(under.max()) if len(under) else None
+
+        if closest_without_going_over:
+            # If every guess is over, fall back to the lowest guess
+            if under_best is None:
+                return set([int(values.min())])
+            return set([under_best])
+
+        over = values[values >= value]
+        candidates = [under_best] if under_best is not None else []
+        if len(over):
+            candidates.append(int(over.min()))
+        return pick_closest(value, candidates)
+
+    def values_by_closeness(
+        self, value: float, closest_without_going_over: bool
+    ) -> Iterator[int]:
+        distinct = numpy.unique(self._active()).tolist()
+        return closeness_order(
+            value,
+            closest_without_going_over,
+            len(distinct),
+            distinct.__getitem__,
+            functools.partial(bisect.bisect_left, distinct),
+            functools.partial(bisect.bisect_right, distinct),
+        )
+
+    def _slots_for(self, value: int) -> numpy.ndarray:
+        slots = numpy.flatnonzero(self._active() == value)
+        return slots[numpy.argsort(self.stamps[slots], kind="stable")]
+
+    def names_for(self, value: int) -> Iterable[str]:
+        names = self.user_slots.names
+        return [names[slot] for slot in self._slots_for(value).tolist()]
+
+    def count_of(self, value: int) -> int:
+        return int(numpy.count_nonzero(self._active() == value))
+
+    def sorted_entries(self) -> Iterator[Tuple[str, int]]:
+        count = len(self)
+        order = numpy.lexsort((self.stamps[:count], self.values[:count]))
+        names = self.user_slots.names
+        for slot, value in zip(order.tolist(), self.values[order].tolist()):
+            yield names[slot], value
+
+    def stats(self) -> Dict[str, int | float]:
+        values = self._active()
+        if not len(values):
+            return summary_stats(self, None, [])
+
+        # Only a handful of order statistics are needed, so partition rather than sort
+        positions = order_statistics_needed(len(values))
+        partitioned = numpy.partition(values, positions)
+        ordered = dict(zip(positions, partitioned[positions].tolist()))
+
+        unique, counts = numpy.unique(values, return_counts=True)
+        multimode = unique[counts == counts.max()][:MAX_MULTIMODE].tolist()
+
+        return summary_stats(self, ordered.__getitem__, multimode)
+
+    def percentiles(self, points: Iterable[int]) -> Dict[int, float]:
+        values = self._active()
+        count = len(values)
+        points = list(points)
+        if count < 2:
+            return {}
+
+        positions = sorted(
+            {
+                position
+                for point in points
+                for position in quantile_positions(count, point, 100)
+            }
+        )
+        partitioned = numpy.partition(values, positions)
+        ordered = dict(zip(positions, partitioned[positions].tolist()))
+        return percentiles_from(count, points, ordered.__getitem__)
+
+    def histogram(self, bins: int) -> List[Tuple[int, int, int]]:
+        values = self._active()
+        if not len(values):
+            return []
+
+        ranges = histogram_ranges(int(values.min()), int(values.max()), bins)
+        # Where each range after the first starts, in sorted order
+        ordered = numpy.sort(values)
+        starts = numpy.searchsorted(
+            ordered, [lowest for lowest, _ in ranges[1:]], side="left"
+        ).tolist()
+        ends = starts + [len(values)]
+        return [
+            (lowest, highest, end - start)
+            for (lowest, highest), start, end in zip(ranges, [0] + starts, ends)
+        ]
@@ -0,0 +1,260 @@
+"""
+Scheduler for everything the bot says in chat.
+
+Twitch mutes bots which send too quickly, so every outbound message goes
+through one queue, drained by a single task under a token bucket sized to the
+channel's send limit. Commands hand their messages over and carry on rather
+than waiting for slow sends.
+
+Messages wait in priority lanes, so announcements go out ahead of replies,
+and replies ahead of error pings. Error pings carrying the same text are
+coalesced, so a flood of bad guesses gets one message naming everyone.
+Anything longer than Twitch's message limit is split.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Tuple
+
+import asyncio
+import logging
+
+# Twitch refuses chat messages longer than this
+MAX_MESSAGE_LENGTH = 500
+
+# twitchio refuses the send which would reach its limit, so stay one under it
+TWITCHIO_HEADROOM = 1
+
+Sender = Callable[[str], Awaitable[None]]
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Split text into messages within the limit, breaking between words where possible.
+    """
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind(" ", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        parts.append(text)
+    return parts
+
+
+def ping_messages(
+    names: List[str], text: str, limit: int = MAX_MESSAGE_LENGTH
+) -> List[str]:
+    """
+    Address text to everyone named, in as few messages within the limit as possible.
+    """
+    messages = []
+    mentions: List[str] = []
+    length = len(text)
+    for name in names:
+        mention = f"@{name}"
+        if mentions and length + len(mention) + 1 > limit:
+            messages.append(" ".join(mentions) + " " + text)
+            mentions = []
+            length = len(text)
+        mentions.append(mention)
+        length += len(mention) + 1
+    if mentions:
+        messages.append(" ".join(mentions) + " " + text)
+    # A single name with a long text can still be over
+    return [part for message in messages for part in split_message(message, limit)]
+
+
+class token_bucket:
+    """
+    Allows up to capacity sends in any period, each token coming back period seconds after use.
+
+    Refilling continuously would allow close to twice the capacity within one period,
+    which is more than Twitch, or twitchio's own fixed-window limiter, will take.
+    """
+
+    capacity: int
+    period: float
+    taken: Deque[float]
+
+    def __init__(self, capacity: int, period: float) -> None:
+        self.capacity = capacity
+        self.period = period
+        # When each token in use was taken, oldest first
+        self.taken = deque()
+
+    def wait_time(self, now: float) -> float:
+        """
+        Seconds until a token is available; zero if one is now.
+        """
+        while self.taken and self.taken[0] + self.period <= now:
+            self.taken.popleft()
+        if len(self.taken) < self.capacity:
+            return 0.0
+        return self.taken[0] + self.period - now
+
+    def take(self, now: float) -> None:
+        self.taken.append(now)
+
+
+class outbound_scheduler:
+    """
+    Rate-limited, prioritised queue of outbound messages, drained by one task.
+    """
+
+    # Lanes, highest priority first
+    ANNOUNCEMENT = 0
+    REPLY = 1
+    ERROR = 2
+
+    send_default: Sender | None
+    logger: logging.Logger
+    rate_limit: int
+    rate_period: float
+    lanes: List[Deque[Tuple[str, Sender, bool]]]
+    pings: Dict[Tuple[str, Sender], Dict[str, None]]
+    bucket: token_bucket | None
+    task: asyncio.Task | None
+
+    def __init__(
+        self,
+        send_default: Sender | None,
+        logger: logging.Logger,
+        rate_limit: int = 20,
+        rate_period: float = 30.0,
+    ) -> None:
+        self.send_default = send_default
+        self.logger = logger
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.lanes = [deque(), deque(), deque()]
+        # Names waiting to be pinged, by the text and where it is to be sent;
+        # the error lane holds each of these once, where it first queued
+        self.pings = {}
+        self.bucket = None
+        self.task = None
+        self.wakeup = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.unfinished = 0
+
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+
+    def send(self, text: str, lane: int = ANNOUNCEMENT, sender: Sender = None) -> None:
+        """
+        Queue text to be sent, by default through send_default.
+        Must be called from within the event loop.
+        """
+        self._queue(lane, (text, self._sender(sender), False))
+
+    def announce(self, text: str, sender: Sender = None) -> None:
+        self.send(text, self.ANNOUNCEMENT, sender)
+
+    def reply(self, text: str, sender: Sender) -> None:
+        self.send(text, self.REPLY, sender)
+
+    def ping(self, name: str, text: str, sender: Sender = None) -> None:
+        """
+        Queue text addressed to name, by default through send_default,
+        joining others waiting on the same text to the same place.
+        """
+        sender = self._sender(sender)
+        names = self.pings.get((text, sender))
+        if names is not None:
+            if name not in names:
+                names[name] = None
+                self.coalesced += 1
+            return
+
+        self.pings[(text, sender)] = {name: None}
+        self._queue(self.ERROR, (text, sender, True))
+
+    def _sender(self, sender: Sender | None) -> Sender:
+        sender = sender or self.send_default
+        if sender is None:
+            raise ValueError("Outbound message has nowhere to be sent")
+        return sender
+
+    def _queue(self, lane: int, entry: Tuple[str, Sender, bool]) -> None:
+        if self.task is None:
+            loop = asyncio.get_running_loop()
+            self.bucket = token_bucket(
+                self.rate_limit - TWITCHIO_HEADROOM, self.rate_period
+            )
+            self.task = loop.create_task(self.run(), name="outbound")
+
+        self.lanes[lane].append(entry)
+        self.unfinished += 1
+        self.idle.clear()
+        self.wakeup.set()
+
+    def _next(self) -> Tuple[str, Sender, bool] | None:
+        for lane in self.lanes:
+            if lane:
+                return lane.popleft()
+        return None
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            entry = self._next()
+            if entry is None:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            text, sender, is_ping = entry
+            if is_ping:
+                # Names which ask for the ping from here on start a new one
+                names = self.pings.pop((text, sender))
+                messages = ping_messages(list(names), text)
+            else:
+                messages = split_message(text)
+
+            try:
+                for message in messages:
+                    wait = self.bucket.wait_time(loop.time())
+                    while wait:
+                        await asyncio.sleep(wait)
+                        wait = self.bucket.wait_time(loop.time())
+                    self.bucket.take(loop.time())
+                    await self._deliver(message, sender)
+            finally:
+                self.unfinished -= 1
+                if not self.unfinished:
+                    self.idle.set()
+
+    async def _deliver(self, message: str, sender: Sender) -> None:
+        try:
+            await sender(message)
+        except Exception:  # pylint: disable=W0703
+            # One failed send must not stop everything queued behind it
+            self.failed += 1
+            self.logger.exception("Error sending message::%s", message)
+        else:
+            self.sent += 1
+
+    async def drain(self) -> None:
+        """
+        Wait until everything queued so far has been sent.
+        """
+        await self.idle.wait()
+
+    async def close(self) -> None:
+        await self.drain()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "outbound_queued": self.unfinished,
+            "outbound_sent": self.sent,
+            "outbound_failed": self.failed,
+            "outbound_coalesced": self.coalesced,
+        }
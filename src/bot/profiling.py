@@ -0,0 +1,217 @@
+"""
+Profiling the running bot on request, without a debugger attached.
+
+A session runs for a fixed time while the bot carries on as normal, then
+writes its report to disk off the event loop and returns a one-line summary.
+Sessions are one of:
+
+- cpu: cProfile, tracing every call, saved as pstats data and a text report
+- sample: a thread sampling the event loop's stack every few milliseconds,
+  saved as collapsed stacks for flame graph tools; much lighter than cpu
+- memory: tracemalloc, reporting what was allocated during the session
+  and is still held at its end
+
+Nothing is hooked in between sessions, so the bot runs at full speed.
+Only one session runs at a time.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+import asyncio
+import cProfile
+import datetime
+import linecache
+import logging
+import os
+import pathlib
+import pstats
+import sys
+import threading
+import tracemalloc
+
+SUMMARY_ENTRIES = 3
+REPORT_ENTRIES = 50
+
+
+def short_location(filename: str, name: str) -> str:
+    return f"{os.path.basename(filename)}:{name}"
+
+
+def percent(part: float, whole: float) -> str:
+    return f"{100 * part / whole:.0f}%" if whole else "0%"
+
+
+def size(num_bytes: int) -> str:
+    if abs(num_bytes) < 1024:
+        return f"{num_bytes:+d} B"
+    scaled = num_bytes / 1024
+    for unit in ("KiB", "MiB"):
+        if abs(scaled) < 1024:
+            return f"{scaled:+.1f} {unit}"
+        scaled /= 1024
+    return f"{scaled:+.1f} GiB"
+
+
+class profiler:
+    directory: pathlib.Path
+    logger: logging.Logger
+    running: str | None
+
+    def __init__(self, directory: str | os.PathLike, logger: logging.Logger) -> None:
+        self.directory = pathlib.Path(directory)
+        self.logger = logger
+        # The kind of session in progress, if any
+        self.running = None
+
+    def report_path(self, kind: str, suffix: str) -> pathlib.Path:
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        return self.directory / f"{kind}-{stamp}{suffix}"
+
+    async def run(self, kind: str, seconds: float) -> str:
+        """
+        Profile for the given time, returning the summary.
+        """
+        sessions: Dict[str, Callable[[float], object]] = {
+            "cpu": self.profile_cpu,
+            "sample": self.profile_samples,
+            "memory": self.profile_memory,
+        }
+        if kind not in sessions:
+            return f"Unknown profile kind {kind}; try {', '.join(sessions)}"
+        if self.running is not None:
+            return f"Already running a {self.running} profile"
+
+        self.running = kind
+        self.logger.info("Starting %s profile for %s seconds", kind, seconds)
+        try:
+            return await sessions[kind](seconds)
+        finally:
+            self.running = None
+
+    async def write_report(self, write: Callable[[], str]) -> str:
+        """
+        Write the report in a thread, so the event loop is not held up.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        summary = await asyncio.get_running_loop().run_in_executor(None, write)
+        self.logger.info("Profile finished: %s", summary)
+        return summary
+
+    async def profile_cpu(self, seconds: float) -> str:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+
+        def write() -> str:
+            data_path = self.report_path("cpu", ".prof")
+            text_path = data_path.with_suffix(".txt")
+            profile.dump_stats(data_path)
+            with open(text_path, "w", encoding="utf-8") as report_file:
+                stats = pstats.Stats(profile, stream=report_file)
+                stats.sort_stats(pstats.SortKey.TIME).print_stats(REPORT_ENTRIES)
+
+            total_time = sum(entry[2] for entry in stats.stats.values())
+            calls = sum(entry[1] for entry in stats.stats.values())
+            top = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+            hottest = ", ".join(
+                f"{short_location(key[0], key[2])} {percent(entry[2], total_time)}"
+                for key, entry in top[:SUMMARY_ENTRIES]
+            )
+            return (
+                f"CPU profile of {seconds}s: {calls} calls, {total_time:.2f}s busy. "
+                f"Top: {hottest}. Saved {text_path.name}"
+            )
+
+        return await self.write_report(write)
+
+    async def profile_samples(self, seconds: float, interval: float = 0.005) -> str:
+        target = threading.get_ident()
+        stacks: Counter = Counter()
+        stop = threading.Event()
+
+        def sample() -> None:
+            while not stop.wait(interval):
+                frame = sys._current_frames().get(target)  # pylint: disable=W0212
+                stack: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(short_location(code.co_filename, code.co_name))
+                    frame = frame.f_back
+                stacks[";".join(reversed(stack))] += 1
+
+        sampler = threading.Thread(target=sample, name="profile-sampler", daemon=True)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            sampler.join()
+
+        def write() -> str:
+            path = self.report_path("sample", ".folded")
+            with open(path, "w", encoding="utf-8") as report_file:
+                for stack, count in stacks.most_common():
+                    report_file.write(f"{stack} {count}\n")
+
+            # Time spent in each function itself, from the innermost frame of each sample
+            own: Counter = Counter()
+            for stack, count in stacks.items():
+                own[stack.rpartition(";")[2]] += count
+            samples = sum(stacks.values())
+            hottest = ", ".join(
+                f"{name} {percent(count, samples)}"
+                for name, count in own.most_common(SUMMARY_ENTRIES)
+            )
+            return f"Sampled {seconds}s: {samples} samples. Top: {hottest}. Saved {path.name}"
+
+        return await self.write_report(write)
+
+    async def profile_memory(self, seconds: float) -> str:
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            await asyncio.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+
+        def write() -> str:
+            path = self.report_path("memory", ".txt")
+            # Leave out tracemalloc's own bookkeeping
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+            differences = after.filter_traces(filters).compare_to(
+                before.filter_traces(filters), "lineno"
+            )
+            growth = sum(difference.size_diff for difference in differences)
+            with open(path, "w", encoding="utf-8") as report_file:
+                report_file.write(f"Held at end: {size(growth)} over {seconds}s\n")
+                for difference in differences[:REPORT_ENTRIES]:
+                    frame = difference.traceback[0]
+                    line = linecache.getline(frame.filename, frame.lineno).strip()
+                    report_file.write(f"{difference}\n    {line}\n")
+            after.dump(str(path.with_suffix(".snapshot")))
+
+            growing: List[Tuple[str, int]] = [
+                (
+                    f"{os.path.basename(difference.traceback[0].filename)}:"
+                    f"{difference.traceback[0].lineno}",
+                    difference.size_diff,
+                )
+                for difference in differences[:SUMMARY_ENTRIES]
+            ]
+            top = ", ".join(f"{where} {size(change)}" for where, change in growing)
+            return (
+                f"Memory over {seconds}s: {size(growth)} held. "
+                f"Top: {top}. Saved {path.name}"
+            )
+
+        return await self.write_report(write)
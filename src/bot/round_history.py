@@ -0,0 +1,214 @@
+"""
+History of finished rounds, kept in a local SQLite database.
+
+Every scored round is saved with all of its guesses and who won, in one
+transaction, alongside a running total of rounds played and won for each
+chatter in each channel. Leaderboards and personal stats read those totals
+through an index, so they stay quick however many rounds have been played.
+
+SQLite calls block, so they all run on one worker thread which owns the
+connection; the event loop only awaits the results.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, NamedTuple, Set, Tuple
+
+import asyncio
+import datetime
+import os
+import pathlib
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    channel TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    answer REAL NOT NULL,
+    guess_count INTEGER NOT NULL,
+    winner_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rounds_by_channel ON rounds (channel, finished_at);
+CREATE INDEX IF NOT EXISTS rounds_by_time ON rounds (finished_at);
+
+CREATE TABLE IF NOT EXISTS guesses (
+    round_id INTEGER NOT NULL REFERENCES rounds (id),
+    name TEXT NOT NULL,
+    -- No type, so guesses too large for an integer stay exact as text
+    value NOT NULL,
+    won INTEGER NOT NULL,
+    PRIMARY KEY (round_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS guesses_by_name ON guesses (name, round_id);
+
+CREATE TABLE IF NOT EXISTS players (
+    channel TEXT NOT NULL,
+    name TEXT NOT NULL,
+    rounds INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    last_played REAL NOT NULL,
+    PRIMARY KEY (channel, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS players_by_wins ON players (channel, wins DESC, rounds, name);
+"""
+
+UPDATE_PLAYER = """
+INSERT INTO players (channel, name, rounds, wins, last_played) VALUES (?, ?, 1, ?, ?)
+ON CONFLICT (channel, name) DO UPDATE SET
+    rounds = rounds + 1,
+    wins = wins + excluded.wins,
+    last_played = excluded.last_played
+"""
+
+# SQLite integers are 64-bit; larger guesses are kept as text
+SQLITE_MAX_INT = 2**63 - 1
+
+
+class player_stats(NamedTuple):
+    name: str
+    rounds: int
+    wins: int
+    # Chatters in the channel with more wins
+    ahead: int
+
+
+def to_seconds(timestamp: datetime.datetime) -> float:
+    # Timestamps are naive UTC, as twitchio gives them
+    return timestamp.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def storable(value: int) -> int | str:
+    return value if -SQLITE_MAX_INT - 1 <= value <= SQLITE_MAX_INT else str(value)
+
+
+class round_history:
+    path: pathlib.Path
+    executor: ThreadPoolExecutor
+    connection: sqlite3.Connection | None
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = pathlib.Path(path)
+        # One thread, so the connection is only ever used from it
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="round-history")
+        self.connection = None
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, function, *args
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Workers in other processes may share the file, so wait on their locks
+            self.connection = sqlite3.connect(self.path, timeout=30)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+    async def record_round(
+        self,
+        channel: str,
+        finished_at: datetime.datetime,
+        answer: float,
+        guesses: List[Tuple[str, int]],
+        winners: Iterable[str],
+    ) -> int:
+        """
+        Save a scored round; returns its id.
+        guesses should be a copy, as it is read on the worker thread.
+        """
+        return await self._run(
+            self._record_round,
+            channel,
+            to_seconds(finished_at),
+            answer,
+            guesses,
+            set(winners),
+        )
+
+    def _record_round(
+        self,
+        channel: str,
+        finished_at: float,
+        answer: float,
+        guesses: List[Tuple[str, int]],
+        winners: Set[str],
+    ) -> int:
+        connection = self._connect()
+        with connection:
+            round_id = connection.execute(
+                "INSERT INTO rounds (channel, finished_at, answer, guess_count, winner_count)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (channel, finished_at, answer, len(guesses), len(winners)),
+            ).lastrowid
+            connection.executemany(
+                "INSERT INTO guesses (round_id, name, value, won) VALUES (?, ?, ?, ?)",
+                (
+                    (round_id, name, storable(value), name in winners)
+                    for name, value in guesses
+                ),
+            )
+            connection.executemany(
+                UPDATE_PLAYER,
+                (
+                    (channel, name, int(name in winners), finished_at)
+                    for name, _ in guesses
+                ),
+            )
+        return round_id
+
+    async def leaderboard(self, channel: str, count: int = 10) -> List[player_stats]:
+        """
+        The chatters with the most wins in a channel, most first.
+        """
+        return await self._run(self._leaderboard, channel, count)
+
+    def _leaderboard(self, channel: str, count: int) -> List[player_stats]:
+        rows = self._connect().execute(
+            "SELECT name, rounds, wins FROM players WHERE channel = ? AND wins > 0"
+            " ORDER BY wins DESC, rounds, name LIMIT ?",
+            (channel, count),
+        )
+        leaders: List[player_stats] = []
+        for name, rounds, wins in rows:
+            # Chatters tied on wins share a place
+            ahead = len(leaders)
+            if leaders and leaders[-1].wins == wins:
+                ahead = leaders[-1].ahead
+            leaders.append(player_stats(name, rounds, wins, ahead))
+        return leaders
+
+    async def player(self, channel: str, name: str) -> player_stats | None:
+        """
+        A chatter's totals in a channel, or None if they have never guessed there.
+        """
+        return await self._run(self._player, channel, name)
+
+    def _player(self, channel: str, name: str) -> player_stats | None:
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT rounds, wins FROM players WHERE channel = ? AND name = ?",
+            (channel, name),
+        ).fetchone()
+        if row is None:
+            return None
+
+        rounds, wins = row
+        (ahead,) = connection.execute(
+            "SELECT COUNT(*) FROM players WHERE channel = ? AND wins > ?",
+            (channel, wins),
+        ).fetchone()
+        return player_stats(name, rounds, wins, ahead)
+
+    async def close(self) -> None:
+        await self._run(self._close)
+        self.executor.shutdown()
+
+    def _close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,244 @@
+"""
+Write-ahead journal for the round in progress, so a crash does not lose it.
+
+Every accepted guess, round reset and state change is appended to a log.
+Appends are buffered and written with a single fsync per batch.
+Once the log has grown past the size of the round itself, the whole round
+is written out as a snapshot and the log starts again,
+so recovery only replays what happened since the last snapshot.
+Writes and fsyncs happen on a thread of the journal's own, in the order
+they were made, so chat is never held up waiting on the disk.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Dict, List, TextIO, Tuple
+
+import json
+import os
+import pathlib
+
+from bot.guess_handler import guess_handler
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+LOG_NAME = "round.log"
+SNAPSHOT_NAME = "round.snapshot"
+SNAPSHOT_VERSION = 1
+
+
+class round_journal:
+    directory: pathlib.Path
+    flush_every: int
+    snapshot_every: int
+    sequence: int
+    snapshot_sequence: int
+    log_records: int
+    pending: List[str]
+    log_file: TextIO | None
+    executor: ThreadPoolExecutor | None
+    writing: Future | None
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        flush_every: int = 256,
+        snapshot_every: int = 10000,
+    ) -> None:
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self.snapshot_every = snapshot_every
+
+        # Every record has a sequence number; the snapshot notes the last one it covers
+        self.sequence = 0
+        self.snapshot_sequence = 0
+        self.log_records = 0
+        self.pending = []
+        self.log_file = open(self.log_path, "a", encoding="utf-8")
+        # One thread, so writes land in the order they were made; the last one handed over
+        self.executor = None
+        self.writing = None
+
+    @property
+    def log_path(self) -> pathlib.Path:
+        return self.directory / LOG_NAME
+
+    @property
+    def snapshot_path(self) -> pathlib.Path:
+        return self.directory / SNAPSHOT_NAME
+
+    def recover(
+        self, new_handler: Callable[[], guess_handler]
+    ) -> Tuple[str | None, guess_handler]:
+        """
+        Rebuild the round from the snapshot and the log written since.
+        Returns the name of the bot state (None if nothing was recorded) and the guesses.
+        This should be called before anything new is recorded.
+        """
+        state = None
+        handler = new_handler()
+
+        if self.snapshot_path.exists():
+            state = self._load_snapshot(handler)
+
+        records, torn = self._read_log()
+        state, handler = self._replay(records, state, handler, new_handler)
+
+        if torn:
+            # Start again from a clean log, so new records are not written after the tear
+            self.snapshot(state, handler)
+
+        return state, handler
+
+    def _load_snapshot(self, handler: guess_handler) -> str | None:
+        with open(self.snapshot_path, "r", encoding="utf-8") as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        self.sequence = self.snapshot_sequence = snapshot["sequence"]
+        for name, value in zip(snapshot["names"], snapshot["values"]):
+            handler.accept_guess(name, value)
+        return snapshot["state"]
+
+    def _replay(
+        self,
+        records: List[list],
+        state: str | None,
+        handler: guess_handler,
+        new_handler: Callable[[], guess_handler],
+    ) -> Tuple[str | None, guess_handler]:
+        for record in records:
+            if record[0] <= self.snapshot_sequence:
+                # Already part of the snapshot
+                continue
+            self.sequence = record[0]
+            self.log_records += 1
+            kind = record[1]
+            if kind == "g":
+                handler.accept_guess(record[2], record[3])
+            elif kind == "r":
+                handler = new_handler()
+            elif kind == "s":
+                state = record[2]
+        return state, handler
+
+    def _read_log(self) -> Tuple[List[list], bool]:
+        """
+        Returns the complete records in the log, and whether it ended in a torn write.
+        """
+        if not self.log_path.exists():
+            return [], False
+
+        records = []
+        with open(self.log_path, "r", encoding="utf-8") as log_file:
+            for line in log_file:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A torn write from the crash; nothing after it was made durable
+                    return records, True
+        return records, False
+
+    def record_guess(self, name: str, value: int) -> None:
+        self._append("g", name, value)
+
+    def record_reset(self) -> None:
+        self._append("r")
+
+    def record_state(self, state: str) -> None:
+        self._append("s", state)
+
+    def _append(self, *record: str | int) -> None:
+        self.sequence += 1
+        self.pending.append(json.dumps([self.sequence, *record]))
+        self.log_records += 1
+
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Hand buffered records to the writer thread, to be written with one fsync for the batch.
+        """
+        if not self.pending:
+            return
+
+        text = "\n".join(self.pending) + "\n"
+        self.pending = []
+        self._submit(self._write_log, text)
+
+    def wait(self) -> None:
+        """
+        Block until everything handed to the writer thread is on disk.
+        """
+        if self.writing is not None:
+            self.writing.result()
+
+    def _submit(self, write: Callable[..., None], *args: object) -> None:
+        if self.executor is None:
+            # Only loaded once something is written, so startup does not pay for it
+            from concurrent.futures import ThreadPoolExecutor  # pylint: disable=C0415
+
+            self.executor = ThreadPoolExecutor(1, thread_name_prefix="journal")
+        self.writing = self.executor.submit(write, *args)
+
+    def _write_log(self, text: str) -> None:
+        self.log_file.write(text)
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+
+    def wants_snapshot(self, handler: guess_handler) -> bool:
+        """
+        Whether the log has outgrown the round, so that a snapshot would pay for itself.
+        """
+        return self.log_records >= max(self.snapshot_every, handler.num_replies())
+
+    def snapshot(self, state: str | None, handler: guess_handler) -> None:
+        """
+        Copy the whole round out, then have the writer thread write it atomically
+        and start a fresh log.
+        """
+        self.flush()
+
+        names: List[str] = []
+        values: List[int] = []
+        for name, value in handler.store.sorted_entries():
+            names.append(name)
+            values.append(value)
+
+        self._submit(
+            self._write_snapshot,
+            {
+                "version": SNAPSHOT_VERSION,
+                "sequence": self.sequence,
+                "state": state,
+                "names": names,
+                "values": values,
+            },
+        )
+        self.snapshot_sequence = self.sequence
+        self.log_records = 0
+
+    def _write_snapshot(self, snapshot: Dict[str, object]) -> None:
+        temp_path = self.snapshot_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as snapshot_file:
+            json.dump(snapshot, snapshot_file, separators=(",", ":"))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+        # Records up to the snapshot sequence are skipped on recovery,
+        # so a crash before this truncation is harmless
+        self.log_file.close()
+        self.log_file = open(self.log_path, "w", encoding="utf-8")
+
+    def close(self) -> None:
+        if self.log_file is None:
+            return
+        self.flush()
+        if self.executor is not None:
+            # Waits for every write handed over
+            self.executor.shutdown()
+            self.executor = None
+        self.log_file.close()
+        self.log_file = None
@@ -0,0 +1,242 @@
+"""
+Points kept across rounds, for each channel's standings.
+
+Each scored round adds points to the chatters who placed, by a configurable
+scheme: points for winning, bands of points for the places after, and a
+bonus for guessing the answer exactly. Totals are updated as each round is
+scored, so nothing is re-added from past rounds.
+
+Chatters are ranked in a sorted_blocks index keyed on their points, so a
+chatter's place and the top of the standings are found by bisection however
+many chatters have ever scored. Chatters on the same points share a place,
+and are listed in the order they first scored.
+
+The standings are saved after every change, as one compact binary file
+written off the event loop: the totals as 64-bit integers, then the names.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Mapping, NamedTuple, Tuple
+
+import itertools
+import os
+import pathlib
+import struct
+import sys
+
+from bot.config import Config
+from bot.guess_handler import guess_handler
+from bot.guess_store import intern_table, sorted_blocks
+
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+MAGIC = b"FOXSTND1"
+HEADER = struct.Struct("<q")
+# Ranking keys put the points above the slot, so every key is unique and
+# ties keep their slot order; slots are 32-bit, leaving 31 bits for points
+SLOT_SPAN = 2**32
+
+
+def ranking_key(points: int, slot: int) -> int:
+    # Most points first, as the index is ascending
+    return slot - points * SLOT_SPAN
+
+
+class point_scheme(NamedTuple):
+    # Bonus for guessing the answer exactly, on top of the points for placing
+    exact: int
+    # Points for the winners of a round
+    closest: int
+    # (last place, points) for the places after the winners, in order
+    bands: Tuple[Tuple[int, int], ...]
+
+    @classmethod
+    def from_config(cls, config: Config) -> point_scheme:
+        return cls(
+            config.points_exact,
+            config.points_closest,
+            tuple(
+                sorted(
+                    (int(place), int(points)) for place, points in config.points_bands
+                )
+            ),
+        )
+
+    @property
+    def last_place(self) -> int:
+        return max([1, *(place for place, _ in self.bands)])
+
+    def for_place(self, place: int) -> int:
+        if place == 1:
+            return self.closest
+        for last, points in self.bands:
+            if place <= last:
+                return points
+        return 0
+
+
+def round_points(
+    handler: guess_handler,
+    answer: float,
+    closest_without_going_over: bool,
+    scheme: point_scheme,
+) -> Dict[str, int]:
+    """
+    The points each chatter earned in a round, leaving out those who earned none.
+    """
+    earned = {}
+    for place, value, names in handler.placings(
+        answer, closest_without_going_over, scheme.last_place
+    ):
+        points = scheme.for_place(place) + (scheme.exact if value == answer else 0)
+        if points > 0:
+            for name in names:
+                earned[name] = points
+    return earned
+
+
+def write_standings(
+    path: pathlib.Path, names: List[str], points: array, order: array
+) -> None:
+    """
+    Write the standings atomically, in ranked order, so loading needs no sort.
+    """
+    ranked_points = array("q", (points[slot] for slot in order))
+    if sys.byteorder != "little":
+        ranked_points.byteswap()
+    ranked_names = "\n".join(names[slot] for slot in order).encode("utf-8")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, "wb") as standings_file:
+        standings_file.write(MAGIC)
+        standings_file.write(HEADER.pack(len(order)))
+        standings_file.write(ranked_points.tobytes())
+        standings_file.write(ranked_names)
+        standings_file.flush()
+        os.fsync(standings_file.fileno())
+    os.replace(temp_path, path)
+
+
+class standings:
+    """
+    Cumulative points for one channel, ranked, and saved to a file if given one.
+    """
+
+    path: pathlib.Path | None
+    players: intern_table
+    points: array
+    ranking: sorted_blocks
+    executor: ThreadPoolExecutor | None
+
+    def __init__(self, path: str | os.PathLike | None = None) -> None:
+        self.path = pathlib.Path(path) if path else None
+        self.players = intern_table()
+        # Each chatter's points, by slot
+        self.points = array("q")
+        self.ranking = sorted_blocks()
+        # One thread, so saves land in the order they were made
+        self.executor = None
+
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def load(self) -> None:
+        data = self.path.read_bytes()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{self.path} is not a standings file")
+
+        (count,) = HEADER.unpack_from(data, len(MAGIC))
+        start = len(MAGIC) + HEADER.size
+        end = start + 8 * count
+        self.points = array("q")
+        self.points.frombytes(data[start:end])
+        if sys.byteorder != "little":
+            self.points.byteswap()
+
+        if count:
+            for name in data[end:].decode("utf-8").split("\n"):
+                self.players.add(name)
+
+        # Saved in ranked order, so the keys are already sorted
+        keys = array(
+            "q", (ranking_key(points, slot) for slot, points in enumerate(self.points))
+        )
+        self.ranking = sorted_blocks.from_sorted(keys, array("i", range(count)))
+
+    def award(self, earned: Mapping[str, int]) -> None:
+        """
+        Add points to each chatter's total.
+        """
+        for name, points in earned.items():
+            slot = self.players.add(name)
+            if slot == len(self.points):
+                self.points.append(0)
+            else:
+                self.ranking.remove(ranking_key(self.points[slot], slot), slot)
+            self.points[slot] += points
+            self.ranking.insert(ranking_key(self.points[slot], slot), slot)
+
+    def place_for(self, points: int) -> int:
+        # One more than the number of chatters with more points
+        return self.ranking.bisect_left(ranking_key(points, 0)) + 1
+
+    def rank(self, name: str) -> Tuple[int, int] | None:
+        """
+        A chatter's place and points, or None if they have never scored.
+        """
+        slot = self.players.find(name)
+        if slot < 0:
+            return None
+        points = self.points[slot]
+        return self.place_for(points), points
+
+    def top(self, count: int) -> List[Tuple[int, str, int]]:
+        """
+        The chatters with the most points, as (place, name, points).
+        """
+        names = self.players.names
+        leaders = []
+        for index, slot in enumerate(itertools.islice(self.ranking.tags(), count)):
+            points = self.points[slot]
+            place = index + 1
+            if leaders and leaders[-1][2] == points:
+                place = leaders[-1][0]
+            leaders.append((place, names[slot], points))
+        return leaders
+
+    def save(self) -> asyncio.Future:
+        """
+        Save the standings as they are now, in the background.
+        """
+        # Only loaded here, so scoring tools can import this without them
+        import asyncio  # pylint: disable=C0415
+        from concurrent.futures import ThreadPoolExecutor  # pylint: disable=C0415
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(1, thread_name_prefix="standings")
+        # Copies, as the next round may change the standings during the write
+        order = array("i")
+        for block in self.ranking.tag_blocks:
+            order.extend(block)
+        return asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            write_standings,
+            self.path,
+            list(self.players.names),
+            array("q", self.points),
+            order,
+        )
+
+    def close(self) -> None:
+        # Waits for any save in progress
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,322 @@
+"""
+Supervisor running the bot across several worker processes.
+
+A single process handles every channel on one core. The supervisor instead
+shares the channels between worker processes by consistent hashing, each
+worker running an ordinary Bot for its share. Workers which die are started
+again, backing off if they keep dying. When the channels in the config file
+change, only the workers whose share changed are restarted; their rounds
+carry over through the journal, if one is configured.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, List
+
+import dataclasses
+import logging
+import multiprocessing
+import multiprocessing.process
+import os
+import signal
+import time
+
+from bot import config, log
+from bot.hash_ring import hash_ring
+
+# Restarts back off from this, doubling each time a worker dies young
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 60.0
+# A worker which lasted this long is considered to have been healthy
+HEALTHY_UPTIME = 60.0
+
+
+def worker_config(
+    bot_config: config.Config, channels: List[str], index: int = 0, workers: int = 1
+) -> config.Config:
+    """
+    The config for a worker serving the given channels.
+    Each worker serves metrics on its own port, counting up from the configured one,
+    and has an equal share of the send rate, which the chat server limits per account.
+    """
+    default_channel = bot_config.default_channel
+    if default_channel not in channels:
+        default_channel = ""
+    metrics_port = bot_config.metrics_port
+    if metrics_port:
+        metrics_port += index
+    return dataclasses.replace(
+        bot_config,
+        default_channel=default_channel,
+        channels={name: bot_config.channels.get(name) for name in channels},
+        metrics_port=metrics_port,
+        send_rate_limit=max(1, bot_config.send_rate_limit // workers),
+    )
+
+
+def narrow_reload(bot_config: config.Config, running: config.Config) -> config.Config:
+    """
+    A reloaded config cut down to the share of a worker running with the given config.
+    Channels moving between workers are left to the supervisor, which restarts those workers;
+    the worker keeps its own metrics port, recording and share of the send rate.
+    """
+    wanted = set(bot_config.channel_names())
+    return dataclasses.replace(
+        worker_config(
+            bot_config,
+            [name for name in running.channel_names() if name in wanted],
+        ),
+        metrics_port=running.metrics_port,
+        record_path=running.record_path,
+        send_rate_limit=running.send_rate_limit,
+    )
+
+
+def run_worker(
+    token: str, bot_config: config.Config, name: str, configfile: str = ""
+) -> None:
+    # Imported here so the supervisor itself never loads the chat client
+    from bot.bot import Bot  # pylint: disable=C0415
+
+    if bot_config.record_path:
+        # Workers each record their own channels, to their own file
+        bot_config = dataclasses.replace(
+            bot_config, record_path=f"{bot_config.record_path}.{name}"
+        )
+    log.init()
+    this_bot = Bot(token, bot_config, log.get_logger(name), configfile, narrow_reload)
+
+    async def stop() -> None:
+        await this_bot.shut_down()
+        await this_bot.close()
+        this_bot.loop.stop()
+
+    # The supervisor stops workers with SIGTERM; save what is buffered before exiting
+    this_bot.loop.add_signal_handler(
+        signal.SIGTERM, lambda: this_bot.loop.create_task(stop(), name="stop")
+    )
+    this_bot.run()
+
+
+def start_target(
+    target: Callable[[str, config.Config, str, str], None],
+    token: str,
+    bot_config: config.Config,
+    name: str,
+    configfile: str,
+) -> None:
+    """
+    Run a worker's target, without the signal handlers it inherited from the supervisor.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    target(token, bot_config, name, configfile)
+
+
+def config_changed_at(configfile: str) -> float | None:
+    """
+    When the config file was last changed, or None if it cannot be seen right now,
+    such as while an editor is saving it.
+    """
+    try:
+        return os.stat(configfile).st_mtime
+    except OSError:
+        return None
+
+
+def worker_channels(bot_config: config.Config | None) -> set:
+    return set(bot_config.channel_names()) if bot_config is not None else set()
+
+
+class worker:
+    __slots__ = ("name", "config", "process", "started", "restart_delay", "restart_at")
+
+    name: str
+    config: config.Config | None
+    process: multiprocessing.process.BaseProcess | None
+    started: float
+    restart_delay: float
+    restart_at: float
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.config = None
+        self.process = None
+        self.started = 0.0
+        self.restart_delay = RESTART_DELAY
+        self.restart_at = 0.0
+
+
+class supervisor:
+    token: str
+    config: config.Config
+    logger: logging.Logger
+    workers: Dict[str, worker]
+    ring: hash_ring
+    target: Callable[[str, config.Config, str, str], None]
+    configfile: str
+
+    def __init__(
+        self,
+        token: str,
+        bot_config: config.Config,
+        logger: logging.Logger,
+        workers: int,
+        target: Callable[[str, config.Config, str, str], None] = run_worker,
+    ) -> None:
+        self.token = token
+        self.logger = logger
+        self.target = target
+        # Passed on to the workers to watch, once running
+        self.configfile = ""
+        self.workers = {
+            name: worker(name) for name in (f"worker{i}" for i in range(workers))
+        }
+        self.ring = hash_ring(self.workers)
+        self.config = bot_config
+
+    def plan(self, bot_config: config.Config) -> Dict[str, config.Config | None]:
+        """
+        The config each worker should be running; None if it has no channels.
+        """
+        assignment = self.ring.assign(bot_config.channel_names())
+        return {
+            name: (
+                worker_config(bot_config, assignment[name], index, len(self.workers))
+                if name in assignment
+                else None
+            )
+            for index, name in enumerate(self.workers)
+        }
+
+    def apply(self, bot_config: config.Config) -> None:
+        """
+        Bring the workers in line with the config, restarting only those whose channels changed.
+        The rest take up any other change from the config file themselves.
+        """
+        self.config = bot_config
+        changed = []
+        for name, wanted in self.plan(bot_config).items():
+            this_worker = self.workers[name]
+            if worker_channels(this_worker.config) != worker_channels(wanted):
+                changed.append((this_worker, wanted))
+            else:
+                # Used when it is next started
+                this_worker.config = wanted
+
+        # Every old worker stops before any replacement starts,
+        # so no channel is ever served twice
+        for this_worker, _ in changed:
+            self.stop_worker(this_worker)
+        for this_worker, wanted in changed:
+            this_worker.config = wanted
+            this_worker.restart_delay = RESTART_DELAY
+            if wanted is not None:
+                self.start_worker(this_worker)
+
+    def start_worker(self, this_worker: worker) -> None:
+        this_worker.process = multiprocessing.Process(
+            target=start_target,
+            args=(
+                self.target,
+                self.token,
+                this_worker.config,
+                this_worker.name,
+                self.configfile,
+            ),
+            name=this_worker.name,
+            daemon=True,
+        )
+        this_worker.process.start()
+        this_worker.started = time.monotonic()
+        self.logger.info(
+            "Started %s (pid %s) for %d channels",
+            this_worker.name,
+            this_worker.process.pid,
+            len(this_worker.config.channel_names()),
+        )
+
+    def stop_worker(self, this_worker: worker, timeout: float = 10.0) -> None:
+        process = this_worker.process
+        this_worker.process = None
+        if process is None:
+            return
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+        process.join()
+
+    def check_workers(self) -> None:
+        """
+        Start again any worker which has died, once its back-off has passed.
+        """
+        now = time.monotonic()
+        for this_worker in self.workers.values():
+            if this_worker.config is None:
+                continue
+
+            process = this_worker.process
+            if process is not None:
+                if process.is_alive():
+                    continue
+                process.join()
+                this_worker.process = None
+                if now - this_worker.started >= HEALTHY_UPTIME:
+                    this_worker.restart_delay = RESTART_DELAY
+                this_worker.restart_at = now + this_worker.restart_delay
+                self.logger.warning(
+                    "%s exited with code %s; restarting in %.0f seconds",
+                    this_worker.name,
+                    process.exitcode,
+                    this_worker.restart_delay,
+                )
+                this_worker.restart_delay = min(
+                    2 * this_worker.restart_delay, MAX_RESTART_DELAY
+                )
+
+            if now >= this_worker.restart_at:
+                self.start_worker(this_worker)
+
+    def run(self, configfile: str, poll_interval: float = 1.0) -> None:
+        """
+        Supervise the workers until interrupted, picking up channel changes from the config file.
+        """
+        self.configfile = configfile
+
+        def handle_signal(signum: int, _frame: object) -> None:
+            # Without this, SIGTERM would end the supervisor and leave its workers running
+            self.logger.info(
+                "Received %s; stopping workers", signal.Signals(signum).name
+            )
+            self.stop()
+            raise SystemExit(0)
+
+        previous = {
+            signum: signal.signal(signum, handle_signal)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        self.apply(self.config)
+        config_mtime = config_changed_at(configfile)
+        try:
+            while True:
+                time.sleep(poll_interval)
+                mtime = config_changed_at(configfile)
+                if mtime is not None and mtime != config_mtime:
+                    config_mtime = mtime
+                    self.logger.info("Config file changed; rebalancing channels")
+                    try:
+                        self.apply(config.load_config_from_file(configfile))
+                    except Exception:  # pylint: disable=W0703
+                        # Keep the workers as they are until the file is fixed
+                        self.logger.exception("Could not load %s", configfile)
+                self.check_workers()
+        finally:
+            self.stop()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def stop(self) -> None:
+        for this_worker in self.workers.values():
+            self.stop_worker(this_worker)
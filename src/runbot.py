@@ -1,9 +1,10 @@
-import yaml
-
-from bot import bot, config, log
+from bot import config, log
 
 
 def load_token(tokenfile: str) -> str:
+    # Only needed here, so importing the bot modules never loads YAML
+    import yaml  # pylint: disable=C0415
+
     with open(tokenfile, "r") as yaml_file:
         token_dict = yaml.safe_load(yaml_file)
 
@@ -18,7 +19,19 @@ def runbot(
 
     log.init()
 
-    this_bot = bot.Bot(token, bot_config, log.get_logger())
+    # The chat client is only loaded by whichever process runs a Bot
+    if bot_config.worker_processes > 1:
+        from bot.supervisor import supervisor  # pylint: disable=C0415
+
+        # Channels are shared out between worker processes, each running its own Bot
+        supervisor(
+            token, bot_config, log.get_logger("supervisor"), bot_config.worker_processes
+        ).run(configfile)
+        return
+
+    from bot import bot  # pylint: disable=C0415
+
+    this_bot = bot.Bot(token, bot_config, log.get_logger(), configfile)
 
     this_bot.run()
 
@@ -0,0 +1,19 @@
+"""
+Fixtures shared by every test
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from bot import config
+
+
+@pytest.fixture(autouse=True)
+def config_cache_dir(tmp_path, monkeypatch):
+    """
+    Keep cached config settings out of the user's own cache directory
+    """
+    cache_dir = tmp_path / "config-cache"
+    monkeypatch.setenv(config.CACHE_DIR_VARIABLE, str(cache_dir))
+    return cache_dir
@@ -5,12 +5,58 @@ Assumes generally that without a token no connection will be made.
 
 from __future__ import annotations
 
+import asyncio
+import datetime
+import os
+
 import pytest
+import yaml
+from twitchio import Channel, Chatter, Message
 
-from bot import bot
-from bot.config import Config
+from bot import bot, channel, chat_recorder
+from bot.config import Config, load_config_from_file
 from bot import log
 
+SENT_AT = datetime.datetime(2023, 11, 14, 22, 13, 20)
+
+
+def make_message(
+    channel_name: str,
+    name: str,
+    content: str,
+    timestamp: datetime.datetime = SENT_AT,
+) -> Message:
+    """
+    A chat message from a viewer, as the connection would deliver it
+    """
+    sent_ms = int(timestamp.replace(tzinfo=datetime.timezone.utc).timestamp() * 1000)
+    tags = {
+        "subscriber": "0",
+        "mod": "0",
+        "display-name": name,
+        # Per-user cooldowns key on this
+        "user-id": name,
+        "color": "",
+        "badges": "",
+        "id": f"{channel_name}-{name}-{sent_ms}",
+        "tmi-sent-ts": str(sent_ms),
+    }
+    this_channel = Channel(channel_name, None)
+    author = Chatter(None, name=name, channel=this_channel, tags=tags)
+    return Message(content=content, author=author, channel=this_channel, tags=tags)
+
+
+class fake_channel:
+    """
+    Stands in for a joined channel, keeping what is sent to it
+    """
+
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def send(self, message: str) -> None:
+        self.sent.append(message)
+
 
 class TestBot:
     """
@@ -25,7 +71,7 @@ class TestBot:
         """
         log.init(filepath)
 
-        test_config = Config({"default_channel": "", "prefix": "!"})
+        test_config = Config(default_channel="", prefix="!")
 
         self.test_bot = bot.Bot("", test_config, log.get_logger())
 
@@ -37,3 +83,665 @@ class TestBot:
         self.setup_bot(tmpdir)
 
         await self.test_bot.event_ready()
+
+    @pytest.mark.asyncio
+    async def test_round_recovered_from_journal(self, tmpdir) -> None:
+        """
+        Test a restarted bot picks up the round from the journal
+        """
+        log.init(tmpdir)
+        test_config = Config(
+            default_channel="a",
+            prefix="!",
+            journal_path=str(tmpdir / "journal"),
+            channels={"b": None},
+        )
+
+        first_bot = bot.Bot("", test_config, log.get_logger())
+        for name in ("a", "b"):
+            first_round = first_bot.round_for(name)
+            first_round.reset_guesses()
+            first_round.set_state(bot.botState.COLLECTING_VALS)
+            await first_round.record_guess(name, "12")
+        await first_bot.round_for("b").record_guess("c", "15")
+        for first_round in first_bot.rounds.values():
+            first_round.close()
+
+        second_bot = bot.Bot("", test_config, log.get_logger())
+        assert set(second_bot.rounds) == {"a", "b"}
+        second_round = second_bot.rounds["b"]
+        assert second_round.bot_state == bot.botState.COLLECTING_VALS
+        assert second_round.guess_handler.guesses == {"b": 12, "c": 15}
+        assert second_bot.rounds["a"].guess_handler.guesses == {"a": 12}
+
+    @pytest.mark.asyncio
+    async def test_shut_down_saves(self, tmpdir) -> None:
+        """
+        Test shutting down records queued guesses and saves the journal and recording
+        """
+        log.init(tmpdir)
+        test_config = Config(
+            default_channel="a",
+            journal_path=str(tmpdir / "journal"),
+            record_path=str(tmpdir / "chat.jsonl"),
+        )
+        first_bot = bot.Bot("", test_config, log.get_logger())
+        first_round = first_bot.round_for("a")
+        first_round.reset_guesses()
+        first_round.set_state(bot.botState.COLLECTING_VALS)
+        await first_bot.event_message(make_message("a", "viewer", "12"))
+        await first_bot.shut_down()
+
+        second_bot = bot.Bot("", test_config, log.get_logger())
+        assert second_bot.rounds["a"].guess_handler.guesses == {"viewer": 12}
+        assert [
+            message.content
+            for message in chat_recorder.read_recording(tmpdir / "chat.jsonl")
+        ] == ["12"]
+        await second_bot.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_queued_guesses_recorded(self, tmpdir) -> None:
+        """
+        Test guesses queued for ingest are parsed and recorded as a batch
+        """
+        self.setup_bot(tmpdir)
+        this_round = self.test_bot.round_for("")
+        for i_name, i_content in (("a", "12"), ("b", "15 and some words"), ("a", "14")):
+            value = this_round.parser.parse(i_content)
+            self.test_bot.ingest.submit(i_name, i_content, None, value)
+
+        await self.test_bot.ingest.drain()
+
+        assert this_round.guess_handler.guesses == {"a": 14, "b": 15}
+        await self.test_bot.ingest.close()
+
+    @pytest.mark.asyncio
+    async def test_invalid_guess_pings_coalesced(self, tmpdir) -> None:
+        """
+        Test a flood of invalid guesses is answered with a single message
+        """
+        self.setup_bot(tmpdir)
+        channel = fake_channel()
+        self.test_bot.get_channel = lambda name: channel
+        this_round = self.test_bot.round_for("")
+        for i_name in ("a", "b", "c"):
+            self.test_bot.ingest.submit(
+                i_name, "-5", None, this_round.parser.parse("-5")
+            )
+
+        await self.test_bot.ingest.close()
+        await self.test_bot.outbound.close()
+
+        assert channel.sent == ["@a @b @c Positive whole numbers only please"]
+
+    @pytest.mark.asyncio
+    async def test_many_channels(self, tmpdir) -> None:
+        """
+        Test rounds in many channels are kept apart, and idle channels hold no round
+        """
+        log.init(tmpdir)
+        channel_names = [f"channel{i}" for i in range(500)]
+        test_config = Config(
+            prefix="!",
+            channels={
+                name: {"prefix": "?"} if i % 4 == 0 else None
+                for i, name in enumerate(channel_names)
+            },
+        )
+        self.test_bot = bot.Bot("", test_config, log.get_logger())
+        assert not self.test_bot.rounds
+
+        # Rounds open in every other channel
+        for name in channel_names[::2]:
+            this_round = self.test_bot.round_for(name)
+            this_round.reset_guesses()
+            this_round.set_state(bot.botState.COLLECTING_VALS)
+
+        for i, name in enumerate(channel_names):
+            await self.test_bot.event_message(make_message(name, "viewer", str(i)))
+            await self.test_bot.event_message(make_message(name, "other", "chat"))
+        await self.test_bot.ingest.close()
+
+        assert len(self.test_bot.rounds) == 250
+        for i, name in enumerate(channel_names[::2]):
+            this_round = self.test_bot.rounds[name]
+            assert this_round.guess_handler.guesses == {"viewer": 2 * i}
+            assert this_round.parser.prefix == ("?" if i % 2 == 0 else "!")
+        assert len(self.test_bot.parsers) == 2
+
+    @pytest.mark.asyncio
+    async def test_round_closes_at_deadline(self, tmpdir, monkeypatch) -> None:
+        """
+        Test guesses are judged by their timestamps against the deadline,
+        and the round closes itself once it has passed
+        """
+        monkeypatch.setattr(channel, "CLOSE_GRACE", 0.05)
+        self.setup_bot(tmpdir)
+        joined = fake_channel()
+        self.test_bot.get_channel = lambda name: joined
+        this_round = self.test_bot.round_for("")
+        this_round.reset_guesses()
+        this_round.set_state(bot.botState.COLLECTING_VALS)
+
+        deadline = channel.utc_now()
+        this_round.schedule_close(deadline + datetime.timedelta(seconds=10))
+        # Asked again: the earlier deadline wins
+        this_round.schedule_close(deadline)
+        assert this_round.close_at == deadline
+
+        second = datetime.timedelta(seconds=1)
+        await self.test_bot.event_message(make_message("", "a", "5", deadline - second))
+        await self.test_bot.event_message(make_message("", "b", "6", deadline))
+        await self.test_bot.event_message(make_message("", "c", "7", deadline + second))
+        assert this_round.bot_state == bot.botState.COLLECTING_VALS
+
+        await asyncio.sleep(0.2)
+        await self.test_bot.outbound.close()
+        await self.test_bot.ingest.close()
+
+        assert this_round.bot_state == bot.botState.HOLDING_FOR_ANSWER
+        assert this_round.close_at is None
+        assert this_round.guess_handler.guesses == {"a": 5, "b": 6}
+        assert joined.sent == ["Collected 2, between 5 and 6"]
+
+    @pytest.mark.asyncio
+    async def test_stop_timed_round(self, tmpdir) -> None:
+        """
+        Test stopping a round opened with a duration waits for the stop delay,
+        and only asking again closes it at once
+        """
+        log.init(tmpdir)
+        self.test_bot = bot.Bot(
+            "", Config(round_duration=120, stopguess_delay=10), log.get_logger()
+        )
+        sent = []
+        self.test_bot.outbound.announce = lambda text, sender=None: sent.append(text)
+        self.test_bot.outbound.reply = lambda text, sender: sent.append(text)
+        # Chat timestamps are whole milliseconds
+        started = channel.utc_now().replace(microsecond=0)
+        second = datetime.timedelta(seconds=1)
+
+        await self.test_bot.event_message(
+            make_message("a", "a", "!startguessing", started)
+        )
+        this_round = self.test_bot.rounds["a"]
+        assert this_round.close_at == started + 120 * second
+        assert not this_round.stop_requested
+
+        await self.test_bot.event_message(
+            make_message("a", "a", "!stopguessing", started + second)
+        )
+        assert this_round.stop_requested
+        assert this_round.close_at == started + 11 * second
+        assert this_round.bot_state == bot.botState.COLLECTING_VALS
+
+        await self.test_bot.event_message(
+            make_message("a", "a", "!stopguessing", started + 2 * second)
+        )
+        assert this_round.close_at == started + 2 * second
+        assert sent == [
+            "Give guesses now! Positive integers only. Closing in 120 seconds",
+            "Guessing window closed",
+            "Closing guesses now",
+        ]
+        this_round.close()
+
+    @pytest.mark.asyncio
+    async def test_chat_recorded(self, tmpdir) -> None:
+        """
+        Test incoming chat is recorded as it arrives, whatever the round is doing
+        """
+        log.init(tmpdir)
+        path = tmpdir / "chat.jsonl"
+        self.test_bot = bot.Bot("", Config(record_path=str(path)), log.get_logger())
+
+        await self.test_bot.event_message(make_message("a", "viewer", "hello"))
+        await self.test_bot.event_message(make_message("a", "a", "12"))
+        self.test_bot.recorder.close()
+
+        assert list(chat_recorder.read_recording(path)) == [
+            chat_recorder.captured_message(SENT_AT, "a", "viewer", "hello", False),
+            # The broadcaster counts as a mod
+            chat_recorder.captured_message(SENT_AT, "a", "a", "12", True),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_guess_metrics(self, tmpdir) -> None:
+        """
+        Test guesses are counted by what became of them, and handling is timed
+        """
+        self.setup_bot(tmpdir)
+        self.test_bot.get_channel = lambda name: fake_channel()
+        this_round = self.test_bot.round_for("")
+        this_round.reset_guesses()
+        this_round.set_state(bot.botState.COLLECTING_VALS)
+        this_round.close_at = SENT_AT
+
+        late = SENT_AT + datetime.timedelta(seconds=1)
+        for name, content, timestamp in [
+            ("a", "5", SENT_AT),
+            ("b", "6", SENT_AT),
+            ("a", "7", SENT_AT),
+            ("c", "-3", SENT_AT),
+            ("d", "8", late),
+            ("e", "hello", SENT_AT),
+        ]:
+            await self.test_bot.event_message(
+                make_message("", name, content, timestamp)
+            )
+        await self.test_bot.ingest.close()
+        await self.test_bot.outbound.close()
+
+        metrics = self.test_bot.metrics
+        assert metrics.messages_received.value == 6
+        assert metrics.guesses_accepted.value == 2
+        assert metrics.guesses_replaced.value == 1
+        assert metrics.rejected_invalid.value == 1
+        assert metrics.rejected_late.value == 1
+        assert sum(metrics.event_message_seconds.counts) == 6
+        assert sum(metrics.record_guess_seconds.counts) == 1
+        assert "foxbot_ingest_queue_depth 0\n" in metrics.registry.render()
+
+    @pytest.mark.asyncio
+    async def test_flood_suppressed(self, tmpdir) -> None:
+        """
+        Test spam is dropped before parsing and counted, while mods are never limited
+        """
+        log.init(tmpdir)
+        self.test_bot = bot.Bot(
+            "", Config(flood_rate=0.001, flood_burst=3), log.get_logger()
+        )
+        this_round = self.test_bot.round_for("a")
+        this_round.reset_guesses()
+        this_round.set_state(bot.botState.COLLECTING_VALS)
+
+        for content in ["12"] * 20 + ["13", "14", "15", "16"]:
+            await self.test_bot.event_message(make_message("a", "viewer", content))
+        for content in ["20"] * 5:
+            await self.test_bot.event_message(make_message("a", "a", content))
+        await self.test_bot.ingest.close()
+
+        # Only what got through was parsed and queued
+        assert self.test_bot.ingest.received == 8
+        assert this_round.guess_handler.guesses == {"viewer": 14, "a": 20}
+        assert self.test_bot.flood.suppressed_duplicate == 19
+        assert self.test_bot.flood.suppressed_rate == 2
+        rendered = self.test_bot.metrics.registry.render()
+        assert 'foxbot_messages_suppressed_total{reason="duplicate"} 19\n' in rendered
+        assert 'foxbot_messages_suppressed_total{reason="rate"} 2\n' in rendered
+        assert "foxbot_flood_chatters 1\n" in rendered
+
+    @pytest.mark.asyncio
+    async def test_profile_command(self, tmpdir) -> None:
+        """
+        Test a mod can profile the bot, with the summary sent back once it finishes
+        """
+        log.init(tmpdir)
+        self.test_bot = bot.Bot(
+            "", Config(profile_path=str(tmpdir / "profiles")), log.get_logger()
+        )
+        replies = []
+        self.test_bot.outbound.reply = lambda text, sender: replies.append(text)
+
+        # The broadcaster counts as a mod
+        await self.test_bot.event_message(make_message("a", "a", "!profile 1 sample"))
+        await asyncio.sleep(0)
+        assert self.test_bot.profiler.running == "sample"
+        await self.test_bot.event_message(make_message("a", "a", "!memsnapshot"))
+        await asyncio.sleep(1.2)
+
+        assert replies[0] == "Already running a sample profile"
+        assert replies[1].startswith("Sampled 1s")
+        assert len((tmpdir / "profiles").listdir()) == 1
+
+    @pytest.mark.asyncio
+    async def test_score_without_guesses(self, tmpdir) -> None:
+        """
+        Test scoring a round nobody guessed in says so, and still ends the round
+        """
+        self.setup_bot(tmpdir)
+        sent = []
+        self.test_bot.outbound.announce = lambda text, sender=None: sent.append(text)
+        this_round = self.test_bot.round_for("a")
+        this_round.reset_guesses()
+        this_round.set_state(bot.botState.HOLDING_FOR_ANSWER)
+
+        await self.test_bot.event_message(make_message("a", "a", "!score 5"))
+
+        assert sent == ["No guesses this round"]
+        assert this_round.bot_state == bot.botState.NOT_PROCESSING
+
+    @pytest.mark.asyncio
+    async def test_guesscommands(self, tmpdir) -> None:
+        """
+        Test the command list is given with the channel's own prefix
+        """
+        log.init(tmpdir)
+        self.test_bot = bot.Bot(
+            "", Config(channels={"a": {"prefix": "?"}}), log.get_logger()
+        )
+        replies = []
+        self.test_bot.outbound.reply = lambda text, sender: replies.append(text)
+
+        await self.test_bot.event_message(make_message("a", "a", "?guesscommands"))
+
+        assert replies[0].startswith("?startguessing, ?stopguessing, ?score (result), ")
+        assert replies[0].endswith("?importguesses (file).")
+        assert "{prefix}" not in replies[0]
+
+    @pytest.mark.asyncio
+    async def test_profile_failure_reported(self, tmpdir) -> None:
+        """
+        Test a profile which fails is logged and reported back, rather than lost
+        """
+        log.init(tmpdir)
+        # The profiles directory cannot be made where a file already is
+        (tmpdir / "profiles").write_text("", encoding="utf-8")
+        self.test_bot = bot.Bot(
+            "", Config(profile_path=str(tmpdir / "profiles")), log.get_logger()
+        )
+        replies = []
+        self.test_bot.outbound.reply = lambda text, sender: replies.append(text)
+
+        await self.test_bot.event_message(make_message("a", "a", "!memsnapshot 1"))
+        await asyncio.sleep(1.2)
+
+        assert len(replies) == 1
+        assert replies[0].startswith("The memory profile failed: ")
+        assert self.test_bot.profiler.running is None
+
+    @staticmethod
+    def test_format_histogram() -> None:
+        """
+        Test a histogram fits on one line, scaled to the largest range
+        """
+        message = bot.format_histogram(
+            [(1, 10, 4), (11, 20, 0), (21, 21, 8)], {5: 1.45, 50: 10.5, 95: 21.0}
+        )
+        assert message == "▄▁█ | 1-10: 4, 11-20: 0, 21: 8 | p5 1.45, p50 10.5, p95 21"
+
+    @pytest.mark.asyncio
+    async def test_round_history(self, tmpdir) -> None:
+        """
+        Test the round which is scored is saved, for the leaderboard and anyone's own stats
+        """
+        log.init(tmpdir)
+        self.test_bot = bot.Bot(
+            "", Config(history_path=str(tmpdir / "history.sqlite")), log.get_logger()
+        )
+        sent = []
+        self.test_bot.outbound.announce = lambda text, sender=None: sent.append(text)
+        self.test_bot.outbound.reply = lambda text, sender: sent.append(text)
+
+        this_round = self.test_bot.round_for("a")
+        this_round.reset_guesses()
+        this_round.set_state(bot.botState.HOLDING_FOR_ANSWER)
+        await this_round.apply_guesses([("viewer", 10), ("other", 20)])
+
+        # The broadcaster counts as a mod; scoring again is not saved again
+        await self.test_bot.event_message(make_message("a", "a", "!score 12"))
+        await self.test_bot.event_message(make_message("a", "a", "!score 20"))
+        await asyncio.gather(
+            *(task for task in asyncio.all_tasks() if task.get_name() == "history-a")
+        )
+
+        await self.test_bot.event_message(make_message("a", "a", "!leaderboard"))
+        # Open to viewers, but only once in a while
+        await self.test_bot.event_message(make_message("a", "viewer", "!mystats"))
+        await self.test_bot.event_message(make_message("a", "viewer", "!mystats"))
+        await self.test_bot.event_message(make_message("a", "viewer", "!stats"))
+        await self.test_bot.history.close()
+
+        assert sent[2:] == [
+            "Most wins: 1. viewer 1/1",
+            "1 wins from 1 rounds (100%), place 1",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_standings(self, tmpdir) -> None:
+        """
+        Test the round which is scored adds points, kept across a restart, for rank and top
+        """
+        log.init(tmpdir)
+        test_config = Config(standings_path=str(tmpdir / "standings"))
+        self.test_bot = bot.Bot("", test_config, log.get_logger())
+
+        this_round = self.test_bot.round_for("a")
+        this_round.reset_guesses()
+        this_round.set_state(bot.botState.HOLDING_FOR_ANSWER)
+        await this_round.apply_guesses([("viewer", 10), ("other", 20), ("third", 30)])
+
+        # Scoring again does not add the points again
+        await self.test_bot.event_message(make_message("a", "a", "!score 10"))
+        await self.test_bot.event_message(make_message("a", "a", "!score 20"))
+        await asyncio.gather(
+            *(task for task in asyncio.all_tasks() if task.get_name() == "standings-a")
+        )
+        this_round.close()
+
+        self.test_bot = bot.Bot("", test_config, log.get_logger())
+        sent = []
+        self.test_bot.outbound.announce = lambda text, sender=None: sent.append(text)
+        self.test_bot.outbound.reply = lambda text, sender: sent.append(text)
+
+        await self.test_bot.event_message(make_message("a", "a", "!top"))
+        # Open to viewers, but only once in a while
+        await self.test_bot.event_message(make_message("a", "other", "!rank"))
+        await self.test_bot.event_message(make_message("a", "other", "!rank"))
+        await self.test_bot.event_message(make_message("a", "third", "!rank @Viewer"))
+        await self.test_bot.event_message(make_message("a", "nobody", "!rank"))
+        await self.test_bot.event_message(make_message("a", "nobody", "!top"))
+
+        assert sent == [
+            "Most points: 1. viewer 5, 2. other 2, 2. third 2",
+            "other is number 2 of 3 with 2 points",
+            "viewer is number 1 of 3 with 5 points",
+            "nobody has no points here yet",
+        ]
+        self.test_bot.round_for("a").close()
+
+    @pytest.mark.asyncio
+    async def test_addguess_name_as_chat_gives_it(self, tmpdir) -> None:
+        """
+        Test a guess added for a name typed with @ and capitals is found by !rank
+        """
+        log.init(tmpdir)
+        test_config = Config(standings_path=str(tmpdir / "standings"))
+        self.test_bot = bot.Bot("", test_config, log.get_logger())
+        sent = []
+        self.test_bot.outbound.reply = lambda text, sender: sent.append(text)
+
+        this_round = self.test_bot.round_for("a")
+        this_round.reset_guesses()
+        this_round.set_state(bot.botState.COLLECTING_VALS)
+        await self.test_bot.event_message(make_message("a", "a", "!addguess 10 @Viewer"))
+        await self.test_bot.ingest.drain()
+        assert this_round.guess_handler.guesses == {"viewer": 10}
+
+        this_round.set_state(bot.botState.HOLDING_FOR_ANSWER)
+        await self.test_bot.event_message(make_message("a", "a", "!score 10"))
+        await asyncio.gather(
+            *(task for task in asyncio.all_tasks() if task.get_name() == "standings-a")
+        )
+        await self.test_bot.event_message(make_message("a", "viewer", "!rank"))
+        assert sent[-1] == "viewer is number 1 of 1 with 5 points"
+        this_round.close()
+
+    @pytest.mark.asyncio
+    async def test_bulk_guesses(self, tmpdir) -> None:
+        """
+        Test mods can add many guesses in one message or from a file, with one summary each
+        """
+        log.init(tmpdir)
+        imports = tmpdir / "imports"
+        imports.mkdir()
+        test_config = Config(
+            guess_import_path=str(imports), journal_path=str(tmpdir / "journal")
+        )
+        self.test_bot = bot.Bot("", test_config, log.get_logger())
+        replies = []
+        self.test_bot.outbound.reply = lambda text, sender: replies.append(text)
+        this_round = self.test_bot.round_for("a")
+        this_round.reset_guesses()
+        this_round.set_state(bot.botState.COLLECTING_VALS)
+        await this_round.apply_guesses([("viewer", 5)])
+
+        await self.test_bot.event_message(
+            make_message("a", "a", "!addguesses b=10 @Viewer=12 c=x b=11 d=-4")
+        )
+        await self.test_bot.event_message(
+            make_message("a", "viewer", "!addguesses viewer=1000")
+        )
+
+        entries = [f"user{i},{i % 1000}" for i in range(100_000)]
+        (imports / "form.csv").write_text("\n".join(entries), encoding="utf-8")
+        await self.test_bot.event_message(
+            make_message("a", "a", "!importguesses form.csv")
+        )
+        await self.test_bot.event_message(
+            make_message("a", "a", "!importguesses ../form.csv")
+        )
+        await self.test_bot.event_message(
+            make_message("a", "a", "!importguesses missing.csv")
+        )
+
+        assert replies == [
+            "Guesses added: 1, replaced: 2. Skipped: 2 not understood (c=x, d=-4)",
+            "Guesses added: 100000, replaced: 0",
+            "Give just the name of the file to import",
+            "Could not read missing.csv",
+        ]
+        guesses = this_round.guess_handler.guesses
+        assert len(guesses) == 100_002
+        assert guesses["viewer"] == 12
+        assert guesses["b"] == 11
+        assert guesses["user12345"] == 345
+        # Those who guessed first are listed first
+        assert this_round.guess_handler.get_score(12, False)[0] == ["viewer"] + [
+            f"user{i}" for i in range(12, 100_000, 1000)
+        ]
+        this_round.close()
+
+        # Journalled like any other guesses
+        recovered = bot.Bot("", test_config, log.get_logger()).round_for("a")
+        assert recovered.guess_handler.guesses == guesses
+        recovered.close()
+
+    async def wait_for_prefix(self, prefix: str) -> None:
+        """
+        Wait until the bot has taken up a config with the given prefix
+        """
+        while self.test_bot.config.prefix != prefix:
+            await asyncio.sleep(0.01)
+
+    @pytest.mark.asyncio
+    async def test_config_reload(self, tmpdir) -> None:
+        """
+        Test a changed config file is taken up without losing the round in progress
+        """
+        log.init(tmpdir)
+        path = tmpdir / "config.yaml"
+        with open(path, "w", encoding="utf-8") as yaml_file:
+            yaml.dump({"default_channel": "a", "config_poll_interval": 0.01}, yaml_file)
+        self.test_bot = bot.Bot(
+            "", load_config_from_file(path), log.get_logger(), str(path)
+        )
+        joined = []
+
+        async def join(channels) -> None:
+            joined.extend(channels)
+
+        self.test_bot.join = join
+
+        this_round = self.test_bot.round_for("a")
+        this_round.reset_guesses()
+        this_round.set_state(bot.botState.COLLECTING_VALS)
+        await this_round.apply_guesses([("viewer", 10)])
+
+        watcher = asyncio.get_running_loop().create_task(self.test_bot.watch_config())
+        await asyncio.sleep(0)
+        with open(path, "w", encoding="utf-8") as yaml_file:
+            yaml.dump(
+                {
+                    "default_channel": "a",
+                    "prefix": "?",
+                    "use_latest_reply": False,
+                    "ingest_queue_size": 5,
+                    "channels": {"b": {"prefix": "#"}},
+                },
+                yaml_file,
+            )
+        # Make sure the change is seen, however coarse the file system's clock
+        os.utime(path, ns=(0, 0))
+        await asyncio.wait_for(self.wait_for_prefix("?"), 5)
+        watcher.cancel()
+        await asyncio.sleep(0)
+
+        assert this_round.bot_state == bot.botState.COLLECTING_VALS
+        assert this_round.guess_handler.guesses == {"viewer": 10}
+        assert this_round.parser.prefix == "?"
+        assert this_round.parser is self.test_bot.parser_for("?")
+        # Repeat guesses are now ignored
+        await this_round.apply_guesses([("viewer", 20)])
+        assert this_round.guess_handler.guesses == {"viewer": 10}
+
+        assert self.test_bot.is_public_command(make_message("b", "viewer", "#rank"))
+        assert not self.test_bot.is_public_command(make_message("a", "viewer", "!rank"))
+        # Only read at startup, so unchanged until a restart
+        assert self.test_bot.config.ingest_queue_size == 10000
+        assert self.test_bot.config.config_poll_interval == 0.01
+        assert joined == ["b"]
+
+        # A broken file is not taken up
+        with open(path, "w", encoding="utf-8") as yaml_file:
+            yaml.dump({"prefix": 5}, yaml_file)
+        assert not await self.test_bot.reload_config()
+        assert self.test_bot.config.prefix == "?"
+        this_round.close()
+
+    @pytest.mark.asyncio
+    async def test_parted_round_closed(self, tmpdir) -> None:
+        """
+        Test a channel dropped from the config has its round closed and forgotten
+        """
+        log.init(tmpdir)
+        test_config = Config(
+            default_channel="a",
+            journal_path=str(tmpdir / "journal"),
+            channels={"b": None},
+        )
+        self.test_bot = bot.Bot("", test_config, log.get_logger())
+        parted = []
+
+        async def part(channels) -> None:
+            parted.extend(channels)
+
+        async def join(_channels) -> None:
+            pass
+
+        self.test_bot.part = part
+        self.test_bot.join = join
+
+        this_round = self.test_bot.round_for("b")
+        this_round.reset_guesses()
+        this_round.set_state(bot.botState.COLLECTING_VALS)
+        await this_round.record_guess("viewer", "12")
+        self.test_bot.ingest.submit("other", "13", None, 13, "b")
+
+        self.test_bot.apply_config(
+            Config(default_channel="a", journal_path=test_config.journal_path)
+        )
+        await asyncio.sleep(0)
+        assert parted == ["b"]
+        assert "b" not in self.test_bot.rounds
+        assert this_round.journal is None
+        # Guesses still queued for the channel go nowhere
+        await self.test_bot.ingest.drain()
+        assert this_round.guess_handler.guesses == {"viewer": 12}
+
+        # Joining again later picks the round up from its journal
+        self.test_bot.apply_config(test_config)
+        assert self.test_bot.round_for("b").guess_handler.guesses == {"viewer": 12}
+        for this_round in self.test_bot.rounds.values():
+            this_round.close()
@@ -0,0 +1,100 @@
+"""
+Providing tests for the chat recorder
+"""
+
+from __future__ import annotations
+
+import datetime
+
+from bot.chat_recorder import captured_message, chat_recorder, read_recording
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+STARTED = datetime.datetime(2024, 3, 1, 20, 0, 0)
+
+
+def at(seconds: float) -> datetime.datetime:
+    """
+    A time this many seconds after the recording starts
+    """
+    return STARTED + datetime.timedelta(seconds=seconds)
+
+
+class TestChatRecorder:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    def test_round_trip(tmpdir) -> None:
+        """
+        Test messages read back as they were recorded, to the millisecond
+        """
+        path = tmpdir / "chat.jsonl"
+        recorder = chat_recorder(path)
+        recorder.record(at(0), "a", "mod_name", "!startguessing", True)
+        recorder.record(at(0.125), "a", "viewer", "42")
+        recorder.record(at(0.1), "b", "viewer", 'quotes " and\nnewlines')
+        recorder.close()
+
+        assert list(read_recording(path)) == [
+            captured_message(at(0), "a", "mod_name", "!startguessing", True),
+            captured_message(at(0.125), "a", "viewer", "42", False),
+            captured_message(at(0.1), "b", "viewer", 'quotes " and\nnewlines', False),
+        ]
+
+    @staticmethod
+    def test_appends_sessions(tmpdir) -> None:
+        """
+        Test a recording reopened later carries on, with its times intact
+        """
+        path = tmpdir / "chat.jsonl"
+        recorder = chat_recorder(path)
+        recorder.record(at(0), "a", "first", "1")
+        recorder.close()
+
+        recorder = chat_recorder(path)
+        recorder.record(at(3600), "a", "second", "2")
+        recorder.close()
+
+        assert [message.timestamp for message in read_recording(path)] == [
+            at(0),
+            at(3600),
+        ]
+
+    @staticmethod
+    def test_buffered_until_flush(tmpdir) -> None:
+        """
+        Test records are written in batches
+        """
+        path = tmpdir / "chat.jsonl"
+        recorder = chat_recorder(path, flush_every=3)
+        recorder.record(at(0), "a", "viewer", "1")
+        assert not list(read_recording(path))
+
+        recorder.record(at(1), "a", "viewer", "2")
+        # The session start and two messages fill a batch
+        assert len(list(read_recording(path))) == 2
+
+        recorder.record(at(2), "a", "viewer", "3")
+        recorder.flush()
+        assert len(list(read_recording(path))) == 3
+        recorder.close()
+
+    @staticmethod
+    def test_torn_write(tmpdir) -> None:
+        """
+        Test a recording cut short mid-line reads up to the tear
+        """
+        path = tmpdir / "chat.jsonl"
+        recorder = chat_recorder(path)
+        recorder.record(at(0), "a", "viewer", "1")
+        recorder.record(at(1), "a", "viewer", "2")
+        recorder.close()
+
+        with open(path, "a", encoding="utf-8") as record_file:
+            record_file.write('[5,"a","vie')
+
+        assert [message.content for message in read_recording(path)] == ["1", "2"]
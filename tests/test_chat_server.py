@@ -0,0 +1,125 @@
+"""
+Runs the bot end to end against the local chat server
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from typing import Callable
+
+import aiohttp
+import pytest
+import twitchio.websocket
+
+from bot import bot, channel, log
+from bot.chat_server import chat_event, chat_server
+from bot.config import Config
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+async def wait_until(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    """
+    Poll until the condition holds, failing the test if it never does
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+class TestChatServer:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_round_over_chat(tmpdir, monkeypatch) -> None:
+        """
+        Test a whole round played through chat, as it would be against Twitch
+        """
+        monkeypatch.setattr(channel, "CLOSE_GRACE", 0.05)
+        log.init(tmpdir)
+        server = chat_server()
+        await server.start()
+
+        test_bot = bot.Bot(
+            "",
+            Config(default_channel="fox", stopguess_delay=0, chat_server=server.url),
+            log.get_logger(),
+        )
+        try:
+            await test_bot.connect()
+            await server.wait_joined("fox")
+            # Only this bot's connection goes to the stand-in
+            assert twitchio.websocket.HOST == "wss://irc-ws.chat.twitch.tv:443"
+            assert test_bot.nick == "foxbot"
+
+            await server.say("fox", "modname", "!startguessing", mod=True)
+            await wait_until(lambda: "fox" in test_bot.rounds)
+            this_round = test_bot.rounds["fox"]
+            await wait_until(
+                lambda: this_round.bot_state == bot.botState.COLLECTING_VALS
+            )
+
+            await server.replay(
+                [
+                    chat_event(0.0, "fox", "viewer1", "10"),
+                    chat_event(0.0, "fox", "viewer2", "15 please"),
+                    chat_event(0.0, "fox", "viewer3", "what's the game?"),
+                    chat_event(0.0, "fox", "viewer4", "-3"),
+                    # Commands from viewers are ignored
+                    chat_event(0.0, "fox", "viewer5", "!stopguessing"),
+                ],
+                speed=0,
+            )
+            await wait_until(lambda: this_round.guess_handler.num_replies() == 2)
+
+            await server.say("fox", "modname", "!stopguessing", mod=True)
+            await wait_until(
+                lambda: this_round.bot_state == bot.botState.HOLDING_FOR_ANSWER
+            )
+            await server.say("fox", "modname", "!score 12", mod=True)
+            await wait_until(lambda: len(server.messages_to("fox")) == 5)
+        finally:
+            await test_bot.close()
+            await server.stop()
+
+        assert server.messages_to("fox") == [
+            "Give guesses now! Positive integers only",
+            "@viewer4 Positive whole numbers only please",
+            "Guessing window closed",
+            "Collected 2, between 10 and 15",
+            "Winners: viewer1. Guesses of: 10",
+        ]
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_send_limit_enforced() -> None:
+        """
+        Test messages beyond the send limit are refused, and a notice is sent back
+        """
+        server = chat_server(send_limit=2, send_period=60.0)
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.ws_connect(server.url) as websocket:
+                    await websocket.send_str("NICK tester\r\nJOIN #fox\r\n")
+                    await server.wait_joined("fox")
+                    for i in range(3):
+                        await websocket.send_str(f"PRIVMSG #fox :message {i}\r\n")
+
+                    notice = ""
+                    while "NOTICE" not in notice:
+                        notice = (await websocket.receive()).data
+        finally:
+            await server.stop()
+
+        assert "msg_ratelimit" in notice
+        assert server.messages_to("fox") == ["message 0", "message 1"]
+        assert [message.refused for message in server.sent] == [False, False, True]
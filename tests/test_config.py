@@ -5,6 +5,10 @@ Set of tests to check config class
 from __future__ import annotations
 
 import dataclasses
+import os
+import subprocess
+import sys
+
 import pytest
 import yaml
 
@@ -26,10 +30,41 @@ class TestConfig:
         assert this_config.default_channel == ""
         assert this_config.prefix == "!"
         assert this_config.live_mode is False
+        assert this_config.live_feed_interval == 0.5
+        assert this_config.live_feed_max_lines == 20
         assert this_config.use_latest_reply is True
         assert this_config.report_invalid is False
         assert this_config.stopguess_delay == 5
+        assert this_config.round_duration == 0
         assert this_config.closest_without_going_over is False
+        assert this_config.compact_guesses is False
+        assert this_config.numpy_threshold == 0
+        assert this_config.journal_path == ""
+        assert this_config.journal_flush_interval == 1.0
+        assert this_config.record_path == ""
+        assert this_config.guess_import_path == ""
+        assert this_config.history_path == ""
+        assert this_config.standings_path == ""
+        assert this_config.points_closest == 3
+        assert this_config.points_exact == 2
+        assert this_config.points_bands == [[3, 2], [10, 1]]
+        assert this_config.flood_rate == 1.0
+        assert this_config.flood_burst == 5
+        assert this_config.duplicate_window == 10.0
+        assert this_config.flood_max_chatters == 50000
+        assert this_config.ingest_queue_size == 10000
+        assert this_config.ingest_batch_size == 500
+        assert this_config.send_rate_limit == 20
+        assert this_config.send_rate_period == 30.0
+        assert this_config.worker_processes == 1
+        assert this_config.config_poll_interval == 2.0
+        assert this_config.chat_server == ""
+        assert this_config.chat_nick == "foxbot"
+        assert this_config.metrics_port == 0
+        assert this_config.metrics_host == "127.0.0.1"
+        assert this_config.profile_path == "profiles"
+        assert this_config.profile_max_seconds == 300
+        assert this_config.channels == {}
 
     @staticmethod
     def test_basic_config_asdict() -> None:
@@ -41,10 +76,41 @@ class TestConfig:
             "default_channel": "",
             "prefix": "!",
             "live_mode": False,
+            "live_feed_interval": 0.5,
+            "live_feed_max_lines": 20,
             "use_latest_reply": True,
             "report_invalid": False,
             "stopguess_delay": 5,
+            "round_duration": 0,
             "closest_without_going_over": False,
+            "compact_guesses": False,
+            "numpy_threshold": 0,
+            "journal_path": "",
+            "journal_flush_interval": 1.0,
+            "record_path": "",
+            "guess_import_path": "",
+            "history_path": "",
+            "standings_path": "",
+            "points_closest": 3,
+            "points_exact": 2,
+            "points_bands": [[3, 2], [10, 1]],
+            "flood_rate": 1.0,
+            "flood_burst": 5,
+            "duplicate_window": 10.0,
+            "flood_max_chatters": 50000,
+            "ingest_queue_size": 10000,
+            "ingest_batch_size": 500,
+            "send_rate_limit": 20,
+            "send_rate_period": 30.0,
+            "worker_processes": 1,
+            "config_poll_interval": 2.0,
+            "chat_server": "",
+            "chat_nick": "foxbot",
+            "metrics_port": 0,
+            "metrics_host": "127.0.0.1",
+            "profile_path": "profiles",
+            "profile_max_seconds": 300,
+            "channels": {},
         }
 
     @staticmethod
@@ -67,10 +133,41 @@ class TestConfig:
             "default_channel": "a",
             "prefix": "?",
             "live_mode": True,
+            "live_feed_interval": 1.5,
+            "live_feed_max_lines": 5,
             "use_latest_reply": False,
             "report_invalid": True,
             "stopguess_delay": 10,
+            "round_duration": 120,
             "closest_without_going_over": True,
+            "compact_guesses": True,
+            "numpy_threshold": 100000,
+            "journal_path": "journal",
+            "journal_flush_interval": 0.5,
+            "record_path": "chat/recording.jsonl",
+            "guess_import_path": "imports",
+            "history_path": "history.sqlite",
+            "standings_path": "standings",
+            "points_closest": 5,
+            "points_exact": 0,
+            "points_bands": [[2, 3]],
+            "flood_rate": 0.5,
+            "flood_burst": 3,
+            "duplicate_window": 0,
+            "flood_max_chatters": 1000,
+            "ingest_queue_size": 100,
+            "ingest_batch_size": 10,
+            "send_rate_limit": 100,
+            "send_rate_period": 30.0,
+            "worker_processes": 4,
+            "config_poll_interval": 0.5,
+            "chat_server": "ws://127.0.0.1:8080/",
+            "chat_nick": "testbot",
+            "metrics_port": 9100,
+            "metrics_host": "0.0.0.0",
+            "profile_path": "reports",
+            "profile_max_seconds": 60,
+            "channels": {"b": None, "c": {"prefix": "?", "stopguess_delay": 0}},
         }
 
         with open(filename, "w", encoding="utf-8") as yaml_file_dump:
@@ -79,3 +176,115 @@ class TestConfig:
         read_config = config.load_config_from_file(filename)
 
         assert test_config_dict == read_config.asdict()
+
+    @staticmethod
+    def test_channel_overrides() -> None:
+        """
+        Test channels are listed once, and get their own settings over the defaults
+        """
+        this_config = config.Config(
+            default_channel="a",
+            channels={"a": None, "b": {}, "c": {"prefix": "?"}},
+        )
+
+        assert this_config.channel_names() == ["a", "b", "c"]
+        assert this_config.for_channel("a") is this_config
+        assert this_config.for_channel("b") is this_config
+        assert this_config.for_channel("c").prefix == "?"
+        assert this_config.for_channel("c").stopguess_delay == 5
+
+    @staticmethod
+    def test_cached_settings(tmpdir) -> None:
+        """
+        Test the checked settings are cached, and the cache is dropped when the file changes
+        """
+        filename = tmpdir / "file.yaml"
+        with open(filename, "w", encoding="utf-8") as yaml_file_dump:
+            yaml.dump({"default_channel": "a", "channels": {"b": None}}, yaml_file_dump)
+
+        assert config.load_config_from_file(filename).default_channel == "a"
+        assert config.read_cached_settings(filename) == {
+            "default_channel": "a",
+            "channels": {"b": None},
+        }
+        assert config.load_config_from_file(filename).channel_names() == ["a", "b"]
+
+        with open(filename, "w", encoding="utf-8") as yaml_file_dump:
+            yaml.dump({"default_channel": "changed"}, yaml_file_dump)
+        assert config.load_config_from_file(filename).default_channel == "changed"
+
+    @staticmethod
+    def test_cache_kept_apart(tmpdir, config_cache_dir, monkeypatch) -> None:
+        """
+        Test the cache is kept in the cache directory, never beside the config file
+        """
+        filename = tmpdir / "configs" / "file.yaml"
+        filename.dirpath().mkdir()
+        filename.write_text("prefix: '?'", encoding="utf-8")
+
+        assert config.load_config_from_file(filename).prefix == "?"
+        assert filename.dirpath().listdir() == [filename]
+        assert [path.name for path in config_cache_dir.iterdir()] == [
+            os.path.basename(config.cache_path(filename))
+        ]
+
+        monkeypatch.delenv(config.CACHE_DIR_VARIABLE)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir / "xdg"))
+        assert config.cache_path(filename).startswith(str(tmpdir / "xdg" / "foxbot"))
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "settings",
+        [
+            {"no_such_setting": 1},
+            {"prefix": 1},
+            {"stopguess_delay": True},
+            {"metrics_port": "9100"},
+            {"channels": {"b": {"prefix": None}}},
+            {"channels": {"b": {"channels": {}}}},
+            {"channels": {"b": "?"}},
+            {"points_bands": [[3, "x"]]},
+            {"points_bands": [[3, 2, 1]]},
+            {"points_bands": [3]},
+            {"channels": {"b": {"points_bands": [[True, 1]]}}},
+        ],
+    )
+    def test_invalid_settings(tmpdir, settings: dict) -> None:
+        """
+        Test settings which are unknown or of the wrong type are refused, naming the setting
+        """
+        filename = tmpdir / "file.yaml"
+        with open(filename, "w", encoding="utf-8") as yaml_file_dump:
+            yaml.dump(settings, yaml_file_dump)
+
+        with pytest.raises(ValueError):
+            config.load_config_from_file(filename)
+        assert config.read_cached_settings(filename) is None
+
+    @staticmethod
+    def test_float_settings_take_ints() -> None:
+        """
+        Test whole numbers are fine where a float is wanted
+        """
+        config.check_settings({"journal_flush_interval": 2, "send_rate_period": 1.5})
+
+    @staticmethod
+    def test_core_imports_standalone() -> None:
+        """
+        Test scoring can be imported without the chat client or any other third party package
+        """
+        probe = (
+            "import sys; before = set(sys.modules); "
+            "import bot.guess_handler, bot.standings, bot.config; "
+            "print(' '.join(set(sys.modules) - before))"
+        )
+        loaded = subprocess.run(
+            [sys.executable, "-c", probe],
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+
+        roots = {name.partition(".")[0] for name in loaded}
+        assert not roots - set(sys.stdlib_module_names) - {"bot"}
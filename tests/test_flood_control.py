@@ -0,0 +1,88 @@
+"""
+Providing tests for the flood control in front of message parsing
+"""
+
+from __future__ import annotations
+
+from bot.flood_control import flood_control
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+class TestFloodControl:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    def test_token_bucket() -> None:
+        """
+        Test a chatter gets a burst, then the rate, and others are unaffected
+        """
+        flood = flood_control(rate=2.0, burst=3, duplicate_window=0)
+        assert [flood.allow("a", str(i), 0.0) for i in range(5)] == [
+            True,
+            True,
+            True,
+            False,
+            False,
+        ]
+        assert flood.allow("b", "1", 0.0)
+        # Half a second buys one message back
+        assert flood.allow("a", "5", 0.5)
+        assert not flood.allow("a", "6", 0.5)
+        # Idle for long enough refills the burst, but no more
+        assert [flood.allow("a", str(i), 100.0) for i in range(4)] == [
+            True,
+            True,
+            True,
+            False,
+        ]
+        assert flood.suppressed_rate == 4
+        assert flood.suppressed_duplicate == 0
+
+    @staticmethod
+    def test_duplicates() -> None:
+        """
+        Test repeats are dropped while they keep coming, and allowed after a pause
+        """
+        flood = flood_control(rate=0, duplicate_window=10.0)
+        assert flood.allow("a", "12", 0.0)
+        assert not flood.allow("a", "12", 1.0)
+        assert not flood.allow("a", "12", 9.0)
+        # Another chatter, or another message, is not a repeat
+        assert flood.allow("b", "12", 9.0)
+        assert flood.allow("a", "13", 9.5)
+        assert flood.allow("a", "12", 10.0)
+        assert not flood.allow("a", "12", 19.0)
+        assert flood.allow("a", "12", 29.5)
+        assert flood.metrics() == {
+            "chatters": 2,
+            "suppressed_rate": 0,
+            "suppressed_duplicate": 3,
+            "evicted": 0,
+        }
+        assert flood.suppressed == 3
+
+    @staticmethod
+    def test_idle_chatters_forgotten() -> None:
+        """
+        Test only the most recently seen chatters are tracked
+        """
+        flood = flood_control(rate=1.0, burst=1, duplicate_window=0, max_chatters=3)
+        for name in ("a", "b", "c"):
+            assert flood.allow(name, "hi", 0.0)
+        # a is seen again, so b is now the longest idle
+        assert not flood.allow("a", "hi", 0.0)
+        assert flood.allow("d", "hi", 0.0)
+        assert list(flood.chatters) == ["c", "a", "d"]
+        assert flood.evicted == 1
+        # Forgotten, so b starts again with a full bucket
+        assert flood.allow("b", "hi", 0.0)
+        assert list(flood.chatters) == ["a", "d", "b"]
+
+        flood.configure(1.0, 1, 0, 1)
+        assert list(flood.chatters) == ["b"]
+        assert flood.evicted == 4
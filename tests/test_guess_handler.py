@@ -4,6 +4,12 @@ Providing tests for the guess handler
 
 from __future__ import annotations
 
+import random
+import statistics
+
+import pytest
+
+from bot import guess_store
 from bot.guess_handler import guess_handler
 
 # pragma pylint: disable=R0903
@@ -201,3 +207,322 @@ class TestGuessHandler:
         (result_names, result_values) = this_guess_handler.get_score(5.75, True)
         assert result_names == ["e"]
         assert result_values == {5}
+
+    @staticmethod
+    def test_guess_handler_return_answer_07() -> None:
+        """
+        Test closest without going over when every guess is under the answer
+        """
+        this_guess_handler = setup_basic_guess_handler()
+
+        (result_names, result_values) = this_guess_handler.get_score(100, True)
+        assert result_names == ["h"]
+        assert result_values == {8}
+
+    @staticmethod
+    def test_guess_handler_return_answer_08() -> None:
+        """
+        Test closest without going over when every guess is over the answer
+        """
+        this_guess_handler = setup_basic_guess_handler()
+
+        (result_names, result_values) = this_guess_handler.get_score(0, True)
+        assert result_names == ["a"]
+        assert result_values == {1}
+
+    @staticmethod
+    def test_guess_handler_return_answer_empty() -> None:
+        """
+        Test scoring with no guesses gives no winners
+        """
+        this_guess_handler = guess_handler()
+
+        (result_names, result_values) = this_guess_handler.get_score(5, False)
+        assert result_names == []
+        assert result_values == set()
+
+
+class TestGuessHandlerSortedIndex:
+    """
+    Tests the sorted value index kept alongside the guesses
+    """
+
+    @staticmethod
+    def test_sorted_values_ordered() -> None:
+        """
+        Test values are kept in order regardless of arrival order
+        """
+        this_guess_handler = guess_handler()
+
+        for i_name, i_value in (("a", 5), ("b", 1), ("c", 9), ("d", 5)):
+            this_guess_handler.accept_guess(i_name, i_value)
+
+        assert this_guess_handler.store.sorted_values == [1, 5, 5, 9]
+
+    @staticmethod
+    def test_sorted_values_replace_uselatest() -> None:
+        """
+        Test a replaced guess moves in the sorted index
+        """
+        this_guess_handler = guess_handler(True)
+
+        this_guess_handler.accept_guess("a", 1)
+        this_guess_handler.accept_guess("b", 2)
+        this_guess_handler.accept_guess("a", 3)
+
+        assert this_guess_handler.store.sorted_values == [2, 3]
+        assert this_guess_handler.get_score(1, False) == (["b"], {2})
+
+    @staticmethod
+    def test_sorted_values_replace_notuselatest() -> None:
+        """
+        Test an ignored replacement leaves the sorted index alone
+        """
+        this_guess_handler = guess_handler(False)
+
+        this_guess_handler.accept_guess("a", 1)
+        this_guess_handler.accept_guess("b", 2)
+        this_guess_handler.accept_guess("a", 3)
+
+        assert this_guess_handler.store.sorted_values == [1, 2]
+        assert this_guess_handler.get_score(1, False) == (["a"], {1})
+
+
+class TestGuessHandlerReverseIndex:
+    """
+    Tests the value to names index used to find winners
+    """
+
+    @staticmethod
+    def test_names_by_value() -> None:
+        """
+        Test names are grouped under the value they guessed
+        """
+        this_guess_handler = setup_basic_guess_handler()
+
+        assert list(this_guess_handler.store.names_by_value[7]) == ["g", "g2", "g3"]
+        assert list(this_guess_handler.store.names_by_value[1]) == ["a"]
+
+    @staticmethod
+    def test_names_by_value_replace() -> None:
+        """
+        Test a replaced guess moves between values, and empty values are dropped
+        """
+        this_guess_handler = guess_handler(True)
+
+        this_guess_handler.accept_guess("a", 1)
+        this_guess_handler.accept_guess("b", 2)
+        this_guess_handler.accept_guess("a", 2)
+
+        assert 1 not in this_guess_handler.store.names_by_value
+        assert list(this_guess_handler.store.names_by_value[2]) == ["b", "a"]
+        assert this_guess_handler.get_score(1, False) == (["b", "a"], {2})
+
+    @staticmethod
+    def test_names_by_value_same_value() -> None:
+        """
+        Test re-guessing the same value keeps a single entry
+        """
+        this_guess_handler = guess_handler(True)
+
+        this_guess_handler.accept_guess("a", 4)
+        this_guess_handler.accept_guess("a", 4)
+
+        assert list(this_guess_handler.store.names_by_value[4]) == ["a"]
+        assert this_guess_handler.store.sorted_values == [4]
+
+
+class TestGuessHandlerRunningStats:
+    """
+    Tests the running aggregates behind stats() against the statistics module
+    """
+
+    @staticmethod
+    def assert_matches_statistics(this_guess_handler: guess_handler) -> None:
+        """
+        Compare stats() with a from-scratch calculation over the guesses
+        """
+        raw_values = list(this_guess_handler.guesses.values())
+        stats = this_guess_handler.stats()
+
+        assert stats["count"] == len(raw_values)
+        assert stats["min"] == min(raw_values)
+        assert stats["max"] == max(raw_values)
+        assert stats["mean"] == statistics.mean(raw_values)
+        assert abs(stats["stdev"] - statistics.stdev(raw_values)) < 1e-9
+        assert stats["median"] == statistics.median(raw_values)
+        assert (
+            stats["multimode"]
+            == sorted(statistics.multimode(raw_values))[: guess_store.MAX_MULTIMODE]
+        )
+        assert stats["quartiles"] == statistics.quantiles(raw_values, n=4)
+
+    def test_stats_random_with_replacement(self) -> None:
+        """
+        Test stats stay correct while guesses are replaced
+        """
+        rng = random.Random(1234)
+        this_guess_handler = guess_handler(True)
+
+        for _ in range(2000):
+            this_guess_handler.accept_guess(
+                f"user{rng.randrange(300)}", rng.randrange(50)
+            )
+        self.assert_matches_statistics(this_guess_handler)
+
+    def test_stats_random_without_replacement(self) -> None:
+        """
+        Test stats ignore replacement guesses when use_latest_reply is off
+        """
+        rng = random.Random(5678)
+        this_guess_handler = guess_handler(False)
+
+        for _ in range(2000):
+            this_guess_handler.accept_guess(
+                f"user{rng.randrange(300)}", rng.randrange(10**6)
+            )
+        self.assert_matches_statistics(this_guess_handler)
+
+    @staticmethod
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_percentiles_exact(compact: bool) -> None:
+        """
+        Test percentiles match statistics.quantiles exactly, as guesses are replaced
+        """
+        rng = random.Random(4321)
+        this_guess_handler = guess_handler(True, compact)
+        points = range(1, 100)
+
+        for i in range(5000):
+            this_guess_handler.accept_guess(
+                f"user{rng.randrange(1500)}", rng.randrange(-100, 10**5)
+            )
+            if i in (1, 10, 4999):
+                raw_values = list(this_guess_handler.guesses.values())
+                cuts = statistics.quantiles(raw_values, n=100)
+                assert this_guess_handler.percentiles(points) == dict(zip(points, cuts))
+
+    @staticmethod
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_histogram(compact: bool) -> None:
+        """
+        Test the histogram covers every guess in equal whole-number ranges
+        """
+        this_guess_handler = guess_handler(True, compact)
+        assert this_guess_handler.histogram(10) == []
+        assert this_guess_handler.percentiles([50]) == {}
+
+        for i, value in enumerate([1, 5, 5, 10, 11, 30, 30, 30]):
+            this_guess_handler.accept_guess(f"user{i}", value)
+
+        assert this_guess_handler.histogram(3) == [
+            (1, 10, 4),
+            (11, 20, 1),
+            (21, 30, 3),
+        ]
+        # Ranges are never narrower than one value
+        assert len(this_guess_handler.histogram(100)) == 30
+        assert sum(count for _, _, count in this_guess_handler.histogram(7)) == 8
+
+        rng = random.Random(8)
+        for i in range(3000):
+            this_guess_handler.accept_guess(f"user{i % 700}", rng.randrange(10**6))
+        raw_values = list(this_guess_handler.guesses.values())
+        for lowest, highest, count in this_guess_handler.histogram(20):
+            assert count == sum(lowest <= value <= highest for value in raw_values)
+
+    @staticmethod
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_placings(compact: bool) -> None:
+        """
+        Test places walk out from the answer, with ties sharing a place
+        """
+        this_guess_handler = guess_handler(True, compact)
+        assert this_guess_handler.placings(10, False, 5) == []
+
+        for name, value in [("a", 10), ("b", 8), ("c", 12), ("d", 8), ("e", 20)]:
+            this_guess_handler.accept_guess(name, value)
+
+        assert this_guess_handler.placings(10, False, 5) == [
+            (1, 10, ["a"]),
+            (2, 8, ["b", "d"]),
+            (2, 12, ["c"]),
+            (5, 20, ["e"]),
+        ]
+        assert this_guess_handler.placings(10, False, 4) == [
+            (1, 10, ["a"]),
+            (2, 8, ["b", "d"]),
+            (2, 12, ["c"]),
+        ]
+        # Without going over, everything under places ahead of anything over
+        assert this_guess_handler.placings(11, True, 10) == [
+            (1, 10, ["a"]),
+            (2, 8, ["b", "d"]),
+            (4, 12, ["c"]),
+            (5, 20, ["e"]),
+        ]
+        # The first place always holds the winners
+        for i_answer in (0, 9, 11, 16, 30):
+            for i_mode in (True, False):
+                names, _ = this_guess_handler.get_score(i_answer, i_mode)
+                first = [
+                    name
+                    for _, _, placed in this_guess_handler.placings(
+                        i_answer, i_mode, 1
+                    )
+                    for name in placed
+                ]
+                assert sorted(first) == sorted(names)
+
+    @staticmethod
+    def test_stats_mode_drops_on_replace() -> None:
+        """
+        Test the mode follows guesses moving away from the most common value
+        """
+        this_guess_handler = guess_handler(True)
+
+        for i_name in ("a", "b", "c"):
+            this_guess_handler.accept_guess(i_name, 7)
+        this_guess_handler.accept_guess("d", 3)
+        assert this_guess_handler.stats()["multimode"] == [7]
+
+        this_guess_handler.accept_guess("a", 3)
+        assert this_guess_handler.stats()["multimode"] == [3, 7]
+
+        this_guess_handler.accept_guess("b", 3)
+        assert this_guess_handler.stats()["multimode"] == [3]
+
+    @staticmethod
+    @pytest.mark.parametrize("compact", [True, False])
+    @pytest.mark.parametrize("repeats", [1, 2])
+    def test_stats_mode_capped(compact: bool, repeats: int) -> None:
+        """
+        Test only the smallest of many tied modes are listed
+        """
+        this_guess_handler = guess_handler(compact=compact)
+        for i_value in range(1000, 0, -1):
+            for i_repeat in range(repeats):
+                this_guess_handler.accept_guess(f"user{i_value}-{i_repeat}", i_value)
+
+        assert this_guess_handler.stats()["multimode"] == list(
+            range(1, guess_store.MAX_MULTIMODE + 1)
+        )
+
+    @staticmethod
+    def test_stats_few_guesses() -> None:
+        """
+        Test stats with too few guesses for every value to be defined
+        """
+        this_guess_handler = guess_handler()
+        stats = this_guess_handler.stats()
+        assert stats["count"] == 0
+        assert stats["min"] is None
+        assert stats["multimode"] == []
+
+        this_guess_handler.accept_guess("a", 4)
+        stats = this_guess_handler.stats()
+        assert stats["count"] == 1
+        assert stats["mean"] == 4
+        assert stats["median"] == 4
+        assert stats["stdev"] is None
+        assert stats["quartiles"] == []
@@ -0,0 +1,122 @@
+"""
+Providing tests for the guess parser
+"""
+
+from __future__ import annotations
+
+import re
+
+import pytest
+
+from bot.guess_parser import guess_parser, parse_entries
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+# The pattern the parser replaces
+ORIGINAL_PATTERN = re.compile(r"^(?P<value>[-+]?\d+\.?\d*)")
+
+CORPUS = [
+    "1234",
+    "1234 surely",
+    "+12",
+    "-5",
+    "-0",
+    "0",
+    "007",
+    "3.5",
+    "3.",
+    "3.5 maybe",
+    "12abc",
+    "+",
+    "-",
+    "+-5",
+    "",
+    " 12",
+    "hello 12",
+    "LUL",
+    "!guess 50",
+    "!GUESS 50",
+    "!Guess 50 please",
+    "!guess -50",
+    "!guess 2.5",
+    "!guess abc",
+    "!guess  50",
+    "!guessing 50",
+    "!stopguessing",
+    "!score 5",
+    "٣",
+    "1" * 5000,
+]
+
+
+def original_outcome(content: str, prefix: str = "!") -> int | None:
+    """
+    What the original regular expression path made of a message
+    """
+    if ORIGINAL_PATTERN.search(content) is not None:
+        text = content
+    elif content.lower().startswith(prefix + "guess "):
+        text = content[len(prefix + "guess ") :]
+    else:
+        return None
+
+    match = ORIGINAL_PATTERN.match(text)
+    if match is None:
+        return guess_parser.MALFORMED
+    try:
+        value = int(match[0])
+    except ValueError:
+        return guess_parser.INVALID
+    return guess_parser.INVALID if value < 0 else value
+
+
+class TestGuessParser:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize("content", CORPUS)
+    def test_matches_original(content: str) -> None:
+        """
+        Test the parser classifies messages as the original regular expressions did
+        """
+        assert guess_parser("!").parse(content) == original_outcome(content)
+
+    @staticmethod
+    def test_values() -> None:
+        """
+        Test the values and outcomes for some typical messages
+        """
+        parser = guess_parser("!")
+
+        assert parser.parse("1234 surely") == 1234
+        assert parser.parse("!guess 50") == 50
+        assert parser.parse("-5") == guess_parser.INVALID
+        assert parser.parse("!guess abc") == guess_parser.MALFORMED
+        assert parser.parse("LUL") is None
+
+    @staticmethod
+    def test_other_prefix() -> None:
+        """
+        Test the guess command follows the configured prefix
+        """
+        parser = guess_parser("?")
+
+        assert parser.parse("?guess 50") == 50
+        assert parser.parse("!guess 50") is None
+
+    @staticmethod
+    def test_parse_entries() -> None:
+        """
+        Test guesses given in bulk are read in order, setting aside any which are not guesses
+        """
+        entries, invalid = parse_entries(
+            "a=10 @B=20\nc,30\r\nd=-5 e=3.5 =7 f= g=1_000 h i=0 a=11"
+        )
+
+        assert entries == [("a", 10), ("b", 20), ("c", 30), ("i", 0), ("a", 11)]
+        assert invalid == ["d=-5", "e=3.5", "=7", "f=", "g=1_000", "h"]
+        assert parse_entries("") == ([], [])
@@ -0,0 +1,318 @@
+"""
+Providing tests for the guess stores behind the guess handler
+"""
+
+from __future__ import annotations
+
+import bisect
+import random
+
+import pytest
+
+from bot import guess_store
+from bot.guess_handler import guess_handler
+from bot.guess_store import (
+    compact_guess_store,
+    dict_guess_store,
+    intern_table,
+    list_blocks,
+    sorted_blocks,
+    value_blocks,
+)
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+def buckets(store: guess_store.sorted_guess_store) -> dict:
+    return {count: sorted(bucket) for count, bucket in store.values_by_count.items()}
+
+
+def put_each(
+    store: guess_store.guess_store, guesses: list, replace: bool
+) -> tuple[list, list]:
+    """
+    The guesses put one at a time, and those too large, as put_many returns them
+    """
+    accepted = []
+    too_large = []
+    for name, value in guesses:
+        try:
+            if store.put(name, value, replace):
+                accepted.append((name, value))
+        except OverflowError:
+            too_large.append((name, value))
+    return accepted, too_large
+
+
+class TestCompactGuessStore:
+    """
+    Tests the array-backed store against the dict store
+    """
+
+    @staticmethod
+    def test_compact_initially() -> None:
+        """
+        Test a compact handler starts empty
+        """
+        this_guess_handler = guess_handler(True, compact=True)
+
+        assert isinstance(this_guess_handler.store, compact_guess_store)
+        assert not this_guess_handler.guesses
+        assert this_guess_handler.num_replies() == 0
+
+    @staticmethod
+    def test_compact_mapping() -> None:
+        """
+        Test the compact store reads back as a mapping of name to guess
+        """
+        this_guess_handler = guess_handler(True, compact=True)
+
+        this_guess_handler.accept_guess("a", 1)
+        this_guess_handler.accept_guess("b", 2)
+        this_guess_handler.accept_guess("a", 3)
+
+        assert this_guess_handler.guesses == {"a": 3, "b": 2}
+        assert list(this_guess_handler.store.sorted_index) == [2, 3]
+        assert this_guess_handler.store.user_slots.names == ["a", "b"]
+        assert this_guess_handler.store.user_slots.find("b") == 1
+        assert this_guess_handler.store.user_slots.find("c") == -1
+        assert "b" in this_guess_handler.guesses
+        assert "c" not in this_guess_handler.guesses
+
+    @staticmethod
+    def test_compact_names_in_arrival_order() -> None:
+        """
+        Test names sharing a value are listed in the order they arrived
+        """
+        this_guess_handler = guess_handler(True, compact=True)
+
+        for i_name in ("c", "a", "b"):
+            this_guess_handler.accept_guess(i_name, 7)
+        this_guess_handler.accept_guess("c", 8)
+        this_guess_handler.accept_guess("c", 7)
+
+        assert this_guess_handler.get_score(7, False) == (["a", "b", "c"], {7})
+
+    @staticmethod
+    def test_compact_overflow() -> None:
+        """
+        Test values too large for the arrays are rejected without losing the old guess
+        """
+        this_guess_handler = guess_handler(True, compact=True)
+        this_guess_handler.accept_guess("a", 5)
+
+        with pytest.raises(OverflowError):
+            this_guess_handler.accept_guess("a", 2**63)
+
+        assert this_guess_handler.guesses == {"a": 5}
+        assert this_guess_handler.stats()["count"] == 1
+
+    @staticmethod
+    @pytest.mark.parametrize("use_latest_reply", [True, False])
+    def test_compact_matches_dict(use_latest_reply: bool, monkeypatch) -> None:
+        """
+        Test both stores give the same scores and stats for the same guesses
+        """
+        # Small blocks so the index splits and merges during the test
+        monkeypatch.setattr(sorted_blocks, "load", 8)
+        rng = random.Random(42)
+        dict_handler = guess_handler(use_latest_reply)
+        compact_handler = guess_handler(use_latest_reply, compact=True)
+
+        for _ in range(3000):
+            name = f"user{rng.randrange(500)}"
+            value = rng.randrange(200)
+            dict_handler.accept_guess(name, value)
+            compact_handler.accept_guess(name, value)
+
+        assert isinstance(dict_handler.store, dict_guess_store)
+        assert dict_handler.guesses == compact_handler.guesses
+        assert dict_handler.stats() == compact_handler.stats()
+        for i_answer in (-5, 0, 50.5, 99, 199, 500):
+            for i_mode in (True, False):
+                dict_names, dict_values = dict_handler.get_score(i_answer, i_mode)
+                compact_names, compact_values = compact_handler.get_score(
+                    i_answer, i_mode
+                )
+                assert dict_values == compact_values
+                assert sorted(dict_names) == sorted(compact_names)
+
+
+class TestAbstractStore:
+    """
+    Tests a store must provide every operation the handler needs
+    """
+
+    @staticmethod
+    def test_incomplete_store_cannot_be_made() -> None:
+        """
+        Test a store leaving out part of the sorted index fails as it is made
+        """
+
+        class unindexed(guess_store.sorted_guess_store):
+            __slots__ = ()
+
+        with pytest.raises(TypeError, match="_value_at"):
+            unindexed()
+        for store_class in (dict_guess_store, compact_guess_store):
+            assert not store_class.__abstractmethods__
+
+
+class TestBulkPut:
+    """
+    Tests storing a large batch of guesses at once
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize("store_class", [dict_guess_store, compact_guess_store])
+    @pytest.mark.parametrize("replace", [True, False])
+    def test_put_many_matches_put(store_class, replace: bool, monkeypatch) -> None:
+        """
+        Test a batch rebuilding the index leaves the store as putting each guess would
+        """
+        monkeypatch.setattr(guess_store, "REBUILD_BATCH", 100)
+        rng = random.Random(25)
+        earlier = [(f"user{rng.randrange(300)}", rng.randrange(50)) for _ in range(200)]
+        batch = [
+            (f"user{rng.randrange(600)}", rng.choice([rng.randrange(50), 2**70]))
+            for _ in range(1000)
+        ]
+
+        bulk = store_class()
+        one_by_one = store_class()
+        for store in (bulk, one_by_one):
+            for name, value in earlier:
+                store.put(name, value, replace)
+
+        accepted, too_large = bulk.put_many(batch, replace)
+
+        assert (accepted, too_large) == put_each(one_by_one, batch, replace)
+        assert list(bulk.items()) == list(one_by_one.items())
+        assert list(bulk.sorted_entries()) == list(one_by_one.sorted_entries())
+        assert bulk.stats() == one_by_one.stats()
+        assert buckets(bulk) == buckets(one_by_one)
+        for value in (0, 25, 49):
+            assert list(bulk.names_for(value)) == list(one_by_one.names_for(value))
+
+        # The rebuilt store carries on as any other
+        for store in (bulk, one_by_one):
+            store.put("user1", 7, True)
+            store.put("new", 7, True)
+        assert list(bulk.sorted_entries()) == list(one_by_one.sorted_entries())
+
+
+class TestSortedBlocks:
+    """
+    Tests the blocked sorted index used by the compact store
+    """
+
+    @staticmethod
+    def test_sorted_blocks_against_list(monkeypatch) -> None:
+        """
+        Test inserts and removes keep the same order as a sorted list
+        """
+        monkeypatch.setattr(sorted_blocks, "load", 4)
+        rng = random.Random(7)
+        blocks = sorted_blocks()
+        entries = []
+
+        for i_tag in range(400):
+            value = rng.randrange(40)
+            blocks.insert(value, i_tag)
+            entries.append((value, i_tag))
+            if rng.random() < 0.3:
+                removed = entries.pop(rng.randrange(len(entries)))
+                blocks.remove(*removed)
+
+        entries.sort(key=lambda entry: entry[0])
+        values = [entry[0] for entry in entries]
+        assert len(blocks) == len(entries)
+        assert list(blocks) == values
+        assert [blocks[i] for i in range(len(values))] == values
+        assert blocks[-1] == values[-1]
+        for i_value in range(-1, 42):
+            assert blocks.count(i_value) == values.count(i_value)
+            assert blocks.bisect_left(i_value) == bisect.bisect_left(values, i_value)
+            assert blocks.bisect_right(i_value) == bisect.bisect_right(values, i_value)
+            assert sorted(blocks.tags_for(i_value)) == sorted(
+                tag for value, tag in entries if value == i_value
+            )
+
+    @staticmethod
+    def test_sorted_blocks_remove_missing() -> None:
+        """
+        Test removing an entry that is not there raises
+        """
+        blocks = sorted_blocks()
+        blocks.insert(3, 0)
+
+        with pytest.raises(ValueError):
+            blocks.remove(3, 1)
+        with pytest.raises(IndexError):
+            blocks[1]  # pylint: disable=W0104
+
+    @staticmethod
+    def test_dict_store_unbounded_values(monkeypatch) -> None:
+        """
+        Test the dict store's index keeps values of any size, across many blocks
+        """
+        monkeypatch.setattr(sorted_blocks, "load", 4)
+        rng = random.Random(11)
+        store = dict_guess_store()
+        values = {}
+        for i in range(200):
+            name = f"user{rng.randrange(100)}"
+            value = rng.randrange(-(2**70), 2**70)
+            store.put(name, value, True)
+            values[name] = value
+
+        assert isinstance(store.sorted_index, list_blocks)
+        assert len(store.sorted_index.value_blocks) > 1
+        assert store.sorted_values == sorted(values.values())
+        assert store.stats()["max"] == max(values.values())
+
+    @staticmethod
+    def test_compact_store_packs_buckets(monkeypatch) -> None:
+        """
+        Test the compact store's frequency buckets are packed, and in value order
+        """
+        monkeypatch.setattr(sorted_blocks, "load", 4)
+        rng = random.Random(13)
+        store = compact_guess_store()
+        for _ in range(300):
+            store.put(f"user{rng.randrange(100)}", rng.randrange(30), True)
+
+        counts = {}
+        for value in store.values():
+            counts[value] = counts.get(value, 0) + 1
+        for count, bucket in store.values_by_count.items():
+            assert isinstance(bucket, value_blocks)
+            assert list(bucket) == sorted(
+                value for value, seen in counts.items() if seen == count
+            )
+
+
+class TestInternTable:
+    """
+    Tests the interning table used by the compact store
+    """
+
+    @staticmethod
+    def test_intern_table_slots() -> None:
+        """
+        Test names get dense slots in arrival order, across table growth
+        """
+        table = intern_table()
+        names = [f"chatter{i}" for i in range(1000)]
+
+        for i_slot, i_name in enumerate(names):
+            assert table.add(i_name) == i_slot
+        for i_slot, i_name in enumerate(names):
+            assert table.add(i_name) == i_slot
+            assert table.find(i_name) == i_slot
+
+        assert len(table) == 1000
+        assert table.names == names
+        assert table.find("someone_else") == -1
@@ -0,0 +1,68 @@
+"""
+Providing tests for the consistent hash ring
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from bot.hash_ring import hash_ring
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+CHANNELS = [f"channel{i}" for i in range(2000)]
+
+
+class TestHashRing:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    def test_assignment_spread() -> None:
+        """
+        Test every key is assigned, and roughly evenly
+        """
+        ring = hash_ring([f"worker{i}" for i in range(4)])
+        assignment = ring.assign(CHANNELS)
+
+        assert sorted(assignment) == [f"worker{i}" for i in range(4)]
+        assert sum(len(keys) for keys in assignment.values()) == len(CHANNELS)
+        assert all(300 < len(keys) < 700 for keys in assignment.values())
+
+    @staticmethod
+    def test_stable_assignment() -> None:
+        """
+        Test the same nodes always give the same assignment, whatever the order added
+        """
+        first = hash_ring(["a", "b", "c"])
+        second = hash_ring(["c", "a", "b"])
+
+        assert all(first.node_for(key) == second.node_for(key) for key in CHANNELS)
+
+    @staticmethod
+    def test_minimal_movement() -> None:
+        """
+        Test adding or removing a node only moves keys to or from that node
+        """
+        ring = hash_ring(["a", "b", "c"])
+        before = {key: ring.node_for(key) for key in CHANNELS}
+
+        ring.add("d")
+        after = {key: ring.node_for(key) for key in CHANNELS}
+        moved = [key for key in CHANNELS if before[key] != after[key]]
+        assert moved
+        assert all(after[key] == "d" for key in moved)
+
+        ring.remove("d")
+        assert {key: ring.node_for(key) for key in CHANNELS} == before
+
+    @staticmethod
+    def test_empty_ring() -> None:
+        """
+        Test looking up a key with no nodes is an error
+        """
+        with pytest.raises(LookupError):
+            hash_ring().node_for("channel")
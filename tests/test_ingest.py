@@ -0,0 +1,96 @@
+"""
+Providing tests for the guess ingest queue
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+
+import pytest
+
+from bot.ingest import guess_ingest, ingest_item
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+NOW = datetime.datetime(2024, 1, 1)
+
+
+class TestGuessIngest:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_batches_applied_in_order() -> None:
+        """
+        Test queued guesses arrive in order, grouped into bounded batches
+        """
+        batches = []
+
+        async def apply_batch(batch: list) -> None:
+            batches.append(batch)
+
+        ingest = guess_ingest(apply_batch, logging.getLogger("test"), 100, 4)
+        for i in range(10):
+            assert ingest.submit(f"user{i}", str(i), NOW, i)
+
+        await ingest.drain()
+
+        assert [len(batch) for batch in batches] == [4, 4, 2]
+        assert [item.name for batch in batches for item in batch] == [
+            f"user{i}" for i in range(10)
+        ]
+        assert batches[0][0] == ingest_item("user0", "0", NOW, 0)
+        metrics = ingest.metrics()
+        assert metrics["received"] == 10
+        assert metrics["batches"] == 3
+        assert metrics["queue_depth"] == 0
+        assert metrics["queue_max_depth"] == 10
+        await ingest.close()
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_full_queue_drops() -> None:
+        """
+        Test guesses beyond the queue size are dropped and counted
+        """
+        applied = []
+
+        async def apply_batch(batch: list) -> None:
+            applied.extend(batch)
+
+        ingest = guess_ingest(apply_batch, logging.getLogger("test"), 3, 10)
+        results = [ingest.submit(f"user{i}", str(i), NOW, i) for i in range(5)]
+
+        assert results == [True, True, True, False, False]
+        await ingest.drain()
+        assert len(applied) == 3
+        assert ingest.metrics()["dropped"] == 2
+        await ingest.close()
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_failed_batch_keeps_consuming() -> None:
+        """
+        Test an error in one batch does not stop later batches
+        """
+        applied = []
+
+        async def apply_batch(batch: list) -> None:
+            if batch[0].name == "bad":
+                raise RuntimeError("bad batch")
+            applied.extend(batch)
+
+        ingest = guess_ingest(apply_batch, logging.getLogger("test"), 10, 10)
+        ingest.submit("bad", "1", NOW, 1)
+        await ingest.drain()
+        ingest.submit("good", "2", NOW, 2)
+        await asyncio.wait_for(ingest.drain(), 1)
+
+        assert [item.name for item in applied] == ["good"]
+        await ingest.close()
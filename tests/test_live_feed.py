@@ -0,0 +1,57 @@
+"""
+Providing tests for the live mode console feed
+"""
+
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from bot.live_feed import live_feed
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+class TestLiveFeed:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_messages_written_together() -> None:
+        """
+        Test buffered messages are written out in one go, in order
+        """
+        stream = io.StringIO()
+        feed = live_feed(stream, interval=60)
+        feed.add("a", "hello")
+        feed.add("b", "12")
+        assert stream.getvalue() == ""
+
+        feed.write()
+        assert stream.getvalue() == "Received a::hello\nReceived b::12\n"
+
+        feed.write()
+        assert stream.getvalue() == "Received a::hello\nReceived b::12\n"
+        feed.close()
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_excess_messages_summarised() -> None:
+        """
+        Test only the latest lines are kept per interval, with a count of the rest
+        """
+        stream = io.StringIO()
+        feed = live_feed(stream, interval=60, max_lines=2)
+        for i in range(5):
+            feed.add("a", str(i))
+
+        feed.close()
+        assert (
+            stream.getvalue() == "... 3 more messages\nReceived a::3\nReceived a::4\n"
+        )
+        assert feed.task is None
@@ -0,0 +1,55 @@
+"""
+Providing tests for the queued logging setup
+"""
+
+from __future__ import annotations
+
+import logging
+
+from bot import log
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+class TestLog:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    def test_records_reach_handler_through_queue() -> None:
+        """
+        Test records pass through the queue, and are all written out on shutdown
+        """
+        records = []
+
+        class collect(logging.Handler):
+            def emit(self, record: logging.LogRecord) -> None:
+                records.append(record.getMessage())
+
+        logger = log.get_logger()
+        log.start_listener(logger, collect())
+        logger.setLevel(logging.INFO)
+        for i in range(100):
+            logger.info("message %d", i)
+        log.shutdown()
+
+        assert records == [f"message {i}" for i in range(100)]
+        assert not any(
+            isinstance(handler, logging.handlers.QueueHandler)
+            for handler in logger.handlers
+        )
+
+    @staticmethod
+    def test_init_replaces_listener(tmpdir) -> None:
+        """
+        Test initialising again does not stack up handlers
+        """
+        log.init(tmpdir)
+        log.init(tmpdir)
+        log.get_logger("child").info("written once")
+        log.shutdown()
+
+        assert (tmpdir / "foxbot.log").read_text("utf-8").count("written once") == 1
@@ -0,0 +1,106 @@
+"""
+Providing tests for the metrics registry and endpoint
+"""
+
+from __future__ import annotations
+
+import aiohttp
+import pytest
+
+from bot import metrics
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+class TestMetrics:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    def test_counters() -> None:
+        """
+        Test counters render with their labels, under one heading per name
+        """
+        registry = metrics.metrics_registry("test")
+        received = registry.counter("received_total", "Messages")
+        late = registry.counter("rejected_total", "Rejected", {"reason": "late"})
+        repeat = registry.counter("rejected_total", "Rejected", {"reason": "repeat"})
+        received.inc()
+        received.inc(2)
+        late.inc()
+
+        assert repeat.value == 0
+        assert registry.render() == (
+            "# HELP test_received_total Messages\n"
+            "# TYPE test_received_total counter\n"
+            "test_received_total 3\n"
+            "# HELP test_rejected_total Rejected\n"
+            "# TYPE test_rejected_total counter\n"
+            'test_rejected_total{reason="late"} 1\n'
+            'test_rejected_total{reason="repeat"} 0\n'
+        )
+
+    @staticmethod
+    def test_histogram() -> None:
+        """
+        Test histogram buckets are cumulative, with the sum in seconds
+        """
+        registry = metrics.metrics_registry("test")
+        latency = registry.histogram("latency_seconds", "Latency", (0.001, 0.01))
+        latency.observe_ns(500_000)
+        latency.observe_ns(1_000_000)
+        latency.observe_ns(5_000_000)
+        latency.observe_ns(2_000_000_000)
+
+        assert registry.render().splitlines()[2:] == [
+            'test_latency_seconds_bucket{le="0.001"} 2',
+            'test_latency_seconds_bucket{le="0.01"} 3',
+            'test_latency_seconds_bucket{le="+Inf"} 4',
+            "test_latency_seconds_sum 2.0065",
+            "test_latency_seconds_count 4",
+        ]
+
+    @staticmethod
+    def test_read_values() -> None:
+        """
+        Test values kept elsewhere are read when rendered
+        """
+        registry = metrics.metrics_registry("test")
+        queue = [1, 2]
+        registry.read("queue_depth", "Queued", lambda: len(queue))
+        registry.read("sent_total", "Sent", lambda: 7, "counter")
+        queue.append(3)
+
+        rendered = registry.render()
+        assert "# TYPE test_queue_depth gauge\ntest_queue_depth 3\n" in rendered
+        assert "# TYPE test_sent_total counter\ntest_sent_total 7\n" in rendered
+
+        with pytest.raises(ValueError):
+            registry.counter("queue_depth", "Not a gauge")
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_endpoint() -> None:
+        """
+        Test the registry is served over HTTP for scraping
+        """
+        bot_metrics = metrics.chat_metrics()
+        bot_metrics.messages_received.inc()
+        server = metrics.metrics_server(bot_metrics.registry)
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    f"http://127.0.0.1:{server.port}/metrics"
+                ) as response:
+                    assert response.status == 200
+                    assert response.headers["Content-Type"].startswith("text/plain")
+                    body = await response.text()
+        finally:
+            await server.stop()
+
+        assert "foxbot_messages_received_total 1\n" in body
+        assert 'foxbot_event_message_seconds_bucket{le="+Inf"} 0\n' in body
@@ -0,0 +1,142 @@
+"""
+Providing tests for the optional NumPy guess store
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from bot import numpy_guess_store
+from bot.guess_handler import guess_handler
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+def fill_handlers(use_latest_reply: bool, seed: int) -> (guess_handler, guess_handler):
+    """
+    Build a pure-Python handler and a NumPy handler from the same guesses
+    """
+    rng = random.Random(seed)
+    dict_handler = guess_handler(use_latest_reply)
+    numpy_handler = guess_handler(use_latest_reply, numpy_threshold=1)
+
+    for _ in range(3000):
+        name = f"user{rng.randrange(500)}"
+        value = rng.randrange(-20, 200)
+        dict_handler.accept_guess(name, value)
+        numpy_handler.accept_guess(name, value)
+
+    return dict_handler, numpy_handler
+
+
+class TestNumpyGuessStore:
+    """
+    Tests the NumPy store gives the same answers as the pure-Python path
+    """
+
+    @staticmethod
+    @pytest.mark.parametrize("use_latest_reply", [True, False])
+    def test_numpy_matches_dict(use_latest_reply: bool) -> None:
+        """
+        Test scores, winner order and stats are identical
+        """
+        pytest.importorskip("numpy")
+        dict_handler, numpy_handler = fill_handlers(use_latest_reply, 99)
+
+        assert isinstance(numpy_handler.store, numpy_guess_store.numpy_guess_store)
+        assert dict_handler.guesses == numpy_handler.guesses
+        assert dict_handler.stats() == numpy_handler.stats()
+        assert dict_handler.percentiles(range(1, 100)) == numpy_handler.percentiles(
+            range(1, 100)
+        )
+        for i_bins in (1, 7, 20, 1000):
+            assert dict_handler.histogram(i_bins) == numpy_handler.histogram(i_bins)
+        for i_answer in (-50, -20, 0, 50.5, 99, 199, 500):
+            for i_mode in (True, False):
+                assert dict_handler.get_score(
+                    i_answer, i_mode
+                ) == numpy_handler.get_score(i_answer, i_mode)
+                assert dict_handler.placings(
+                    i_answer, i_mode, 10
+                ) == numpy_handler.placings(i_answer, i_mode, 10)
+
+    @staticmethod
+    def test_numpy_small_rounds() -> None:
+        """
+        Test the NumPy store with no guesses and a single guess
+        """
+        pytest.importorskip("numpy")
+        this_guess_handler = guess_handler(numpy_threshold=1)
+        this_guess_handler.switch_to_numpy()
+
+        assert this_guess_handler.stats() == guess_handler().stats()
+        assert this_guess_handler.get_score(5, False) == ([], set())
+
+        this_guess_handler.accept_guess("a", 4)
+        assert this_guess_handler.stats()["median"] == 4
+        assert this_guess_handler.get_score(1, True) == (["a"], {4})
+
+    @staticmethod
+    def test_switch_at_threshold() -> None:
+        """
+        Test the handler moves to the NumPy store when the round gets big enough
+        """
+        pytest.importorskip("numpy")
+        this_guess_handler = guess_handler(numpy_threshold=3)
+
+        this_guess_handler.accept_guess("a", 1)
+        this_guess_handler.accept_guess("b", 2)
+        assert not isinstance(
+            this_guess_handler.store, numpy_guess_store.numpy_guess_store
+        )
+
+        this_guess_handler.accept_guess("c", 3)
+        assert isinstance(this_guess_handler.store, numpy_guess_store.numpy_guess_store)
+        assert this_guess_handler.guesses == {"a": 1, "b": 2, "c": 3}
+
+    @staticmethod
+    def test_switch_keeps_winner_order() -> None:
+        """
+        Test replaced guesses keep their place in the winner order after switching
+        """
+        pytest.importorskip("numpy")
+        this_guess_handler = guess_handler(True)
+
+        for i_name in ("a", "b", "c"):
+            this_guess_handler.accept_guess(i_name, 7)
+        this_guess_handler.accept_guess("a", 7)
+        this_guess_handler.switch_to_numpy()
+
+        assert this_guess_handler.get_score(7, False) == (["b", "c", "a"], {7})
+
+    @staticmethod
+    def test_switch_without_numpy(monkeypatch) -> None:
+        """
+        Test the handler carries on with the pure-Python store when NumPy is missing
+        """
+        monkeypatch.setattr(numpy_guess_store, "numpy", None)
+        this_guess_handler = guess_handler(numpy_threshold=2)
+
+        this_guess_handler.accept_guess("a", 1)
+        this_guess_handler.accept_guess("b", 2)
+        this_guess_handler.accept_guess("c", 3)
+
+        assert not numpy_guess_store.available()
+        assert this_guess_handler.numpy_threshold == 0
+        assert this_guess_handler.get_score(2, False) == (["b"], {2})
+
+    @staticmethod
+    def test_switch_with_huge_guess() -> None:
+        """
+        Test a guess too large for 64-bit arrays keeps the pure-Python store
+        """
+        pytest.importorskip("numpy")
+        this_guess_handler = guess_handler()
+        this_guess_handler.accept_guess("a", 2**70)
+
+        assert not this_guess_handler.switch_to_numpy()
+        assert this_guess_handler.guesses == {"a": 2**70}
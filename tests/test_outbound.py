@@ -0,0 +1,180 @@
+"""
+Providing tests for the outbound message scheduler
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import pytest
+
+from bot.outbound import (
+    outbound_scheduler,
+    ping_messages,
+    split_message,
+    token_bucket,
+)
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+class TestSplitting:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    def test_split_between_words() -> None:
+        """
+        Test long text is split between words, within the limit
+        """
+        text = "Winners: " + ", ".join(f"user{i}" for i in range(200))
+        parts = split_message(text)
+
+        assert len(parts) > 1
+        assert all(len(part) <= 500 for part in parts)
+        assert " ".join(parts) == text
+
+    @staticmethod
+    def test_split_unbroken_text() -> None:
+        """
+        Test text with nowhere to break is cut at the limit
+        """
+        assert split_message("a" * 1001) == ["a" * 500, "a" * 500, "a"]
+        assert split_message("short") == ["short"]
+        assert not split_message("")
+
+    @staticmethod
+    def test_ping_messages() -> None:
+        """
+        Test pings name everyone, using as few messages as fit
+        """
+        assert ping_messages(["a", "b"], "Oops") == ["@a @b Oops"]
+
+        names = [f"user{i:03}" for i in range(100)]
+        messages = ping_messages(names, "Positive whole numbers only please")
+        assert len(messages) == 2
+        assert all(len(message) <= 500 for message in messages)
+        assert all(message.endswith(" please") for message in messages)
+        assert " ".join(messages).count("@user") == 100
+
+
+class TestTokenBucket:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    def test_tokens_return_after_period() -> None:
+        """
+        Test the bucket allows a burst, then each token returns a period after it was taken
+        """
+        bucket = token_bucket(2, 10.0)
+        bucket.take(0.0)
+        assert bucket.wait_time(4.0) == 0
+        bucket.take(4.0)
+
+        assert bucket.wait_time(5.0) == pytest.approx(5.0)
+        assert bucket.wait_time(10.0) == 0
+        bucket.take(10.0)
+        assert bucket.wait_time(10.0) == pytest.approx(4.0)
+        assert bucket.wait_time(100.0) == 0
+        assert not bucket.taken
+
+
+class TestOutboundScheduler:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_lanes_and_coalescing() -> None:
+        """
+        Test announcements go ahead of replies and error pings, which are coalesced
+        """
+        sent = []
+
+        async def send(message: str) -> None:
+            sent.append(message)
+
+        scheduler = outbound_scheduler(send, logging.getLogger("test"))
+        for name in ("a", "b", "a", "c"):
+            scheduler.ping(name, "Positive whole numbers only please")
+        scheduler.ping("d", "That number is too large")
+        scheduler.reply("reply", send)
+        scheduler.announce("announcement")
+
+        await scheduler.close()
+        assert sent == [
+            "announcement",
+            "reply",
+            "@a @b @c Positive whole numbers only please",
+            "@d That number is too large",
+        ]
+        assert scheduler.metrics()["outbound_coalesced"] == 2
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_rate_limited() -> None:
+        """
+        Test sends beyond the burst wait for the bucket to refill
+        """
+        times = []
+        loop = asyncio.get_running_loop()
+
+        async def send(_: str) -> None:
+            times.append(loop.time())
+
+        scheduler = outbound_scheduler(send, logging.getLogger("test"), 3, 0.1)
+        for i in range(4):
+            scheduler.announce(str(i))
+
+        await scheduler.close()
+        assert len(times) == 4
+        assert times[3] - times[0] >= 0.09
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_failed_send_does_not_stop_queue() -> None:
+        """
+        Test a send which raises is counted, and later messages still go out
+        """
+        sent = []
+
+        async def send(message: str) -> None:
+            if message == "bad":
+                raise ConnectionError(message)
+            sent.append(message)
+
+        scheduler = outbound_scheduler(send, logging.getLogger("test"))
+        scheduler.announce("bad")
+        scheduler.announce("good")
+
+        await scheduler.close()
+        assert sent == ["good"]
+        assert scheduler.metrics()["outbound_failed"] == 1
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_no_default_sender() -> None:
+        """
+        Test a scheduler with no default only sends where each message says
+        """
+        sent = []
+
+        async def send(message: str) -> None:
+            sent.append(message)
+
+        scheduler = outbound_scheduler(None, logging.getLogger("test"))
+        with pytest.raises(ValueError):
+            scheduler.announce("nowhere")
+        with pytest.raises(ValueError):
+            scheduler.ping("a", "nowhere")
+        scheduler.announce("somewhere", send)
+
+        await scheduler.close()
+        assert sent == ["somewhere"]
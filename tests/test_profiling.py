@@ -0,0 +1,74 @@
+"""
+Providing tests for on-demand profiling
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import pytest
+
+from bot.profiling import profiler
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+async def busy(duration: float) -> list:
+    """
+    Keep the event loop busy, allocating as it goes
+    """
+    loop = asyncio.get_running_loop()
+    finish = loop.time() + duration
+    held = []
+    while loop.time() < finish:
+        held.append([str(i) for i in range(100)])
+        await asyncio.sleep(0.001)
+    return held
+
+
+class TestProfiling:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "kind,suffixes",
+        [
+            ("cpu", {".prof", ".txt"}),
+            ("sample", {".folded"}),
+            ("memory", {".txt", ".snapshot"}),
+        ],
+    )
+    async def test_reports_written(tmpdir, kind, suffixes) -> None:
+        """
+        Test each kind of profile writes its report and sums it up
+        """
+        this_profiler = profiler(tmpdir / "profiles", logging.getLogger("test"))
+        summary, _ = await asyncio.gather(this_profiler.run(kind, 0.2), busy(0.2))
+
+        reports = list((tmpdir / "profiles").listdir())
+        assert {report.ext for report in reports} == suffixes
+        assert "Top: " in summary
+        assert summary.endswith(
+            f"Saved {reports[0].purebasename}{sorted(suffixes)[-1]}"
+        )
+        assert this_profiler.running is None
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_one_at_a_time(tmpdir) -> None:
+        """
+        Test a second profile is refused while one runs, as is an unknown kind
+        """
+        this_profiler = profiler(tmpdir, logging.getLogger("test"))
+        first = asyncio.create_task(this_profiler.run("sample", 0.1))
+        await asyncio.sleep(0)
+
+        assert await this_profiler.run("cpu", 0.1) == "Already running a sample profile"
+        assert (await first).startswith("Sampled 0.1s")
+        assert (await this_profiler.run("disk", 0.1)).startswith("Unknown profile kind")
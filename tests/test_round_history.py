@@ -0,0 +1,98 @@
+"""
+Providing tests for the round history database
+"""
+
+from __future__ import annotations
+
+import datetime
+
+import pytest
+
+from bot.round_history import player_stats, round_history
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+FINISHED = datetime.datetime(2024, 5, 1, 21, 0, 0)
+
+
+class TestRoundHistory:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_totals_across_rounds(tmpdir) -> None:
+        """
+        Test wins and rounds played add up across rounds, per channel
+        """
+        history = round_history(tmpdir / "history.sqlite")
+        await history.record_round(
+            "a", FINISHED, 10, [("alice", 10), ("bob", 12), ("carol", 3)], ["alice"]
+        )
+        await history.record_round(
+            "a", FINISHED, 12, [("alice", 10), ("bob", 12)], ["bob"]
+        )
+        await history.record_round("a", FINISHED, 3, [("carol", 3)], ["carol"])
+        await history.record_round("b", FINISHED, 5, [("alice", 5)], ["alice"])
+
+        assert await history.leaderboard("a") == [
+            # Tied on wins and rounds, so all share first place
+            player_stats("alice", 2, 1, 0),
+            player_stats("bob", 2, 1, 0),
+            player_stats("carol", 2, 1, 0),
+        ]
+        assert await history.leaderboard("b") == [player_stats("alice", 1, 1, 0)]
+        assert await history.player("a", "bob") == player_stats("bob", 2, 1, 0)
+        assert await history.player("b", "bob") is None
+        await history.close()
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_places(tmpdir) -> None:
+        """
+        Test places count those with more wins, and the leaderboard is cut short
+        """
+        history = round_history(tmpdir / "history.sqlite")
+        for winner in ["a", "a", "a", "b", "b", "c", "d"]:
+            await history.record_round(
+                "x", FINISHED, 1, [(winner, 1), ("loser", 0)], [winner]
+            )
+
+        leaders = await history.leaderboard("x", 3)
+        assert [(leader.name, leader.wins, leader.ahead) for leader in leaders] == [
+            ("a", 3, 0),
+            ("b", 2, 1),
+            ("c", 1, 2),
+        ]
+        assert (await history.player("x", "d")).ahead == 2
+        assert await history.player("x", "loser") == player_stats("loser", 7, 0, 4)
+        await history.close()
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_reopened(tmpdir) -> None:
+        """
+        Test history survives a restart, including guesses too large for SQLite integers
+        """
+        path = tmpdir / "history.sqlite"
+        history = round_history(path)
+        round_id = await history.record_round(
+            "a", FINISHED, 1, [("huge", 10**30), ("small", 1)], ["small"]
+        )
+        await history.close()
+
+        history = round_history(path)
+        assert await history.player("a", "small") == player_stats("small", 1, 1, 0)
+        rows = await history._run(  # pylint: disable=W0212
+            lambda: history._connect()  # pylint: disable=W0212
+            .execute(
+                "SELECT name, value, won FROM guesses WHERE round_id = ? ORDER BY name",
+                (round_id,),
+            )
+            .fetchall()
+        )
+        assert rows == [("huge", str(10**30), 0), ("small", 1, 1)]
+        await history.close()
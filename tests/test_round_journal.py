@@ -0,0 +1,161 @@
+"""
+Providing tests for the round journal
+"""
+
+from __future__ import annotations
+
+import threading
+
+from bot import round_journal as journal_module
+from bot.guess_handler import guess_handler
+from bot.round_journal import round_journal
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+def record_round(journal: round_journal, handler: guess_handler, guesses: dict) -> None:
+    """
+    Record a set of guesses through both the handler and the journal
+    """
+    for i_name, i_value in guesses.items():
+        if handler.accept_guess(i_name, i_value):
+            journal.record_guess(i_name, i_value)
+
+
+class TestRoundJournal:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    def test_recover_empty(tmpdir) -> None:
+        """
+        Test recovering with nothing recorded gives a blank round
+        """
+        journal = round_journal(tmpdir)
+        state, handler = journal.recover(guess_handler)
+
+        assert state is None
+        assert not handler.guesses
+
+    @staticmethod
+    def test_recover_from_log(tmpdir) -> None:
+        """
+        Test guesses, resets and state changes replay from the log
+        """
+        journal = round_journal(tmpdir)
+        handler = guess_handler()
+        record_round(journal, handler, {"old": 1})
+        journal.record_reset()
+        handler = guess_handler()
+        journal.record_state("COLLECTING_VALS")
+        record_round(journal, handler, {"a": 1, "b": 2, "c": 2})
+        handler.accept_guess("a", 2)
+        journal.record_guess("a", 2)
+        journal.close()
+
+        state, recovered = round_journal(tmpdir).recover(guess_handler)
+
+        assert state == "COLLECTING_VALS"
+        assert recovered.guesses == {"a": 2, "b": 2, "c": 2}
+        assert recovered.get_score(2, False) == handler.get_score(2, False)
+
+    @staticmethod
+    def test_flush_batches(tmpdir) -> None:
+        """
+        Test records are buffered until a batch is full
+        """
+        journal = round_journal(tmpdir, flush_every=3)
+        journal.record_state("COLLECTING_VALS")
+        journal.record_guess("a", 1)
+        journal.wait()
+        assert journal.log_path.read_text(encoding="utf-8") == ""
+
+        journal.record_guess("b", 2)
+        journal.wait()
+        assert len(journal.log_path.read_text(encoding="utf-8").splitlines()) == 3
+
+    @staticmethod
+    def test_snapshot_truncates_log(tmpdir) -> None:
+        """
+        Test a snapshot replaces the log, and recovery uses both
+        """
+        journal = round_journal(tmpdir, snapshot_every=5)
+        handler = guess_handler()
+        journal.record_state("COLLECTING_VALS")
+        record_round(journal, handler, {f"user{i}": i for i in range(4)})
+        assert journal.wants_snapshot(handler)
+
+        journal.snapshot("COLLECTING_VALS", handler)
+        assert journal.log_records == 0
+        record_round(journal, handler, {"late": 10})
+        journal.record_state("HOLDING_FOR_ANSWER")
+        journal.close()
+
+        assert len(journal.log_path.read_text(encoding="utf-8").splitlines()) == 2
+        state, recovered = round_journal(tmpdir).recover(guess_handler)
+        assert state == "HOLDING_FOR_ANSWER"
+        assert recovered.guesses == handler.guesses
+
+    @staticmethod
+    def test_records_in_snapshot_skipped(tmpdir) -> None:
+        """
+        Test a crash between the snapshot and the log truncation does not replay twice
+        """
+        journal = round_journal(tmpdir)
+        handler = guess_handler()
+        record_round(journal, handler, {"a": 7, "b": 7})
+        journal.flush()
+        journal.wait()
+        log_before = journal.log_path.read_text(encoding="utf-8")
+        journal.snapshot("COLLECTING_VALS", handler)
+        journal.close()
+        journal.log_path.write_text(log_before, encoding="utf-8")
+
+        _, recovered = round_journal(tmpdir).recover(guess_handler)
+        assert recovered.get_score(7, False) == (["a", "b"], {7})
+
+    @staticmethod
+    def test_torn_write(tmpdir) -> None:
+        """
+        Test a half-written final record is dropped, and later records still recover
+        """
+        journal = round_journal(tmpdir)
+        handler = guess_handler()
+        record_round(journal, handler, {"a": 1})
+        journal.close()
+        with open(journal.log_path, "a", encoding="utf-8") as log_file:
+            log_file.write('[2,"g","b"')
+
+        journal = round_journal(tmpdir)
+        _, recovered = journal.recover(guess_handler)
+        assert recovered.guesses == {"a": 1}
+
+        record_round(journal, recovered, {"c": 3})
+        journal.close()
+        _, recovered = round_journal(tmpdir).recover(guess_handler)
+        assert recovered.guesses == {"a": 1, "c": 3}
+
+    @staticmethod
+    def test_writes_off_caller_thread(tmpdir, monkeypatch) -> None:
+        """
+        Test the log and snapshot are written and synced on the journal's own thread
+        """
+        synced_on = []
+        fsync = journal_module.os.fsync
+
+        def record_fsync(fileno: int) -> None:
+            synced_on.append(threading.current_thread().name)
+            fsync(fileno)
+
+        monkeypatch.setattr(journal_module.os, "fsync", record_fsync)
+        journal = round_journal(tmpdir, flush_every=2)
+        handler = guess_handler()
+        record_round(journal, handler, {"a": 1, "b": 2})
+        journal.snapshot("COLLECTING_VALS", handler)
+        journal.close()
+
+        assert len(synced_on) == 2
+        assert all(name.startswith("journal") for name in synced_on)
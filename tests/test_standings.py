@@ -0,0 +1,139 @@
+"""
+Providing tests for the standings kept across rounds
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from bot.config import Config
+from bot.guess_handler import guess_handler
+from bot.standings import point_scheme, round_points, standings
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+class TestStandings:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    def test_round_points() -> None:
+        """
+        Test winners, later places and exact guesses earn by the scheme
+        """
+        handler = guess_handler()
+        for name, value in [("a", 10), ("b", 9), ("c", 11), ("d", 14), ("e", 30)]:
+            handler.accept_guess(name, value)
+
+        scheme = point_scheme(exact=2, closest=3, bands=((3, 2), (4, 1)))
+        assert round_points(handler, 10, False, scheme) == {
+            "a": 5,
+            "b": 2,
+            "c": 2,
+            "d": 1,
+        }
+        # Two winners, neither exact, so the next guess is in third place
+        assert round_points(handler, 12.5, False, scheme) == {
+            "c": 3,
+            "d": 3,
+            "a": 2,
+            "b": 1,
+        }
+        assert round_points(handler, 13, True, scheme) == {
+            "c": 3,
+            "a": 2,
+            "b": 2,
+            "d": 1,
+        }
+
+        assert point_scheme.from_config(Config()) == (2, 3, ((3, 2), (10, 1)))
+        no_bands = point_scheme.from_config(Config(points_bands=[]))
+        assert round_points(handler, 10, False, no_bands) == {"a": 5}
+
+    @staticmethod
+    def test_rank_and_top() -> None:
+        """
+        Test places count those with more points, and ties keep the order they first scored
+        """
+        table = standings()
+        assert table.rank("a") is None
+        assert table.top(10) == []
+
+        table.award({"a": 3, "b": 1, "c": 1})
+        table.award({"b": 2, "d": 3})
+        table.award({"e": 1})
+
+        assert len(table) == 5
+        assert table.rank("a") == (1, 3)
+        assert table.rank("b") == (1, 3)
+        assert table.rank("d") == (1, 3)
+        assert table.rank("c") == (4, 1)
+        assert table.rank("e") == (4, 1)
+        assert table.top(4) == [
+            (1, "a", 3),
+            (1, "b", 3),
+            (1, "d", 3),
+            (4, "c", 1),
+        ]
+
+    @staticmethod
+    def test_matches_sorting() -> None:
+        """
+        Test ranks match sorting every total, across many chatters and rounds
+        """
+        rng = random.Random(21)
+        table = standings()
+        totals = {}
+        for _ in range(300):
+            earned = {
+                f"user{rng.randrange(3000)}": rng.randrange(1, 6) for _ in range(30)
+            }
+            table.award(earned)
+            for name, points in earned.items():
+                totals[name] = totals.get(name, 0) + points
+
+        ordered = sorted(totals.values(), reverse=True)
+        for name, points in totals.items():
+            assert table.rank(name) == (ordered.index(points) + 1, points)
+        assert [points for _, _, points in table.top(50)] == ordered[:50]
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_saved_and_loaded(tmpdir) -> None:
+        """
+        Test standings survive a restart, ties and all
+        """
+        path = tmpdir / "standings" / "a.standings"
+        table = standings(path)
+        table.award({"a": 1, "b": 4, "ç": 4})
+        await table.save()
+        table.award({"d": 2})
+        await table.save()
+        table.close()
+
+        reloaded = standings(path)
+        assert len(reloaded) == 4
+        assert reloaded.top(10) == table.top(10)
+        assert reloaded.rank("ç") == (1, 4)
+
+        reloaded.award({"a": 3})
+        assert reloaded.top(2) == [(1, "b", 4), (1, "ç", 4)]
+        assert reloaded.rank("a") == (1, 4)
+        assert reloaded.rank("d") == (4, 2)
+        reloaded.close()
+
+    @staticmethod
+    def test_not_standings(tmpdir) -> None:
+        """
+        Test a file of something else is refused rather than misread
+        """
+        path = tmpdir / "a.standings"
+        path.write_binary(b"not standings")
+        with pytest.raises(ValueError):
+            standings(path)
@@ -0,0 +1,268 @@
+"""
+Providing tests for the multi-process supervisor
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from bot import supervisor
+from bot.config import Config
+
+# pragma pylint: disable=R0903
+#  Disable "too few public methods" for test cases - most test files will be classes used for
+#  grouping and then individual tests alongside these
+
+
+def idle_worker(_token: str, _config: Config, _name: str, _configfile: str) -> None:
+    time.sleep(30)
+
+
+def crashing_worker(_token: str, _config: Config, _name: str, _configfile: str) -> None:
+    sys.exit(3)
+
+
+def pid_worker(_token: str, _config: Config, name: str, configfile: str) -> None:
+    with open(f"{configfile}.{name}.pid", "w", encoding="utf-8") as pid_file:
+        pid_file.write(str(os.getpid()))
+    time.sleep(30)
+
+
+def run_supervisor(configfile: str) -> None:
+    supervisor.supervisor(
+        "", make_config(20), logging.getLogger("test"), 2, pid_worker
+    ).run(configfile, 0.05)
+
+
+def process_gone(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    return False
+
+
+def make_config(channels: int) -> Config:
+    return Config(
+        default_channel="channel0",
+        channels={f"channel{i}": None for i in range(1, channels)},
+    )
+
+
+class TestSupervisor:
+    """
+    Test Class
+    """
+
+    @staticmethod
+    def test_worker_configs_cover_channels() -> None:
+        """
+        Test every channel is given to exactly one worker, with its overrides
+        """
+        bot_config = Config(
+            default_channel="channel0",
+            channels={f"channel{i}": {"prefix": "?"} for i in range(1, 100)},
+        )
+        this_supervisor = supervisor.supervisor(
+            "", bot_config, logging.getLogger("test"), 3, idle_worker
+        )
+        plan = this_supervisor.plan(bot_config)
+
+        assigned = [
+            name
+            for worker_config in plan.values()
+            for name in worker_config.channel_names()
+        ]
+        assert sorted(assigned) == sorted(bot_config.channel_names())
+        for worker_config in plan.values():
+            names = worker_config.channel_names()
+            assert worker_config.default_channel in ("", "channel0")
+            assert all(
+                worker_config.for_channel(name).prefix == "?"
+                for name in names
+                if name != "channel0"
+            )
+
+    @staticmethod
+    def test_worker_metrics_ports() -> None:
+        """
+        Test each worker serves metrics on its own port, if metrics are served at all
+        """
+        bot_config = dataclasses.replace(make_config(100), metrics_port=9100)
+        this_supervisor = supervisor.supervisor(
+            "", bot_config, logging.getLogger("test"), 3, idle_worker
+        )
+        plan = this_supervisor.plan(bot_config)
+        assert [plan[f"worker{i}"].metrics_port for i in range(3)] == [9100, 9101, 9102]
+
+        plan = this_supervisor.plan(make_config(100))
+        assert all(worker_config.metrics_port == 0 for worker_config in plan.values())
+
+    @staticmethod
+    def test_worker_send_rates() -> None:
+        """
+        Test the workers share the send rate, as the chat server limits the account
+        """
+        bot_config = dataclasses.replace(make_config(100), send_rate_limit=20)
+        this_supervisor = supervisor.supervisor(
+            "", bot_config, logging.getLogger("test"), 3, idle_worker
+        )
+        plan = this_supervisor.plan(bot_config)
+        assert all(
+            worker_config.send_rate_limit == 6 for worker_config in plan.values()
+        )
+
+    @staticmethod
+    def test_config_changed_at_missing(tmpdir) -> None:
+        """
+        Test a config file which cannot be seen is not an error
+        """
+        path = tmpdir / "config.yaml"
+        assert supervisor.config_changed_at(str(path)) is None
+        path.write_text("prefix: '?'", encoding="utf-8")
+        assert supervisor.config_changed_at(str(path)) is not None
+
+    @staticmethod
+    def test_rebalance_restarts_changed_workers() -> None:
+        """
+        Test adding a channel only restarts the worker it is assigned to
+        """
+        this_supervisor = supervisor.supervisor(
+            "", make_config(20), logging.getLogger("test"), 3, idle_worker
+        )
+        try:
+            this_supervisor.apply(make_config(20))
+            processes = {
+                name: this_worker.process
+                for name, this_worker in this_supervisor.workers.items()
+            }
+            assert all(process.is_alive() for process in processes.values())
+
+            this_supervisor.apply(make_config(21))
+            owner = this_supervisor.ring.node_for("channel20")
+            for name, this_worker in this_supervisor.workers.items():
+                if name == owner:
+                    assert this_worker.process is not processes[name]
+                    assert not processes[name].is_alive()
+                else:
+                    assert this_worker.process is processes[name]
+        finally:
+            this_supervisor.stop()
+
+    @staticmethod
+    def test_settings_change_keeps_workers() -> None:
+        """
+        Test a change which moves no channel restarts no worker
+        """
+        this_supervisor = supervisor.supervisor(
+            "", make_config(20), logging.getLogger("test"), 3, idle_worker
+        )
+        try:
+            this_supervisor.apply(make_config(20))
+            processes = {
+                name: this_worker.process
+                for name, this_worker in this_supervisor.workers.items()
+            }
+
+            this_supervisor.apply(dataclasses.replace(make_config(20), prefix="?"))
+            for name, this_worker in this_supervisor.workers.items():
+                assert this_worker.process is processes[name]
+                assert this_worker.config.prefix == "?"
+        finally:
+            this_supervisor.stop()
+
+    @staticmethod
+    def test_narrow_reload() -> None:
+        """
+        Test a worker takes up a reloaded config for its own channels only
+        """
+        bot_config = dataclasses.replace(
+            make_config(10), metrics_port=9100, record_path="chat.log"
+        )
+        running = dataclasses.replace(
+            supervisor.worker_config(bot_config, ["channel0", "channel3"], 2),
+            record_path="chat.log.worker2",
+        )
+        reloaded = Config(
+            default_channel="channel0",
+            prefix="?",
+            metrics_port=9100,
+            record_path="chat.log",
+            channels={"channel1": None, "channel3": {"prefix": "#"}},
+        )
+
+        narrowed = supervisor.narrow_reload(reloaded, running)
+        assert narrowed.channel_names() == ["channel0", "channel3"]
+        assert narrowed.prefix == "?"
+        assert narrowed.for_channel("channel3").prefix == "#"
+        assert narrowed.metrics_port == 9102
+        assert narrowed.record_path == "chat.log.worker2"
+
+        # A channel dropped from the file is left by the worker serving it
+        reloaded = dataclasses.replace(reloaded, channels={"channel1": None})
+        assert supervisor.narrow_reload(reloaded, running).channel_names() == [
+            "channel0"
+        ]
+
+    @staticmethod
+    def test_crashed_worker_restarted() -> None:
+        """
+        Test a worker which exits is started again, backing off each time
+        """
+        this_supervisor = supervisor.supervisor(
+            "", make_config(1), logging.getLogger("test"), 1, crashing_worker
+        )
+        try:
+            this_supervisor.apply(make_config(1))
+            this_worker = this_supervisor.workers["worker0"]
+            this_worker.process.join(10)
+
+            this_supervisor.check_workers()
+            assert this_worker.process is None
+            assert this_worker.restart_delay == 2 * supervisor.RESTART_DELAY
+
+            this_worker.restart_at = 0.0
+            this_supervisor.check_workers()
+            assert this_worker.process is not None
+        finally:
+            this_supervisor.stop()
+
+    @staticmethod
+    def test_sigterm_stops_workers(tmpdir) -> None:
+        """
+        Test stopping the supervisor with SIGTERM stops its workers too
+        """
+        configfile = tmpdir / "config.yaml"
+        configfile.write_text("prefix: '!'", encoding="utf-8")
+        process = multiprocessing.Process(
+            target=run_supervisor, args=(str(configfile),)
+        )
+        process.start()
+        try:
+            pid_files = [tmpdir / f"config.yaml.worker{i}.pid" for i in range(2)]
+            deadline = time.monotonic() + 10
+            while not all(
+                pid_file.exists() and pid_file.read_text("utf-8")
+                for pid_file in pid_files
+            ):
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+            pids = [int(pid_file.read_text("utf-8")) for pid_file in pid_files]
+
+            os.kill(process.pid, signal.SIGTERM)
+            process.join(10)
+            assert process.exitcode == 0
+
+            deadline = time.monotonic() + 10
+            while not all(process_gone(pid) for pid in pids):
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+        finally:
+            if process.is_alive():
+                process.kill()
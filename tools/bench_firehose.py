@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# Licence: BSD-3-Clause
+# 2024 (C) exachixkitsune
+
+"""
+End-to-end throughput benchmark for the bot's chat handling.
+
+Builds a firehose of chat messages with a configurable mix of guesses,
+guess commands, general chatter, mod commands and invalid numbers, then
+pushes them through Bot.event_message with a guessing round open, exactly as
+the chat connection would. Messages are delivered in bursts, yielding to the
+event loop between bursts so the ingest consumer keeps up as it would live.
+
+Reports the per-message latency of event_message (p50/p99), the throughput
+until every guess has been recorded, and peak RSS. Results can be saved as
+JSON, for comparing runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from typing import Dict, List, Tuple
+
+from tools.path import gather_paths
+from tools.fake_chat import fake_websocket, make_message
+
+from twitchio import Channel
+
+sys.path.extend(gather_paths("src"))
+
+# pylint: disable=C0413
+from bot import bot, log  # noqa: E402
+from bot.config import Config  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+CHATTER = [
+    "LUL",
+    "KEKW",
+    "PogChamp PogChamp PogChamp",
+    "hello chat",
+    "no way he makes that jump",
+    "@streamer what's the song?",
+    "first time here, love the stream",
+    "!uptime",
+    "gg",
+    "https://clips.twitch.tv/example",
+    "catJAM catJAM",
+]
+MOD_COMMANDS = ["!stats", "!verify"]
+KINDS = ("guess", "command", "chatter", "mod", "invalid")
+
+
+def build_firehose(
+    websocket: fake_websocket, options: argparse.Namespace
+) -> Tuple[List, Dict[str, int]]:
+    """Generate the messages to send, and how many there are of each kind."""
+
+    rng = random.Random(options.seed)
+    weights = [getattr(options, kind) for kind in KINDS]
+    channels = [f"channel{i}" for i in range(options.channels)]
+    started = datetime.datetime(2024, 1, 1)
+
+    messages = []
+    counts = dict.fromkeys(KINDS, 0)
+    for index, kind in enumerate(rng.choices(KINDS, weights, k=options.count)):
+        counts[kind] += 1
+        name = f"viewer{rng.randrange(options.users)}"
+        mod = False
+        value = rng.randrange(options.max_value)
+        if kind == "guess":
+            content = str(value)
+        elif kind == "command":
+            content = f"!guess {value}"
+        elif kind == "chatter":
+            content = rng.choice(CHATTER)
+        elif kind == "mod":
+            name = "moderator"
+            mod = True
+            content = rng.choice(MOD_COMMANDS)
+        else:
+            content = rng.choice((f"-{value}", f"{value}.5"))
+
+        messages.append(
+            make_message(
+                websocket,
+                rng.choice(channels),
+                name,
+                content,
+                started + datetime.timedelta(milliseconds=index),
+                mod,
+                f"message{index}",
+            )
+        )
+    return messages, counts
+
+
+def percentile(ordered: List[int], fraction: float) -> int:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def peak_rss_mib() -> float | None:
+    if resource is None:
+        return None
+    # Kilobytes on Linux, bytes on macOS
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+async def run(options: argparse.Namespace) -> Dict[str, object]:
+    """Send the firehose through a bot, returning the measurements."""
+
+    log.init(options.log_dir)
+    websocket = fake_websocket()
+    channels = {f"channel{i}": None for i in range(options.channels)}
+    test_bot = bot.Bot(
+        "",
+        Config(
+            channels=channels,
+            compact_guesses=options.compact,
+            send_rate_limit=options.send_rate_limit,
+        ),
+        log.get_logger(),
+    )
+    # The bot is not connected, so it has no channels of its own to send to
+    test_bot.get_channel = lambda name: Channel(name, websocket)
+    for channel in channels:
+        this_round = test_bot.round_for(channel)
+        this_round.reset_guesses()
+        this_round.set_state(bot.botState.COLLECTING_VALS)
+
+    messages, counts = build_firehose(websocket, options)
+    latencies = []
+    clock = time.perf_counter_ns
+
+    started = clock()
+    for start in range(0, len(messages), options.burst):
+        for message in messages[start : start + options.burst]:
+            sent = clock()
+            await test_bot.event_message(message)
+            latencies.append(clock() - sent)
+        # Let the ingest consumer and other tasks run, as the connection would
+        await asyncio.sleep(0)
+    handled = clock()
+    await test_bot.ingest.drain()
+    finished = clock()
+
+    ingest_metrics = test_bot.ingest.metrics()
+    outbound_metrics = test_bot.outbound.metrics()
+    await test_bot.ingest.close()
+    if test_bot.outbound.task is not None:
+        test_bot.outbound.task.cancel()
+    log.shutdown()
+
+    latencies.sort()
+    elapsed = (finished - started) / 1e9
+    return {
+        "python": platform.python_version(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "options": {
+            key: value for key, value in vars(options).items() if key != "output"
+        },
+        "messages": counts,
+        "latency_ns": {
+            "p50": percentile(latencies, 0.50),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1],
+            "mean": sum(latencies) // len(latencies),
+        },
+        "handler_seconds": (handled - started) / 1e9,
+        "total_seconds": elapsed,
+        "messages_per_second": len(messages) / elapsed,
+        "peak_rss_mib": peak_rss_mib(),
+        "guesses_recorded": sum(
+            this_round.guess_handler.num_replies()
+            for this_round in test_bot.rounds.values()
+        ),
+        "flood": test_bot.flood.metrics(),
+        "ingest": ingest_metrics,
+        "outbound": outbound_metrics,
+        "sent_to_chat": websocket.sent,
+    }
+
+
+def parse_options() -> argparse.Namespace:
+    """Parse command line arguments for the benchmark."""
+
+    parser = argparse.ArgumentParser(description="Chat firehose benchmark")
+    parser.add_argument("--count", type=int, default=200_000, help="Messages")
+    parser.add_argument("--channels", type=int, default=1, help="Channels")
+    parser.add_argument("--users", type=int, default=50_000, help="Distinct chatters")
+    parser.add_argument(
+        "--burst", type=int, default=100, help="Messages between event loop yields"
+    )
+    parser.add_argument(
+        "--max-value", type=int, default=10_000, help="Guesses are below this"
+    )
+    mix = parser.add_argument_group("message mix", "Relative weights of each kind")
+    mix.add_argument("--guess", type=float, default=30, help="Plain number guesses")
+    mix.add_argument("--command", type=float, default=5, help="!guess commands")
+    mix.add_argument("--chatter", type=float, default=60, help="Other chat")
+    mix.add_argument("--mod", type=float, default=0.1, help="Mod commands")
+    mix.add_argument("--invalid", type=float, default=5, help="Invalid numbers")
+    parser.add_argument(
+        "--compact", action="store_true", help="Use compact guess storage"
+    )
+    parser.add_argument(
+        "--send-rate-limit", type=int, default=20, help="Chat sends per 30 seconds"
+    )
+    parser.add_argument(
+        "--log-dir",
+        default=tempfile.gettempdir(),
+        help="Where the bot log is written when not on a tty; the temp dir by default",
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--output", help="Save the results as JSON to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    run_options = parse_options()
+    results = asyncio.run(run(run_options))
+
+    latency = results["latency_ns"]
+    print(f"{run_options.count} messages: {results['messages']}")
+    print(
+        f"event_message latency: p50 {latency['p50'] / 1000:.1f}us, "
+        f"p99 {latency['p99'] / 1000:.1f}us, max {latency['max'] / 1000:.1f}us"
+    )
+    print(
+        f"throughput: {results['messages_per_second']:,.0f} messages/s "
+        f"({results['total_seconds']:.2f}s, handler {results['handler_seconds']:.2f}s)"
+    )
+    print(f"guesses recorded: {results['guesses_recorded']}")
+    if results["peak_rss_mib"] is not None:
+        print(f"peak RSS: {results['peak_rss_mib']:.1f} MiB")
+
+    if run_options.output:
+        with open(run_options.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+        print(f"results saved to {run_options.output}")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# Licence: BSD-3-Clause
+# 2024 (C) exachixkitsune
+
+"""
+Benchmark for importing guesses in bulk.
+
+Writes a file of name,guess entries, as a form or spreadsheet would export
+them, and has a mod import it with !importguesses, exactly as the chat
+connection would deliver the command. Times how long it takes from the
+command arriving to the summary being sent, which covers reading and
+checking the file and storing every guess. The file is imported again to
+time replacing every guess, and both are repeated with the compact store.
+The run fails if any import goes over the budget.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from typing import Dict
+
+from tools.path import gather_paths
+from tools.fake_chat import fake_websocket, make_message
+
+sys.path.extend(gather_paths("src"))
+
+# pylint: disable=C0413
+from bot import bot, log  # noqa: E402
+from bot.config import Config  # noqa: E402
+
+
+async def time_import(
+    options: argparse.Namespace, directory: str, compact: bool
+) -> Dict[str, float]:
+    """Import the file into a new round twice, returning the seconds each took."""
+
+    websocket = fake_websocket()
+    test_bot = bot.Bot(
+        "",
+        Config(compact_guesses=compact, guess_import_path=directory),
+        log.get_logger(),
+    )
+    replies = []
+    test_bot.outbound.reply = lambda text, sender: replies.append(text)
+    this_round = test_bot.round_for("benchmark")
+    this_round.reset_guesses()
+    this_round.set_state(bot.botState.COLLECTING_VALS)
+
+    timings = {}
+    for run in ("new", "replacing"):
+        message = make_message(
+            websocket,
+            "benchmark",
+            "moderator",
+            "!importguesses guesses.csv",
+            datetime.datetime(2024, 1, 1),
+            mod=True,
+        )
+        started = time.perf_counter()
+        await test_bot.event_message(message)
+        timings[run] = time.perf_counter() - started
+        print(f"  {run}: {timings[run]:.3f}s, {replies[-1]}")
+
+    timings["store"] = type(this_round.guess_handler.store).__name__
+    return timings
+
+
+def parse_options() -> argparse.Namespace:
+    """Parse command line arguments for the benchmark."""
+
+    parser = argparse.ArgumentParser(description="Bulk guess import benchmark")
+    parser.add_argument("--count", type=int, default=100_000, help="Entries")
+    parser.add_argument(
+        "--max-value", type=int, default=100_000, help="Guesses are below this"
+    )
+    parser.add_argument(
+        "--budget", type=float, default=0.5, help="Seconds allowed for each import"
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--output", help="Save the results as JSON to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    run_options = parse_options()
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        log.init(work_dir)
+        rng = random.Random(run_options.seed)
+        with open(
+            os.path.join(work_dir, "guesses.csv"), "w", encoding="utf-8"
+        ) as entries_file:
+            for i in range(run_options.count):
+                entries_file.write(f"user{i},{rng.randrange(run_options.max_value)}\n")
+
+        for compact_store in (False, True):
+            label = "compact" if compact_store else "default"
+            print(f"{run_options.count} entries, {label} store:")
+            results[label] = asyncio.run(
+                time_import(run_options, work_dir, compact_store)
+            )
+        log.shutdown()
+
+    if run_options.output:
+        with open(run_options.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+        print(f"results saved to {run_options.output}")
+
+    over = [
+        f"{label} {run} took {seconds:.3f}s"
+        for label, timings in results.items()
+        for run, seconds in timings.items()
+        if run != "store" and seconds > run_options.budget
+    ]
+    if over:
+        print("Over budget:")
+        for problem in over:
+            print(f"  {problem}")
+        sys.exit(1)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# Licence: BSD-3-Clause
+# 2024 (C) exachixkitsune
+
+"""
+Memory benchmark for guess storage.
+
+Fills each storage mode with the same guesses and reports the bytes used per guess,
+as measured by tracemalloc. The names are created before measuring starts,
+as they belong to the incoming chat messages rather than to the store.
+Values are parsed from text during the fill, as record_guess does, so any
+int objects a store keeps alive are counted against it.
+Fill times include the overhead of tracemalloc, so only compare them to each other.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from typing import Callable, Dict, List
+
+from tools.path import gather_paths
+
+sys.path.extend(gather_paths("src"))
+
+from bot.guess_handler import guess_handler  # noqa: E402 pylint: disable=C0413
+
+
+def fill_plain_dict(names: List[str], values: List[str]) -> object:
+    """The original storage: a dict of name to value, with no indexes."""
+
+    guesses: Dict[str, int] = {}
+    for name, value in zip(names, values):
+        guesses[name] = int(value)
+    return guesses
+
+
+def fill_handler(compact: bool) -> Callable[[List[str], List[str]], object]:
+    """Storage through the guess handler, in the requested mode."""
+
+    def fill(names: List[str], values: List[str]) -> object:
+        handler = guess_handler(True, compact)
+        for name, value in zip(names, values):
+            handler.accept_guess(name, int(value))
+        return handler
+
+    return fill
+
+
+MODES: Dict[str, Callable[[List[str], List[str]], object]] = {
+    "plain-dict": fill_plain_dict,
+    "dict-store": fill_handler(False),
+    "compact-store": fill_handler(True),
+}
+
+
+def measure(
+    fill: Callable[[List[str], List[str]], object], names: List[str], values: List[str]
+) -> tuple[int, float]:
+    """Returns the bytes held by the filled store, and the seconds taken to fill it."""
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+
+    store = fill(names, values)
+
+    elapsed = time.perf_counter() - started
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del store
+
+    return used, elapsed
+
+
+def parse_options() -> argparse.Namespace:
+    """Parse command line arguments for the benchmark."""
+
+    parser = argparse.ArgumentParser(description="Guess storage memory benchmark")
+    parser.add_argument(
+        "--count", type=int, default=1_000_000, help="Number of guesses to store"
+    )
+    parser.add_argument(
+        "--max-value",
+        type=int,
+        default=100_000,
+        help="Guesses are drawn uniformly from 0 to this value",
+    )
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument(
+        "modes", nargs="*", default=list(MODES), help="Storage modes to measure"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    options = parse_options()
+
+    rng = random.Random(options.seed)
+    guess_names = [f"chatter_{i:07d}" for i in range(options.count)]
+    guess_values = [str(rng.randrange(options.max_value + 1)) for _ in guess_names]
+
+    print(f"{options.count} guesses, values 0-{options.max_value}")
+    for mode in options.modes:
+        used_bytes, seconds = measure(MODES[mode], guess_names, guess_values)
+        print(
+            f"{mode:>14}: {used_bytes / options.count:7.1f} bytes/guess, "
+            f"{used_bytes / 2**20:8.1f} MiB total, filled in {seconds:.1f}s"
+        )
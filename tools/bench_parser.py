@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# Licence: BSD-3-Clause
+# 2024 (C) exachixkitsune
+
+"""
+Microbenchmark for classifying chat messages during a guessing round.
+
+Compares the original path (a regular expression search, a lower-cased
+command check, then a second regular expression match when recording)
+with guess_parser, over a generated corpus shaped like busy chat:
+mostly chatter and emotes, with guesses, guess commands and bad numbers mixed in.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import timeit
+
+from typing import Callable, List
+
+from tools.path import gather_paths
+
+sys.path.extend(gather_paths("src"))
+
+from bot.guess_parser import guess_parser  # noqa: E402 pylint: disable=C0413
+
+PREFIX = "!"
+ORIGINAL_PATTERN = re.compile(r"^(?P<value>[-+]?\d+\.?\d*)")
+
+CHATTER = [
+    "LUL",
+    "KEKW",
+    "PogChamp PogChamp PogChamp",
+    "hello chat",
+    "no way he makes that jump",
+    "@streamer what's the song?",
+    "first time here, love the stream",
+    "!commands",
+    "!uptime",
+    "gg",
+    "this is fine",
+    "https://clips.twitch.tv/example",
+    "o7",
+    "catJAM catJAM",
+    "is this a new personal best?",
+]
+
+
+def build_corpus(count: int, guess_share: float, seed: int) -> List[str]:
+    """Generate chat messages, with roughly guess_share of them guesses of some kind."""
+
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        if rng.random() >= guess_share:
+            corpus.append(rng.choice(CHATTER))
+            continue
+
+        value = rng.randrange(10000)
+        kind = rng.random()
+        if kind < 0.6:
+            corpus.append(str(value))
+        elif kind < 0.75:
+            corpus.append(f"{value} surely")
+        elif kind < 0.9:
+            corpus.append(f"{PREFIX}guess {value}")
+        elif kind < 0.95:
+            corpus.append(f"-{value}")
+        else:
+            corpus.append(f"{value}.5")
+    return corpus
+
+
+def original_path(content: str) -> int | None:
+    """The original event_message and record_guess handling, down to the parsed value."""
+
+    if ORIGINAL_PATTERN.search(content) is not None:
+        text = content
+    elif content.lower().startswith(PREFIX + "guess "):
+        text = content[len(PREFIX + "guess ") :]
+    else:
+        return None
+
+    try:
+        value = int(ORIGINAL_PATTERN.match(text)[0])
+    except ValueError:
+        return -1
+    except Exception:  # pylint: disable=W0703
+        return -2
+    return value if value >= 0 else -1
+
+
+def run(classify: Callable[[str], int | None], corpus: List[str]) -> None:
+    """Classify every message in the corpus."""
+
+    for content in corpus:
+        classify(content)
+
+
+def parse_options() -> argparse.Namespace:
+    """Parse command line arguments for the benchmark."""
+
+    parser = argparse.ArgumentParser(description="Guess parser microbenchmark")
+    parser.add_argument("--count", type=int, default=100_000, help="Messages")
+    parser.add_argument(
+        "--guess-share",
+        type=float,
+        default=0.3,
+        help="Fraction of messages which are guesses",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    options = parse_options()
+    messages = build_corpus(options.count, options.guess_share, options.seed)
+    fast_parser = guess_parser(PREFIX)
+
+    mismatches = [m for m in messages if fast_parser.parse(m) != original_path(m)]
+    print(f"{len(messages)} messages, {len(mismatches)} classified differently")
+
+    for label, function in (
+        ("original", original_path),
+        ("guess_parser", fast_parser.parse),
+    ):
+        best = min(
+            timeit.repeat(
+                lambda f=function: run(f, messages), number=1, repeat=options.repeat
+            )
+        )
+        print(f"{label:>13}: {best * 1e9 / len(messages):6.0f} ns/message")
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# Licence: BSD-3-Clause
+# 2024 (C) exachixkitsune
+
+"""
+Cold start benchmark for the bot.
+
+Each module is imported in a fresh interpreter under python -X importtime,
+reporting how long the import took and its slowest direct imports. The core
+modules, which other tools use for scoring, are checked to load nothing
+outside the standard library.
+
+Then the bot is started as runbot starts it, against a local chat server,
+timing how long it takes from launching the process to the bot joining its
+channel: first with no config cache, then with the cache warm.
+
+Every measurement has a budget; the run fails if any goes over, so the
+numbers can be tracked between changes. Results can be saved as JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from typing import Dict, List, Tuple
+
+from tools.path import gather_paths
+
+sys.path.extend(gather_paths("src"))
+
+# pylint: disable=C0413
+from bot.chat_server import chat_server  # noqa: E402
+
+# Imported by other tools without the chat client, so these must stay standard library only
+CORE_MODULES = ("bot.guess_handler", "bot.standings", "bot.config")
+ENTRY_MODULES = ("runbot", "bot.bot")
+SLOWEST_IMPORTS = 5
+
+IMPORT_PROBE = """
+import json, sys, time
+before = set(sys.modules)
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "modules": sorted(set(sys.modules) - before)}}))
+"""
+
+RUN_BOT = "import runbot; runbot.runbot('token.yaml', 'config.yaml')"
+
+
+def source_environment() -> Dict[str, str]:
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(gather_paths("src"))
+    return environment
+
+
+def parse_importtime(importtime: str) -> List[Tuple[int, str, float]]:
+    """
+    Each import in -X importtime output, as (depth, name, cumulative seconds).
+    """
+    entries = []
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            # The header line
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative) / 1e6))
+    return entries
+
+
+def slowest_imports(
+    importtime: str, module: str, count: int
+) -> List[Tuple[str, float]]:
+    """
+    The direct imports of a module taking longest, with their cumulative seconds.
+    importtime lists each import after everything it imported.
+    """
+    entries = parse_importtime(importtime)
+    for index, (depth, name, _) in enumerate(entries):
+        if depth == 0 and name == module:
+            children = []
+            for child_depth, child_name, seconds in reversed(entries[:index]):
+                if child_depth == 0:
+                    break
+                if child_depth == 1:
+                    children.append((child_name, seconds))
+            return sorted(children, key=lambda child: child[1], reverse=True)[:count]
+    return []
+
+
+def third_party(modules: List[str]) -> List[str]:
+    roots = {name.partition(".")[0] for name in modules}
+    return sorted(
+        root
+        for root in roots
+        if root not in sys.stdlib_module_names
+        and root not in ("bot", "runbot", "__main__")
+    )
+
+
+def time_import(module: str) -> Dict[str, object]:
+    """Import a module in a fresh interpreter, returning the measurements."""
+
+    finished = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_PROBE.format(module=module)],
+        env=source_environment(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    probe = json.loads(finished.stdout)
+    return {
+        "seconds": probe["seconds"],
+        "third_party": third_party(probe["modules"]),
+        "slowest": slowest_imports(finished.stderr, module, SLOWEST_IMPORTS),
+    }
+
+
+async def time_to_join(
+    server: chat_server, directory: str, channel: str, timeout: float
+) -> float:
+    """Start the bot, returning the seconds until it joined the channel."""
+
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        RUN_BOT,
+        cwd=directory,
+        # The config cache is kept with the rest of the run, not in the user's cache
+        env={**source_environment(), "FOXBOT_CACHE_DIR": directory},
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        await server.wait_joined(channel, timeout)
+        return time.perf_counter() - started
+    finally:
+        process.terminate()
+        await process.wait()
+        # Let the server see the connection close, so the next start is timed afresh
+        while any(channel in client.channels for client in server.clients):
+            await asyncio.sleep(0.01)
+
+
+async def time_starts(options: argparse.Namespace) -> List[float]:
+    """Start the bot repeatedly, the first time without a config cache."""
+
+    server = chat_server()
+    await server.start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            with open(
+                os.path.join(directory, "token.yaml"), "w", encoding="utf-8"
+            ) as token_file:
+                token_file.write("token: benchmark\n")
+            with open(
+                os.path.join(directory, "config.yaml"), "w", encoding="utf-8"
+            ) as config_file:
+                json.dump(
+                    {
+                        "default_channel": options.channel,
+                        "chat_server": server.url,
+                        "chat_nick": "benchbot",
+                    },
+                    config_file,
+                )
+
+            return [
+                await time_to_join(server, directory, options.channel, options.timeout)
+                for _ in range(options.runs)
+            ]
+    finally:
+        await server.stop()
+
+
+def run(options: argparse.Namespace) -> Dict[str, object]:
+    """Take every measurement, returning them with any budgets exceeded."""
+
+    imports = {module: time_import(module) for module in CORE_MODULES + ENTRY_MODULES}
+    starts = asyncio.run(time_starts(options))
+
+    results = {
+        "python": platform.python_version(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "options": {
+            key: value for key, value in vars(options).items() if key != "output"
+        },
+        "imports": imports,
+        "join_seconds": {
+            "cold": starts[0],
+            "warm": statistics.median(starts[1:]) if len(starts) > 1 else None,
+        },
+    }
+
+    over = []
+    for module in CORE_MODULES:
+        if imports[module]["third_party"]:
+            over.append(f"{module} imports {', '.join(imports[module]['third_party'])}")
+        if imports[module]["seconds"] > options.core_budget:
+            over.append(f"{module} took {imports[module]['seconds']:.3f}s to import")
+    for module in ENTRY_MODULES:
+        if imports[module]["seconds"] > options.import_budget:
+            over.append(f"{module} took {imports[module]['seconds']:.3f}s to import")
+    if max(starts) > options.join_budget:
+        over.append(f"joining took up to {max(starts):.3f}s")
+    results["over_budget"] = over
+    return results
+
+
+def parse_options() -> argparse.Namespace:
+    """Parse command line arguments for the benchmark."""
+
+    parser = argparse.ArgumentParser(description="Bot cold start benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="Bot starts to time")
+    parser.add_argument("--channel", default="benchmark", help="Channel to join")
+    parser.add_argument(
+        "--timeout", type=float, default=30.0, help="Seconds to wait for a join"
+    )
+    budgets = parser.add_argument_group("budgets", "Seconds allowed for each step")
+    budgets.add_argument(
+        "--core-budget", type=float, default=0.05, help="Importing a core module"
+    )
+    budgets.add_argument(
+        "--import-budget", type=float, default=0.5, help="Importing the bot"
+    )
+    budgets.add_argument(
+        "--join-budget", type=float, default=2.0, help="Launch to first joined channel"
+    )
+    parser.add_argument("--output", help="Save the results as JSON to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    run_options = parse_options()
+    outcome = run(run_options)
+
+    for name, measured in outcome["imports"].items():
+        slowest = ", ".join(
+            f"{child} {seconds * 1000:.1f}ms" for child, seconds in measured["slowest"]
+        )
+        print(f"import {name}: {measured['seconds'] * 1000:.1f}ms ({slowest})")
+        if measured["third_party"]:
+            print(f"  third party: {', '.join(measured['third_party'])}")
+
+    joins = outcome["join_seconds"]
+    message = f"launch to joined: cold {joins['cold']:.3f}s"
+    if joins["warm"] is not None:
+        message += f", warm {joins['warm']:.3f}s"
+    print(message)
+
+    if run_options.output:
+        with open(run_options.output, "w", encoding="utf-8") as output_file:
+            json.dump(outcome, output_file, indent=2)
+        print(f"results saved to {run_options.output}")
+
+    if outcome["over_budget"]:
+        print("Over budget:")
+        for problem in outcome["over_budget"]:
+            print(f"  {problem}")
+        sys.exit(1)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# Licence: BSD-3-Clause
+# 2024 (C) exachixkitsune
+
+"""
+Run the local chat server and play guessing rounds through it, for soak testing.
+
+Point the bot at it by setting chat_server in its config to the URL printed
+on start (and running with any token), then start this. Each round a mod
+opens guessing, chat runs at the given rate with a mix of guesses and
+chatter, then the round is closed and scored. What the bot sent, and how many
+of its messages were refused for going over the send limit, is reported
+after every round.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+
+from typing import Tuple
+
+from tools.path import gather_paths
+
+sys.path.extend(gather_paths("src"))
+
+from bot.chat_server import chat_server  # noqa: E402 pylint: disable=C0413
+
+CHATTER = ["LUL", "hello chat", "gg", "no way", "catJAM catJAM", "what's the song?"]
+
+
+async def play_rounds(server: chat_server, options: argparse.Namespace) -> None:
+    rng = random.Random(options.seed)
+
+    def chat_message(_: int) -> Tuple[str, str]:
+        user = f"viewer{rng.randrange(options.users)}"
+        if rng.random() < options.guess_share:
+            return user, str(rng.randrange(options.max_value))
+        return user, rng.choice(CHATTER)
+
+    print(f"Waiting for the bot to join #{options.channel}")
+    await server.wait_joined(options.channel, timeout=3600)
+
+    for round_number in range(1, options.rounds + 1):
+        sent_before = len(server.sent)
+        await server.say(options.channel, options.mod, "!startguessing", mod=True)
+        await server.generate(
+            options.channel,
+            options.rate,
+            int(options.rate * options.round_seconds),
+            chat_message,
+        )
+        await server.say(options.channel, options.mod, "!stopguessing", mod=True)
+        await asyncio.sleep(options.close_wait)
+        answer = rng.randrange(options.max_value)
+        await server.say(options.channel, options.mod, f"!score {answer}", mod=True)
+        await asyncio.sleep(options.close_wait)
+
+        sent = server.sent[sent_before:]
+        refused = sum(message.refused for message in sent)
+        print(
+            f"Round {round_number}: bot sent {len(sent)} messages, {refused} refused, "
+            f"{len(server.clients)} connected"
+        )
+        for message in sent[-options.show :]:
+            print(f"  {'REFUSED ' if message.refused else ''}{message.content[:120]}")
+
+
+async def main(options: argparse.Namespace) -> None:
+    server = chat_server(options.host, options.port, options.send_limit)
+    await server.start()
+    print(f"Chat server listening on {server.url}")
+    try:
+        await play_rounds(server, options)
+    finally:
+        await server.stop()
+
+
+def parse_options() -> argparse.Namespace:
+    """Parse command line arguments for the soak test."""
+
+    parser = argparse.ArgumentParser(description="Local chat server soak test")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=6680, help="Port to listen on")
+    parser.add_argument("--channel", default="soak", help="Channel to play in")
+    parser.add_argument("--mod", default="soakmod", help="Name of the mod")
+    parser.add_argument("--rounds", type=int, default=10, help="Rounds to play")
+    parser.add_argument(
+        "--round-seconds", type=float, default=60, help="Chat time per round"
+    )
+    parser.add_argument("--rate", type=float, default=100, help="Messages per second")
+    parser.add_argument(
+        "--guess-share", type=float, default=0.4, help="Fraction of chat guessing"
+    )
+    parser.add_argument("--users", type=int, default=5000, help="Distinct chatters")
+    parser.add_argument("--max-value", type=int, default=1000, help="Guesses below")
+    parser.add_argument(
+        "--close-wait",
+        type=float,
+        default=10,
+        help="Seconds to wait after closing and after scoring",
+    )
+    parser.add_argument(
+        "--send-limit", type=int, default=20, help="Bot messages allowed per 30s"
+    )
+    parser.add_argument("--show", type=int, default=5, help="Bot messages to show")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_options()))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Licence: BSD-3-Clause
+# 2024 (C) exachixkitsune
+
+"""
+Stand-ins for a Twitch chat connection, for driving the bot without one.
+
+Messages are real twitchio objects, built from the same tags the chat server
+sends, so the bot handles them exactly as it would live ones. Anything the
+bot sends goes to a fake websocket, which only keeps count.
+"""
+
+from __future__ import annotations
+
+import collections
+import datetime
+
+from typing import DefaultDict, Dict, List
+
+from twitchio import Channel, Chatter, Message
+
+
+class fake_websocket:
+    """Accepts what the bot sends to chat, keeping the raw lines."""
+
+    def __init__(self, nick: str = "foxbot", keep: bool = False) -> None:
+        self.nick = nick
+        self.keep = keep
+        self.sent = 0
+        self.lines: List[str] = []
+        # Channel member lists, which twitchio checks to see if the bot is a mod
+        self._cache: DefaultDict[str, set] = collections.defaultdict(set)
+
+    async def send(self, line: str) -> None:
+        self.sent += 1
+        if self.keep:
+            self.lines.append(line)
+
+
+def chat_tags(
+    name: str, timestamp: datetime.datetime, mod: bool = False, message_id: str = ""
+) -> Dict[str, str]:
+    """The tags the chat server attaches to a message."""
+
+    sent_ms = int(timestamp.replace(tzinfo=datetime.timezone.utc).timestamp() * 1000)
+    return {
+        "id": message_id or f"{name}-{sent_ms}",
+        "subscriber": "0",
+        "mod": "1" if mod else "0",
+        "badges": "moderator/1" if mod else "",
+        "display-name": name,
+        "color": "",
+        "tmi-sent-ts": str(sent_ms),
+    }
+
+
+def make_message(
+    websocket: fake_websocket,
+    channel: str,
+    name: str,
+    content: str,
+    timestamp: datetime.datetime,
+    mod: bool = False,
+    message_id: str = "",
+) -> Message:
+    """A chat message, as the connection would deliver it."""
+
+    tags = chat_tags(name, timestamp, mod, message_id)
+    this_channel = Channel(channel, websocket)
+    author = Chatter(websocket, name=name, channel=this_channel, tags=tags)
+    return Message(
+        content=content, author=author, channel=this_channel, tags=tags, echo=False
+    )
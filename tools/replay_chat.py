@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# Licence: BSD-3-Clause
+# 2024 (C) exachixkitsune
+
+"""
+Replay a chat recording through the bot.
+
+Recordings are made by setting record_path in the bot's config. Each message
+is rebuilt as the chat connection would deliver it and passed to
+Bot.event_message, at the speed it was recorded, some multiple of it, or as
+fast as the bot will take it. Gaps between messages are kept relative to
+each other; the recording is moved to start now.
+
+Rounds are closed by the recording's clock rather than the wall clock, so a
+round closes at the same point in the chat however fast it is replayed.
+What the bot sends goes nowhere, but is counted, and can be printed.
+
+The bot runs with the given config, minus its journal, recording and chat
+server, so replaying never touches production state. The handler latency,
+throughput, guesses recorded and outbound counts are reported, and the run
+can be profiled.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import cProfile
+import dataclasses
+import datetime
+import sys
+import tempfile
+import time
+
+from typing import Dict, List, Tuple
+
+from tools.path import gather_paths
+from tools.fake_chat import fake_websocket, make_message
+
+from twitchio import Channel
+
+sys.path.extend(gather_paths("src"))
+
+# pylint: disable=C0413
+from bot import bot, log  # noqa: E402
+from bot.channel import CLOSE_GRACE, utc_now  # noqa: E402
+from bot.chat_recorder import read_recording  # noqa: E402
+from bot.config import Config, load_config_from_file  # noqa: E402
+
+
+async def close_due_rounds(test_bot: bot.Bot, now: datetime.datetime) -> None:
+    """Close rounds whose deadline has passed by the recording's clock."""
+
+    grace = datetime.timedelta(seconds=CLOSE_GRACE)
+    closing = False
+    for this_round in test_bot.rounds.values():
+        if this_round.close_at is not None and this_round.close_at + grace <= now:
+            # Also cancels the wall clock timer, so it cannot close a later round
+            this_round.cancel_close()
+            this_round.close_round()
+            closing = True
+
+    if closing:
+        # Live, the round has announced what it collected well before the next
+        # command; replayed faster, it has to be waited for
+        await asyncio.gather(
+            *(
+                task
+                for task in asyncio.all_tasks()
+                if task.get_name().startswith("close-")
+            )
+        )
+
+
+def percentile(ordered: list, fraction: float) -> int:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def replay_bot(options: argparse.Namespace) -> Tuple[bot.Bot, fake_websocket]:
+    """Build a bot from the options, sending to a websocket which goes nowhere."""
+
+    bot_config = Config()
+    if options.config:
+        bot_config = load_config_from_file(options.config)
+    bot_config = dataclasses.replace(
+        bot_config, journal_path="", record_path="", chat_server="", live_mode=False
+    )
+
+    log.init(options.log_dir)
+    websocket = fake_websocket(keep=options.show)
+    test_bot = bot.Bot("", bot_config, log.get_logger())
+    # The bot is not connected, so it has no channels of its own to send to
+    test_bot.get_channel = lambda name: Channel(name, websocket)
+    return test_bot, websocket
+
+
+async def feed_recording(
+    test_bot: bot.Bot, websocket: fake_websocket, options: argparse.Namespace
+) -> List[int]:
+    """Pass each recorded message to the bot, returning the handler latencies."""
+
+    loop = asyncio.get_running_loop()
+    latencies = []
+    clock = time.perf_counter_ns
+    first = None
+    shift = datetime.timedelta()
+    started = loop.time()
+
+    for index, captured in enumerate(read_recording(options.recording)):
+        if first is None:
+            first = captured.timestamp
+            shift = utc_now() - first
+        timestamp = captured.timestamp + shift
+
+        if options.speed:
+            due = started + (captured.timestamp - first).total_seconds() / options.speed
+            if due > loop.time():
+                await asyncio.sleep(due - loop.time())
+        await close_due_rounds(test_bot, timestamp)
+
+        message = make_message(
+            websocket,
+            captured.channel,
+            captured.name,
+            captured.content,
+            timestamp,
+            captured.mod,
+            f"replay{index}",
+        )
+        sent = clock()
+        await test_bot.event_message(message)
+        latencies.append(clock() - sent)
+
+        if not options.speed and index % options.burst == 0:
+            # Let the ingest consumer and other tasks run, as the connection would
+            await asyncio.sleep(0)
+
+    return latencies
+
+
+async def finish_rounds(test_bot: bot.Bot, send_wait: float) -> None:
+    """Close what is still open and wait for the bot to send what it queued."""
+
+    # Rounds still closing when the recording ends would have closed live
+    await close_due_rounds(test_bot, datetime.datetime.max - datetime.timedelta(days=1))
+    await test_bot.ingest.drain()
+    try:
+        await asyncio.wait_for(test_bot.outbound.drain(), send_wait)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def replay(options: argparse.Namespace) -> Dict[str, object]:
+    """Feed the recording through a bot, returning the measurements."""
+
+    test_bot, websocket = replay_bot(options)
+    clock = time.perf_counter_ns
+
+    started_ns = clock()
+    latencies = await feed_recording(test_bot, websocket, options)
+    handled_ns = clock()
+    await finish_rounds(test_bot, options.send_wait)
+    finished_ns = clock()
+
+    results = {
+        "messages": len(latencies),
+        "handler_seconds": (handled_ns - started_ns) / 1e9,
+        "total_seconds": (finished_ns - started_ns) / 1e9,
+        "guesses_recorded": sum(
+            this_round.guess_handler.num_replies()
+            for this_round in test_bot.rounds.values()
+        ),
+        "flood": test_bot.flood.metrics(),
+        "ingest": test_bot.ingest.metrics(),
+        "outbound": test_bot.outbound.metrics(),
+        "sent_to_chat": websocket.lines,
+    }
+    if latencies:
+        latencies.sort()
+        results["latency_ns"] = {
+            "p50": percentile(latencies, 0.50),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1],
+        }
+
+    await test_bot.ingest.close()
+    await test_bot.outbound.close()
+    for this_round in test_bot.rounds.values():
+        this_round.close()
+    log.shutdown()
+    return results
+
+
+def parse_options() -> argparse.Namespace:
+    """Parse command line arguments for the replay."""
+
+    parser = argparse.ArgumentParser(description="Replay a chat recording")
+    parser.add_argument("recording", help="Recording made with record_path")
+    parser.add_argument("--config", help="Bot config to replay with")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Times faster than recorded; 0 replays as fast as possible",
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=100,
+        help="Messages between event loop yields, at full speed",
+    )
+    parser.add_argument(
+        "--send-wait",
+        type=float,
+        default=5.0,
+        help="Seconds to wait at the end for queued chat messages to be sent",
+    )
+    parser.add_argument(
+        "--show", action="store_true", help="Print what the bot sent to chat"
+    )
+    parser.add_argument("--profile", help="Save a cProfile of the replay to this file")
+    parser.add_argument(
+        "--log-dir",
+        default=tempfile.gettempdir(),
+        help="Where the bot log is written when not on a tty; the temp dir by default",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    run_options = parse_options()
+    profiler = cProfile.Profile() if run_options.profile else None
+    if profiler is not None:
+        profiler.enable()
+    outcome = asyncio.run(replay(run_options))
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(run_options.profile)
+
+    print(
+        f"{outcome['messages']} messages in {outcome['total_seconds']:.2f}s "
+        f"(handler {outcome['handler_seconds']:.2f}s)"
+    )
+    if "latency_ns" in outcome:
+        latency = outcome["latency_ns"]
+        print(
+            f"event_message latency: p50 {latency['p50'] / 1000:.1f}us, "
+            f"p99 {latency['p99'] / 1000:.1f}us, max {latency['max'] / 1000:.1f}us"
+        )
+    print(f"guesses recorded: {outcome['guesses_recorded']}")
+    print(f"outbound: {outcome['outbound']}")
+    for line in outcome["sent_to_chat"]:
+        print(f"  {line.strip()}")
+    if profiler is not None:
+        print(f"profile saved to {run_options.profile}")